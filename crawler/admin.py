@@ -1,15 +1,30 @@
 from django.contrib import admin
-from .models import NewsWebsite, Article, CrawlSession, ArticleTag, ArticleTagRelation
+from .cache import bump_data_version
+from .models import NewsWebsite, Article, ArticleArchive, CrawlSession, FrontierURL, DiscoverySource, StageMetric, EventCounter, ArticleTag, ArticleTagRelation
+
+# Zmiany z panelu admina unieważniają cache odpowiedzi API
+class DataVersionAdminMixin:
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_data_version()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_data_version()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_data_version()
 
 @admin.register(NewsWebsite)
-class NewsWebsiteAdmin(admin.ModelAdmin):
-    list_display = ['name', 'domain', 'url', 'is_active', 'created_at']
+class NewsWebsiteAdmin(DataVersionAdminMixin, admin.ModelAdmin):
+    list_display = ['name', 'domain', 'url', 'is_active', 'parse_timeouts', 'quarantined_until', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'domain', 'url']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'parse_timeouts']
 
 @admin.register(Article)
-class ArticleAdmin(admin.ModelAdmin):
+class ArticleAdmin(DataVersionAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'website', 'published_date_normalized', 'status', 'scraped_at', 'get_word_count']
     list_filter = ['status', 'website', 'scraped_at', 'published_date_normalized']
     search_fields = ['title', 'plain_text_content', 'url']
@@ -20,20 +35,61 @@ class ArticleAdmin(admin.ModelAdmin):
         return obj.get_word_count()
     get_word_count.short_description = 'Liczba słów'
 
+@admin.register(ArticleArchive)
+class ArticleArchiveAdmin(admin.ModelAdmin):
+    list_display = ['title', 'website', 'published_date_normalized', 'status', 'scraped_at', 'archived_at']
+    list_filter = ['status', 'website']
+    search_fields = ['title', 'url']
+    date_hierarchy = 'scraped_at'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(CrawlSession)
 class CrawlSessionAdmin(admin.ModelAdmin):
     list_display = ['name', 'website', 'status', 'started_at', 'completed_at', 'get_progress']
     list_filter = ['status', 'website', 'created_at']
     search_fields = ['name']
-    readonly_fields = ['created_at', 'started_at', 'completed_at']
+    readonly_fields = ['created_at', 'started_at', 'completed_at', 'worker_id', 'heartbeat_at', 'metrics', 'profile_dir']
     date_hierarchy = 'created_at'
     
     def get_progress(self, obj):
-        if obj.total_urls > 0:
-            return f"{obj.scraped_urls}/{obj.total_urls} ({obj.get_progress_percentage():.1f}%)"
+        if obj.total_articles > 0:
+            return f"{obj.scraped_articles}/{obj.total_articles} ({obj.get_progress_percentage():.1f}%)"
         return "0/0"
     get_progress.short_description = 'Postęp'
 
+@admin.register(FrontierURL)
+class FrontierURLAdmin(admin.ModelAdmin):
+    list_display = ['url', 'website', 'state', 'priority', 'attempts', 'timeout_count', 'next_eligible_at', 'fetch_count', 'change_count', 'revisit_interval']
+    list_filter = ['state', 'website']
+    search_fields = ['url']
+    readonly_fields = ['created_at', 'updated_at', 'content_hash', 'fetch_count', 'change_count', 'last_fetched_at', 'last_changed_at']
+
+@admin.register(DiscoverySource)
+class DiscoverySourceAdmin(admin.ModelAdmin):
+    list_display = ['url', 'website', 'kind', 'is_active', 'last_status_code', 'last_seen_lastmod', 'last_checked_at']
+    list_filter = ['kind', 'is_active', 'website']
+    search_fields = ['url']
+    readonly_fields = ['created_at', 'etag', 'last_modified', 'last_checked_at', 'last_status_code', 'last_error']
+
+@admin.register(StageMetric)
+class StageMetricAdmin(admin.ModelAdmin):
+    list_display = ['domain', 'stage', 'count', 'total_seconds', 'updated_at']
+    list_filter = ['stage']
+    search_fields = ['domain']
+    readonly_fields = ['buckets', 'updated_at']
+
+@admin.register(EventCounter)
+class EventCounterAdmin(admin.ModelAdmin):
+    list_display = ['domain', 'name', 'value', 'updated_at']
+    list_filter = ['name']
+    search_fields = ['domain']
+    readonly_fields = ['updated_at']
+
 @admin.register(ArticleTag)
 class ArticleTagAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'created_at']
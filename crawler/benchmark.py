@@ -0,0 +1,170 @@
+import json
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import django
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .fixture_server import FixtureServer
+from .scraper import ArticleScraper
+
+CORPUS_DIR = Path(__file__).parent / 'testdata' / 'benchmark'
+# Metryki, których wzrost oznacza regresję (dla pozostałych lepiej więcej)
+LOWER_IS_BETTER = {'wall_seconds', 'cpu_seconds', 'peak_rss_kb', 'queries_per_article'}
+
+def build_corpus(target: Path, huge_kb: int = 2048) -> List[str]:
+    # Zapisany korpus + generowana strona-gigant (nie trzymamy jej w repozytorium)
+    for page in CORPUS_DIR.glob('*.html'):
+        shutil.copy(page, target / page.name)
+
+    paragraph = ('<p>Bardzo długi artykuł z setkami akapitów, tabel i odnośników, '
+                 'który sprawdza zachowanie parsera na dużych stronach.</p>')
+    repeats = max(1, huge_kb * 1024 // len(paragraph.encode('utf-8')))
+    (target / 'huge.html').write_text(
+        '<!DOCTYPE html><html lang="pl"><head><meta charset="utf-8">'
+        '<title>Strona-gigant do testów wydajności parsera</title></head><body>'
+        '<nav>' + '<a href="/x">Link</a>' * 2000 + '</nav>'
+        '<article><h1>Strona-gigant do testów wydajności parsera</h1>'
+        '<time datetime="2024-10-14T10:30:00">14.10.2024</time>'
+        '<div class="entry-content">' + paragraph * repeats + '</div></article>'
+        '</body></html>',
+        encoding='utf-8'
+    )
+    return sorted(page.name for page in target.glob('*.html'))
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent, capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+def peak_rss_kb() -> int:
+    # ru_maxrss: kilobajty na Linuksie, bajty na macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+class _Rollback(Exception):
+    pass
+
+def run_benchmark(repeat: int = 5, latency: float = 0.0, error_rate: float = 0.0, seed: int = 1,
+                  huge_kb: int = 2048, pages: Optional[List[str]] = None) -> Dict:
+    scraper = ArticleScraper()
+    results = {
+        'commit': current_commit(),
+        'timestamp': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'config': {
+            'repeat': repeat,
+            'latency': latency,
+            'error_rate': error_rate,
+            'seed': seed,
+            'huge_kb': huge_kb,
+        },
+    }
+    stages = defaultdict(lambda: {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+    per_page = {}
+    totals = {'pages': 0, 'successful': 0, 'failed': 0, 'queries': 0}
+
+    with tempfile.TemporaryDirectory() as corpus:
+        names = build_corpus(Path(corpus), huge_kb)
+        if pages:
+            names = [name for name in names if name in pages]
+
+        with FixtureServer(corpus, latency=latency, error_rate=error_rate, seed=seed) as server:
+            started = time.perf_counter()
+            cpu_started = time.process_time()
+            try:
+                # Artykuły zapisujemy naprawdę (liczymy zapytania), ale wycofujemy
+                # transakcję, żeby benchmark nie zostawiał danych w bazie
+                with transaction.atomic():
+                    for name in names:
+                        page = {'pages': 0, 'successful': 0, 'failed': 0, 'queries': 0, 'wall_seconds': 0.0}
+                        for i in range(repeat):
+                            url = server.url(f"{name}?run={i}")
+                            page_started = time.perf_counter()
+                            with CaptureQueriesContext(connection) as queries:
+                                article_data = scraper.scrape_article(url)
+                                write_started, write_cpu_started = time.perf_counter(), time.thread_time()
+                                scraper.save_result(url, scraper.get_website(url), article_data)
+                                article_data['timings']['db_write'] = time.perf_counter() - write_started
+                                article_data['cpu_timings']['db_write'] = time.thread_time() - write_cpu_started
+                            page['wall_seconds'] += time.perf_counter() - page_started
+                            page['pages'] += 1
+                            page['queries'] += len(queries)
+                            page['successful' if article_data['status'] == 'success' else 'failed'] += 1
+
+                            for stage, seconds in article_data.get('timings', {}).items():
+                                stages[stage]['wall_seconds'] += seconds
+                                stages[stage]['calls'] += 1
+                            for stage, seconds in article_data.get('cpu_timings', {}).items():
+                                stages[stage]['cpu_seconds'] += seconds
+
+                        for key in ('pages', 'successful', 'failed', 'queries'):
+                            totals[key] += page[key]
+                        page['pages_per_second'] = round(page['pages'] / page['wall_seconds'], 2) if page['wall_seconds'] else None
+                        page['queries_per_article'] = round(page['queries'] / page['pages'], 2)
+                        page['wall_seconds'] = round(page['wall_seconds'], 4)
+                        per_page[name] = page
+                    raise _Rollback
+            except _Rollback:
+                pass
+            wall = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+
+    results['summary'] = {
+        'pages': totals['pages'],
+        'successful': totals['successful'],
+        'failed': totals['failed'],
+        'wall_seconds': round(wall, 4),
+        'cpu_seconds': round(cpu, 4),
+        'pages_per_second': round(totals['pages'] / wall, 2) if wall else None,
+        'peak_rss_kb': peak_rss_kb(),
+        'queries_per_article': round(totals['queries'] / totals['pages'], 2) if totals['pages'] else None,
+    }
+    results['stages'] = {
+        stage: {
+            'wall_seconds': round(values['wall_seconds'], 6),
+            'cpu_seconds': round(values['cpu_seconds'], 6),
+            'mean_ms': round(values['wall_seconds'] / values['calls'] * 1000, 3) if values['calls'] else None,
+        }
+        for stage, values in sorted(stages.items())
+    }
+    results['pages'] = per_page
+    return results
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.1) -> List[Dict]:
+    # Porównanie podsumowań dwóch przebiegów; regresja to zmiana w złą stronę
+    # większa niż threshold (domyślnie 10%)
+    changes = []
+    for key, value in current['summary'].items():
+        previous = baseline.get('summary', {}).get(key)
+        if not isinstance(value, (int, float)) or not isinstance(previous, (int, float)) or not previous:
+            continue
+        delta = (value - previous) / previous
+        worse = delta > threshold if key in LOWER_IS_BETTER else delta < -threshold
+        changes.append({
+            'metric': key,
+            'baseline': previous,
+            'current': value,
+            'delta_percent': round(delta * 100, 1),
+            'regression': worse and key not in ('pages', 'successful', 'failed'),
+        })
+    return changes
+
+def load_results(path: str) -> Dict:
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
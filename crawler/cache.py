@@ -0,0 +1,175 @@
+import hashlib
+import os
+import threading
+from functools import wraps
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils import timezone
+
+from .models import DataVersion
+
+DATA_VERSION_NAME = 'articles'
+
+def get_data_version() -> int:
+    version = DataVersion.objects.filter(name=DATA_VERSION_NAME).values_list('version', flat=True).first()
+    return version or 0
+
+def _request_data_version(request):
+    # Numer wersji i czas jej podbicia jednym zapytaniem na żądanie
+    if not hasattr(request, '_data_version'):
+        row = DataVersion.objects.filter(name=DATA_VERSION_NAME).values_list('version', 'updated_at').first()
+        request._data_version = row or (0, None)
+    return request._data_version
+
+def get_request_data_version(request) -> int:
+    return _request_data_version(request)[0]
+
+def get_request_data_modified(request):
+    # Czas ostatniej zmiany danych, także takiej, której nie widać w samych
+    # wierszach Article (np. usunięcie przez archiwizację)
+    return _request_data_version(request)[1]
+
+def bump_data_version() -> None:
+    # update() pomija auto_now, więc czas podbicia ustawiamy jawnie
+    bump = {'version': F('version') + 1, 'updated_at': timezone.now()}
+    updated = DataVersion.objects.filter(name=DATA_VERSION_NAME).update(**bump)
+    if not updated:
+        version, created = DataVersion.objects.get_or_create(name=DATA_VERSION_NAME, defaults={'version': 1})
+        if not created:
+            DataVersion.objects.filter(pk=version.pk).update(**bump)
+
+class ResponseCache:
+    # Budżet pamięci pilnuje sam backend (MAX_ENTRIES w CACHES), więc działa
+    # także dla backendu plikowego współdzielonego przez procesy; tutaj
+    # odrzucane są tylko pojedyncze zbyt duże odpowiedzi
+    def __init__(self, alias=None, max_entry_bytes=None, timeout=None):
+        self.alias = alias or getattr(settings, 'CRAWLER_API_CACHE_ALIAS', 'default')
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else getattr(settings, 'CRAWLER_API_CACHE_MAX_ENTRY_BYTES', 256 * 1024)
+        self.timeout = timeout if timeout is not None else getattr(settings, 'CRAWLER_API_CACHE_TIMEOUT', 300)
+        self._lock = threading.Lock()
+        self.clear_stats()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def clear_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def clear(self):
+        self.backend.clear()
+        self.clear_stats()
+
+    def make_key(self, prefix: str, version: int, query_string: str) -> str:
+        digest = hashlib.md5(query_string.encode('utf-8')).hexdigest()
+        return f"api:{prefix}:v{version}:{digest}"
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, entry, size: int) -> bool:
+        if size > self.max_entry_bytes:
+            with self._lock:
+                self.rejected += 1
+            return False
+        self.backend.set(key, entry, self.timeout)
+        return True
+
+    def usage(self) -> Tuple[Optional[int], Optional[int]]:
+        # Liczba wpisów i ich rozmiar (bajty po serializacji) odczytane z backendu:
+        # wpisy usuwa sam backend (MAX_ENTRIES, wygasanie), z pominięciem
+        # ResponseCache. Dla innych backendów (np. Redis) brak danych
+        backend = self.backend
+        if isinstance(backend, LocMemCache):
+            with backend._lock:
+                return len(backend._cache), sum(len(value) for value in backend._cache.values())
+        if isinstance(backend, FileBasedCache):
+            entries, used = 0, 0
+            for path in backend._list_cache_files():
+                try:
+                    used += os.path.getsize(path)
+                    entries += 1
+                except OSError:
+                    pass
+            return entries, used
+        return None, None
+
+    def stats(self) -> dict:
+        # Liczniki trafień dotyczą bieżącego procesu, zajętość - całego backendu
+        requests_count = self.hits + self.misses
+        entries, used_bytes = self.usage()
+        return {
+            'backend': self.backend.__class__.__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / requests_count if requests_count else 0.0,
+            'rejected': self.rejected,
+            'entries': entries,
+            'used_bytes': used_bytes,
+            'max_bytes': getattr(settings, 'CRAWLER_API_CACHE_MAX_BYTES', None),
+            'max_entries': getattr(self.backend, '_max_entries', None),
+            'max_entry_bytes': self.max_entry_bytes,
+        }
+
+response_cache = ResponseCache()
+
+def cache_response(prefix: str, etag_func=None, last_modified_func=None):
+    # Jak @condition, ale walidatory (ETag / Last-Modified) są zapisywane razem
+    # z odpowiedzią: trafienie w cache - także zakończone 304 - kosztuje tylko
+    # odczyt wersji danych, bez agregatów etag_func / last_modified_func
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            query = '&'.join(sorted(request.GET.urlencode().split('&')))
+            key = response_cache.make_key(prefix, get_request_data_version(request), query)
+
+            entry = response_cache.get(key)
+            if entry is not None:
+                content, content_type, etag, last_modified = entry
+            else:
+                etag = etag_func(request, *args, **kwargs) if etag_func else None
+                last_modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+            etag = quote_etag(etag) if etag else None
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is not None:
+                return response
+
+            if entry is not None:
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    response_cache.set(
+                        key, (response.content, response['Content-Type'], etag, last_modified), len(response.content)
+                    )
+                response['X-Cache'] = 'MISS'
+
+            if timestamp and not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(timestamp)
+            if etag:
+                response.headers.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
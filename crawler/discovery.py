@@ -0,0 +1,287 @@
+import gzip
+import logging
+from datetime import datetime, timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urljoin
+from xml.etree import ElementTree
+
+import requests
+import urllib3
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import frontier
+from .models import DiscoverySource, NewsWebsite
+
+logger = logging.getLogger(__name__)
+
+ENQUEUE_BATCH_SIZE = 1000
+GZIP_MAGIC = b'\x1f\x8b'
+MAX_SITEMAP_DEPTH = 3
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    value = value.strip()
+
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is not None:
+            parsed = datetime(day.year, day.month, day.day)
+    if parsed is None:
+        # RSS: daty w formacie RFC 822 (np. "Mon, 14 Oct 2024 10:30:00 +0200")
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1].lower()
+
+def _child_text(elem, name: str) -> Optional[str]:
+    for child in elem:
+        if _local_name(child.tag) == name and child.text:
+            return child.text.strip()
+    return None
+
+def _atom_link(elem) -> Optional[str]:
+    fallback = None
+    for child in elem:
+        if _local_name(child.tag) == 'link' and child.get('href'):
+            if child.get('rel', 'alternate') == 'alternate':
+                return child.get('href')
+            fallback = fallback or child.get('href')
+    return fallback
+
+def iter_entries(stream) -> Iterator[Tuple[str, str, Optional[datetime]]]:
+    # Parser przyrostowy - każdy wpis jest zwalniany od razu po przetworzeniu
+    # i odpinany od rodzica (<urlset>, <channel>, <feed>), więc pamięć nie rośnie
+    # z rozmiarem sitemapy. Samo clear() zostawiłoby puste elementy w drzewie.
+    # Zwraca krotki (rodzaj, url, lastmod), rodzaj: 'sitemap' lub 'page'
+    parents = []
+    for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        name = _local_name(elem.tag)
+
+        if name == 'sitemap':
+            loc = _child_text(elem, 'loc')
+            if loc:
+                yield 'sitemap', loc, parse_lastmod(_child_text(elem, 'lastmod'))
+        elif name == 'url':
+            loc = _child_text(elem, 'loc')
+            if loc:
+                yield 'page', loc, parse_lastmod(_child_text(elem, 'lastmod'))
+        elif name == 'item':
+            link = _child_text(elem, 'link') or _child_text(elem, 'guid')
+            if link:
+                yield 'page', link, parse_lastmod(_child_text(elem, 'pubdate') or _child_text(elem, 'date'))
+        elif name == 'entry':
+            link = _atom_link(elem)
+            if link:
+                yield 'page', link, parse_lastmod(_child_text(elem, 'updated') or _child_text(elem, 'published'))
+        else:
+            continue
+
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+
+class PrefixedStream:
+    # Strumień odpowiedzi z już przeczytanym początkiem - urllib3 nie ma peek(),
+    # a io.BufferedReader nie znosi automatycznego zamknięcia odpowiedzi
+
+    def __init__(self, prefix: bytes, stream):
+        self.prefix = prefix
+        self._pending = prefix
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._pending:
+            return self.stream.read() if size is None or size < 0 else self.stream.read(size)
+        if size is None or size < 0:
+            data, self._pending = self._pending + self.stream.read(), b''
+            return data
+        data, self._pending = self._pending[:size], self._pending[size:]
+        if len(data) < size:
+            data += self.stream.read(size - len(data))
+        return data
+
+class SitemapDiscoverer:
+
+    def __init__(self, http: Optional[requests.Session] = None):
+        self.http = http or requests.Session()
+        self.http.headers.update({
+            'User-Agent': 'Mozilla/5.0 (compatible; ScrapperBot/1.0)',
+            'Accept': 'application/xml,text/xml,application/rss+xml,application/atom+xml;q=0.9,*/*;q=0.8',
+        })
+
+    def ensure_default_sources(self, website: NewsWebsite) -> None:
+        base = website.url if website.url.endswith('/') else website.url + '/'
+        DiscoverySource.objects.get_or_create(
+            url=urljoin(base, 'sitemap.xml'),
+            defaults={'website': website, 'kind': 'sitemap'}
+        )
+
+    def discover_website(self, website: NewsWebsite) -> Dict:
+        self.ensure_default_sources(website)
+
+        stats = {'sources': 0, 'not_modified': 0, 'errors': 0, 'entries': 0, 'enqueued': 0}
+        for source in DiscoverySource.objects.filter(website=website, parent__isnull=True, is_active=True):
+            self.discover_source(source, stats)
+        return stats
+
+    def discover_source(self, source: DiscoverySource, stats: Dict, depth: int = 0) -> bool:
+        # Zwraca True, gdy źródło zostało przetworzone w całości (lub się nie zmieniło)
+        stats['sources'] += 1
+
+        headers = {}
+        if source.etag:
+            headers['If-None-Match'] = source.etag
+        if source.last_modified:
+            headers['If-Modified-Since'] = source.last_modified
+
+        try:
+            response = self.http.get(source.url, headers=headers, timeout=60, stream=True)
+        except requests.exceptions.RequestException as e:
+            self._record_error(source, f"Błąd pobierania {source.url}: {str(e)}")
+            stats['errors'] += 1
+            return False
+
+        with response:
+            source.last_status_code = response.status_code
+            source.last_checked_at = timezone.now()
+
+            if response.status_code == 304:
+                stats['not_modified'] += 1
+                source.save(update_fields=['last_status_code', 'last_checked_at'])
+                return True
+
+            if response.status_code != 200:
+                self._record_error(source, f"Błąd HTTP {response.status_code} dla {source.url}")
+                stats['errors'] += 1
+                return False
+
+            try:
+                newest, complete = self._consume(source, response, stats, depth)
+            except ElementTree.ParseError as e:
+                self._record_error(source, f"Nieprawidłowy XML w {source.url}: {str(e)}")
+                stats['errors'] += 1
+                return False
+            except (OSError, EOFError, urllib3.exceptions.HTTPError, requests.exceptions.RequestException) as e:
+                # Uszkodzony gzip, zerwane połączenie - błąd tylko tego źródła
+                self._record_error(source, f"Błąd odczytu {source.url}: {str(e)}")
+                stats['errors'] += 1
+                return False
+
+        if not complete:
+            # Któraś z sitemap podrzędnych się nie udała - bez zapisanych walidatorów
+            # indeks zostanie następnym razem pobrany w całości, a ona ponowiona
+            source.last_error = ''
+            source.save(update_fields=['last_error', 'last_status_code', 'last_checked_at'])
+            return False
+
+        source.etag = response.headers.get('ETag', '')
+        source.last_modified = response.headers.get('Last-Modified', '')
+        if newest and (source.last_seen_lastmod is None or newest > source.last_seen_lastmod):
+            source.last_seen_lastmod = newest
+        source.last_error = ''
+        source.save()
+        return True
+
+    def _open_stream(self, source: DiscoverySource, response: requests.Response):
+        # Plik .gz bywa wysyłany z Content-Encoding: gzip i urllib3 już go
+        # rozpakował - o drugim rozpakowaniu decydują same bajty, nie nazwa pliku
+        response.raw.decode_content = True
+        stream = PrefixedStream(response.raw.read(len(GZIP_MAGIC)), response.raw)
+        if stream.prefix == GZIP_MAGIC:
+            return gzip.GzipFile(fileobj=stream)
+        return stream
+
+    def _consume(self, source: DiscoverySource, response: requests.Response, stats: Dict,
+                 depth: int) -> Tuple[Optional[datetime], bool]:
+        threshold = source.last_seen_lastmod
+        newest = None
+        complete = True
+        new_urls, changed_urls = [], []
+
+        for kind, url, lastmod in iter_entries(self._open_stream(source, response)):
+            if lastmod and (newest is None or lastmod > newest):
+                newest = lastmod
+
+            if kind == 'sitemap':
+                if depth < MAX_SITEMAP_DEPTH and not self._discover_child(source, url, lastmod, stats, depth):
+                    complete = False
+                continue
+
+            stats['entries'] += 1
+            if threshold is None or lastmod is None:
+                # Nowe URL-e trafiają do kolejki, znane są pomijane przez ignore_conflicts
+                new_urls.append(url)
+            elif lastmod > threshold:
+                changed_urls.append(url)
+
+            if len(new_urls) >= ENQUEUE_BATCH_SIZE:
+                stats['enqueued'] += frontier.enqueue_urls(new_urls)
+                new_urls = []
+            if len(changed_urls) >= ENQUEUE_BATCH_SIZE:
+                stats['enqueued'] += frontier.enqueue_urls(changed_urls, requeue=True)
+                changed_urls = []
+
+        if new_urls:
+            stats['enqueued'] += frontier.enqueue_urls(new_urls)
+        if changed_urls:
+            stats['enqueued'] += frontier.enqueue_urls(changed_urls, requeue=True)
+        return newest, complete
+
+    def _discover_child(self, parent: DiscoverySource, url: str, lastmod: Optional[datetime], stats: Dict, depth: int) -> bool:
+        child, created = DiscoverySource.objects.get_or_create(
+            url=url,
+            defaults={'website': parent.website, 'kind': 'sitemap', 'parent': parent}
+        )
+        if not child.is_active:
+            return True
+        # Indeks podaje lastmod każdej sitemapy - niezmienionych nie pobieramy wcale
+        if not created and lastmod and child.last_seen_lastmod and lastmod <= child.last_seen_lastmod:
+            stats['not_modified'] += 1
+            return True
+        # lastmod z indeksu przesuwamy tylko po udanym pobraniu - inaczej
+        # sitemapa z błędem byłaby przy następnym przebiegu uznana za niezmienioną
+        if not self.discover_source(child, stats, depth + 1):
+            return False
+        if lastmod and (child.last_seen_lastmod is None or lastmod > child.last_seen_lastmod):
+            child.last_seen_lastmod = lastmod
+            child.save(update_fields=['last_seen_lastmod'])
+        return True
+
+    def _record_error(self, source: DiscoverySource, error: str) -> None:
+        logger.error(error)
+        source.last_error = error
+        source.last_checked_at = timezone.now()
+        source.save(update_fields=['last_error', 'last_checked_at', 'last_status_code'])
+
+def discover_urls(websites=None) -> Dict:
+    discoverer = SitemapDiscoverer()
+    totals = {'sources': 0, 'not_modified': 0, 'errors': 0, 'entries': 0, 'enqueued': 0}
+
+    if websites is None:
+        websites = NewsWebsite.objects.filter(is_active=True)
+    for website in websites:
+        stats = discoverer.discover_website(website)
+        for key, value in stats.items():
+            totals[key] += value
+    return totals
@@ -0,0 +1,114 @@
+import codecs
+import itertools
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+# Deklaracja <meta charset> musi się znaleźć w pierwszych 1024 bajtach (HTML5);
+# przeszukujemy trochę więcej, bo nie wszystkie strony tego przestrzegają
+DETECT_BYTES = 4096
+# Polskie strony bez deklaracji kodowania, które nie są poprawnym UTF-8,
+# to prawie zawsze windows-1250
+FALLBACK_CHARSET = 'cp1250'
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?\s*([\w:.\-]+)', re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([\w:.\-]+)', re.IGNORECASE)
+DECLARED_SOURCES = ('bom', 'header', 'meta')
+# Kodowanie odgadnięte: ani deklaracja strony, ani zapamiętane dla domeny
+GUESSED_SOURCES = ('utf-8', 'fallback')
+
+@dataclass(slots=True)
+class DecodedPage:
+    text: str
+    charset: str
+    source: str
+
+    @property
+    def fallback(self) -> bool:
+        return self.source in GUESSED_SOURCES
+
+def normalize_charset(label: Optional[str]) -> Optional[str]:
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().strip('"\'')).name
+    except LookupError:
+        return None
+    # Jak w przeglądarkach (WHATWG): etykiety latin-1/ascii oznaczają windows-1252,
+    # a UTF-16 zadeklarowane w treści ASCII nie może być prawdą
+    if name in ('iso8859-1', 'ascii'):
+        return 'cp1252'
+    if name.startswith('utf-16'):
+        return 'utf-8'
+    return name
+
+def charset_from_headers(content_type: str) -> Optional[str]:
+    match = HEADER_CHARSET_RE.search(content_type or '')
+    return normalize_charset(match.group(1)) if match else None
+
+def charset_from_meta(content: bytes) -> Optional[str]:
+    match = META_CHARSET_RE.search(content[:DETECT_BYTES])
+    return normalize_charset(match.group(1).decode('ascii', 'ignore')) if match else None
+
+_domain_charsets: Dict[str, str] = {}
+_domain_lock = threading.Lock()
+
+def remembered_charset(domain: str) -> Optional[str]:
+    with _domain_lock:
+        return _domain_charsets.get(domain)
+
+def remember_charset(domain: str, charset: str) -> None:
+    with _domain_lock:
+        _domain_charsets[domain] = charset
+
+def _try_decode(content: bytes, charset: Optional[str]) -> Optional[str]:
+    if not charset:
+        return None
+    try:
+        return content.decode(charset)
+    except (UnicodeDecodeError, LookupError):
+        return None
+
+def _declared(content: bytes, content_type: str, domain: str) -> Iterator[Tuple[Optional[str], str]]:
+    # Leniwie - <meta> przeszukujemy dopiero, gdy nagłówek i kodowanie
+    # zapamiętane dla domeny nie rozstrzygnęły
+    yield charset_from_headers(content_type), 'header'
+    yield remembered_charset(domain) if domain else None, 'domain'
+    yield charset_from_meta(content), 'meta'
+
+def decode_html(content: bytes, content_type: str = '', domain: str = '') -> DecodedPage:
+    # Kolejność: BOM, nagłówek Content-Type, kodowanie zapamiętane dla domeny,
+    # <meta charset>, UTF-8, a na końcu windows-1250 z zastępowaniem błędnych bajtów.
+    # Deklaracja, z którą treść się nie dekoduje, jest traktowana jak jej brak.
+    for bom, charset in BOMS:
+        if content.startswith(bom):
+            return DecodedPage(content[len(bom):].decode(charset, 'replace'), charset, 'bom')
+
+    utf8 = _try_decode(content, 'utf-8')
+    if utf8 is not None and not content.isascii():
+        # Poprawny UTF-8 ze znakami spoza ASCII praktycznie nie zdarza się w tekście
+        # jednobajtowym, więc wygrywa z deklaracją innego kodowania (typowe "krzaki").
+        # Źródłem jest pierwsza deklaracja UTF-8, o ile któraś istnieje
+        source = next(
+            (source for charset, source in _declared(content, content_type, domain) if charset == 'utf-8'),
+            'utf-8'
+        )
+        if domain and source in DECLARED_SOURCES:
+            remember_charset(domain, 'utf-8')
+        return DecodedPage(utf8, 'utf-8', source)
+
+    candidates = itertools.chain(_declared(content, content_type, domain), [('utf-8', 'utf-8')])
+    for charset, source in candidates:
+        text = utf8 if charset == 'utf-8' else _try_decode(content, charset)
+        if text is not None:
+            if domain and source in DECLARED_SOURCES:
+                remember_charset(domain, charset)
+            return DecodedPage(text, charset, source)
+
+    return DecodedPage(content.decode(FALLBACK_CHARSET, 'replace'), FALLBACK_CHARSET, 'fallback')
@@ -0,0 +1,272 @@
+import html
+import json
+import logging
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+# Ekstrakcja z danych osadzonych w stronie (SSR/SPA): zamiast budować drzewo DOM
+# wyszukujemy bloki <script> z JSON-em i czytamy z nich treść artykułu. Gdy
+# żaden ekstraktor nic nie znajdzie, scraper wraca do parsowania HTML przez
+# BeautifulSoup. Ekstraktory zapasowe (fallback) - dowolny JSON w <script>,
+# plik JSON zapowiedziany w <link> - uruchamiane są dopiero wtedy, gdy DOM nie
+# dał treści artykułu (pusta powłoka SPA).
+
+# [^<>]* zamiast [^>]*: niezamknięty znacznik nie wydłuża każdej kolejnej próby
+SCRIPT_OPEN_RE = re.compile(r'<script\b([^<>]*)>', re.IGNORECASE)
+SCRIPT_CLOSE = '</script'
+LINK_RE = re.compile(r'<link\b([^<>]*)/?>', re.IGNORECASE)
+ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+TAG_RE = re.compile(r'<[^>]+>')
+BLOCK_TAG_RE = re.compile(r'</?(?:p|div|br|h[1-6]|li|ul|ol|section|article|blockquote)\b[^>]*>', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+TITLE_KEYS = ('headline', 'title', 'name')
+BODY_KEYS = ('articleBody', 'contentHtml', 'content', 'body', 'html', 'text')
+DATE_KEYS = ('datePublished', 'publishedAt', 'published_at', 'publishDate', 'date', 'createdAt', 'created_at')
+TYPE_KEYS = ('@type', '__typename', 'type')
+ARTICLE_TYPES = {'article', 'newsarticle', 'blogposting', 'reportagenewsarticle', 'webpage'}
+# Obiekt z dowolnego JSON-a w <script> (konfiguracja, widżety) uznajemy za
+# artykuł tylko z oznaczeniem typu albo z długą treścią
+JSON_SCRIPT_TYPES = (ARTICLE_TYPES - {'webpage'}) | {'post'}
+JSON_SCRIPT_MIN_BODY_LENGTH = 500
+# Linki alternate typu JSON, których nie pobieramy: oEmbed i REST API WordPressa
+# (są na każdej stronie WordPressa)
+SKIPPED_ENDPOINTS = ('oembed', 'wp-json', 'rest_route=')
+
+MIN_BODY_LENGTH = 50
+MAX_SEARCH_DEPTH = 10
+
+def parse_attrs(raw: str) -> Dict[str, str]:
+    return {
+        match.group(1).lower(): html.unescape(next(value for value in match.groups()[1:] if value is not None))
+        for match in ATTR_RE.finditer(raw)
+    }
+
+def html_to_text(content: str) -> str:
+    if '<' not in content:
+        return WHITESPACE_RE.sub(' ', html.unescape(content)).strip()
+    text = BLOCK_TAG_RE.sub(' ', content)
+    text = TAG_RE.sub('', text)
+    return WHITESPACE_RE.sub(' ', html.unescape(text)).strip()
+
+def text_to_html(content: str) -> str:
+    if '<' in content and TAG_RE.search(content):
+        return content
+    paragraphs = [part.strip() for part in re.split(r'\n\s*\n', content) if part.strip()]
+    return ''.join(f"<p>{html.escape(part)}</p>" for part in paragraphs)
+
+def _string_value(value) -> Optional[str]:
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, dict):
+        # np. {"rendered": "..."} (WordPress REST) lub {"html": "..."}
+        for key in ('rendered', 'html', 'value', 'text'):
+            if isinstance(value.get(key), str):
+                return value[key].strip() or None
+    return None
+
+def _first(data: Dict, keys: Tuple[str, ...]) -> Optional[str]:
+    for key in keys:
+        value = _string_value(data.get(key))
+        if value:
+            return value
+    return None
+
+def _walk(data, depth: int = 0) -> Iterator[Dict]:
+    if depth > MAX_SEARCH_DEPTH:
+        return
+    if isinstance(data, dict):
+        yield data
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                yield from _walk(value, depth + 1)
+    elif isinstance(data, list):
+        for value in data:
+            if isinstance(value, (dict, list)):
+                yield from _walk(value, depth + 1)
+
+def _has_type(candidate: Dict, types: set) -> bool:
+    for key in TYPE_KEYS:
+        value = candidate.get(key)
+        values = value if isinstance(value, list) else [value]
+        if any(isinstance(item, str) and item.lower() in types for item in values):
+            return True
+    return False
+
+def find_article(data, types: Optional[set] = None, min_length: int = MIN_BODY_LENGTH) -> Optional[Dict]:
+    # Szuka w strukturze JSON obiektu wyglądającego na artykuł (tytuł + treść);
+    # przy kilku kandydatach wybiera ten z najdłuższą treścią
+    best = None
+    for candidate in _walk(data):
+        if types is not None and not _has_type(candidate, types):
+            continue
+
+        title = _first(candidate, TITLE_KEYS)
+        body = _first(candidate, BODY_KEYS)
+        if not title or not body or len(html_to_text(body)) < min_length:
+            continue
+        if best is None or len(body) > len(best['content']):
+            best = {
+                'title': html_to_text(title),
+                'content': body,
+                'published': _first(candidate, DATE_KEYS),
+            }
+    return best
+
+class Page:
+    # Surowy HTML strony z leniwie wyciąganymi blokami <script> i <link>
+
+    def __init__(self, url: str, text: str, fetch: Optional[Callable] = None):
+        self.url = url
+        self.text = text
+        self.fetch = fetch
+        self._scripts = None
+
+    @property
+    def scripts(self) -> List[Tuple[Dict[str, str], str]]:
+        # Jedno przejście: po znaczniku otwierającym szukamy zamknięcia przez
+        # str.find; niezamknięty <script> kończy przeglądanie
+        if self._scripts is None:
+            self._scripts = []
+            lower = self.text.lower()
+            position = 0
+            while True:
+                match = SCRIPT_OPEN_RE.search(self.text, position)
+                if not match:
+                    break
+                end = lower.find(SCRIPT_CLOSE, match.end())
+                if end == -1:
+                    break
+                self._scripts.append((parse_attrs(match.group(1)), self.text[match.end():end]))
+                position = end + len(SCRIPT_CLOSE)
+        return self._scripts
+
+    def links(self) -> Iterator[Dict[str, str]]:
+        for match in LINK_RE.finditer(self.text):
+            yield parse_attrs(match.group(1))
+
+def _load_json(raw: str):
+    raw = raw.strip()
+    if raw.startswith('<!--'):
+        raw = raw[4:].rsplit('-->', 1)[0]
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+class EmbeddedExtractor:
+    name = ''
+    # Zapasowy: tylko gdy DOM nie dał treści artykułu
+    fallback = False
+
+    def extract(self, page: Page) -> Optional[Dict]:
+        raise NotImplementedError
+
+class NextDataExtractor(EmbeddedExtractor):
+    name = 'next_data'
+
+    def extract(self, page: Page) -> Optional[Dict]:
+        if '__NEXT_DATA__' not in page.text:
+            return None
+        for attrs, body in page.scripts:
+            if attrs.get('id') == '__NEXT_DATA__':
+                data = _load_json(body)
+                return find_article(data.get('props', data)) if isinstance(data, dict) else None
+        return None
+
+class JsonLdExtractor(EmbeddedExtractor):
+    name = 'json_ld'
+
+    def extract(self, page: Page) -> Optional[Dict]:
+        if 'application/ld+json' not in page.text:
+            return None
+        for attrs, body in page.scripts:
+            if attrs.get('type', '').lower() == 'application/ld+json':
+                article = find_article(_load_json(body), types=ARTICLE_TYPES)
+                if article:
+                    return article
+        return None
+
+class JsonScriptExtractor(EmbeddedExtractor):
+    name = 'json_script'
+    fallback = True
+
+    def extract(self, page: Page) -> Optional[Dict]:
+        for attrs, body in page.scripts:
+            if attrs.get('type', '').lower() == 'application/json' and attrs.get('id') != '__NEXT_DATA__':
+                data = _load_json(body)
+                article = find_article(data, types=JSON_SCRIPT_TYPES) or \
+                    find_article(data, min_length=JSON_SCRIPT_MIN_BODY_LENGTH)
+                if article:
+                    return article
+        return None
+
+class JsonEndpointExtractor(EmbeddedExtractor):
+    # Strony, które dociągają treść z pliku JSON, zwykle zapowiadają go w <link>
+    # (rel="alternate" type="application/json" lub rel="preload" as="fetch")
+    name = 'json_endpoint'
+    fallback = True
+
+    def endpoints(self, page: Page) -> Iterator[str]:
+        for attrs in page.links():
+            rel = attrs.get('rel', '').lower().split()
+            href = attrs.get('href')
+            if not href:
+                continue
+            if any(marker in href.lower() or marker in attrs.get('type', '').lower() for marker in SKIPPED_ENDPOINTS):
+                continue
+            if ('alternate' in rel and 'json' in attrs.get('type', '').lower()) or \
+                    ('preload' in rel and attrs.get('as') == 'fetch' and href.split('?', 1)[0].endswith('.json')):
+                yield urljoin(page.url, href)
+
+    def extract(self, page: Page) -> Optional[Dict]:
+        if page.fetch is None:
+            return None
+        for endpoint in self.endpoints(page):
+            response, error = page.fetch(endpoint)
+            if not response:
+                continue
+            try:
+                data = response.json()
+            except ValueError:
+                logger.warning(f"Nieprawidłowy JSON pod {endpoint}")
+                continue
+            article = find_article(data)
+            if article:
+                return article
+        return None
+
+EXTRACTORS: List[EmbeddedExtractor] = [
+    NextDataExtractor(),
+    JsonLdExtractor(),
+    JsonScriptExtractor(),
+    JsonEndpointExtractor(),
+]
+
+def register_extractor(extractor: EmbeddedExtractor, first: bool = False) -> None:
+    if first:
+        EXTRACTORS.insert(0, extractor)
+    else:
+        EXTRACTORS.append(extractor)
+
+def extract_embedded(text: str, url: str, fetch: Optional[Callable] = None,
+                     extractors: Optional[List[EmbeddedExtractor]] = None, fallback: bool = False) -> Optional[Dict]:
+    # Domyślnie ekstraktory podstawowe; fallback=True - tylko zapasowe
+    page = Page(url, text, fetch)
+    if extractors is None:
+        extractors = [extractor for extractor in EXTRACTORS if extractor.fallback == fallback]
+    for extractor in extractors:
+        try:
+            article = extractor.extract(page)
+        except Exception as e:
+            logger.warning(f"Ekstraktor {extractor.name} nie powiódł się dla {url}: {str(e)}")
+            continue
+        if article:
+            article['extractor'] = extractor.name
+            article['plain_text'] = html_to_text(article['content'])
+            article['content'] = text_to_html(article['content'])
+            return article
+    return None
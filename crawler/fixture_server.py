@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.xml': 'application/xml; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8',
+    '.gz': 'application/x-gzip',
+}
+
+class FixtureServer:
+    # Lokalny zamiennik prawdziwych serwisów: serwuje nagrane odpowiedzi
+    # z katalogu, obsługuje żądania warunkowe i potrafi symulować opóźnienia
+    # oraz błędy. Plik "<nazwa>.headers.json" obok odpowiedzi nadpisuje kod
+    # statusu i nagłówki, "<nazwa>.gz" bez pliku na dysku jest kompresowany
+    # w locie z "<nazwa>". Znacznik __BASE_URL__ w treści jest zastępowany
+    # adresem serwera (port jest losowy).
+
+    def __init__(self, root, latency: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, seed: Optional[int] = None):
+        self.root = Path(root)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def start(self) -> 'FixtureServer':
+        fixture_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fixture_server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _load(self, path: str):
+        relative = path.split('?', 1)[0].lstrip('/') or 'index.html'
+        target = (self.root / relative).resolve()
+        if self.root.resolve() not in target.parents:
+            return None, {}
+
+        overrides = {}
+        headers_file = target.with_name(target.name + '.headers.json')
+        if headers_file.exists():
+            overrides = json.loads(headers_file.read_text(encoding='utf-8'))
+
+        if target.exists():
+            return self._render(target.read_bytes()), overrides
+        if target.suffix == '.gz' and target.with_suffix('').exists():
+            return gzip.compress(self._render(target.with_suffix('').read_bytes()), mtime=0), overrides
+        return None, overrides
+
+    def _render(self, body: bytes) -> bytes:
+        return body.replace(b'__BASE_URL__', self.base_url.encode('ascii'))
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.requests.append({'path': handler.path, 'headers': dict(handler.headers)})
+            fail = self.error_rate and self.random.random() < self.error_rate
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if fail:
+            self._send(handler, self.error_status, b'', {})
+            return
+
+        body, overrides = self._load(handler.path)
+        if body is None:
+            self._send(handler, 404, b'Not Found', {'Content-Type': 'text/plain'})
+            return
+
+        suffix = Path(handler.path.split('?', 1)[0]).suffix
+        headers = {
+            'Content-Type': CONTENT_TYPES.get(suffix, 'application/octet-stream'),
+            'ETag': '"%s"' % hashlib.md5(body).hexdigest(),
+            'Last-Modified': formatdate(0, usegmt=True),
+        }
+        headers.update(overrides.get('headers', {}))
+        status = overrides.get('status', 200)
+
+        if status == 200 and (
+            handler.headers.get('If-None-Match') == headers['ETag']
+            or (not handler.headers.get('If-None-Match') and handler.headers.get('If-Modified-Since') == headers['Last-Modified'])
+        ):
+            self._send(handler, 304, b'', {'ETag': headers['ETag']})
+            return
+
+        self._send(handler, status, body, headers)
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, body: bytes, headers: Dict) -> None:
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if body:
+            handler.wfile.write(body)
+
+    def requests_for(self, path: str):
+        return [request for request in self.requests if request['path'] == path]
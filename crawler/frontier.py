@@ -0,0 +1,307 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .models import CrawlSession, FrontierURL, NewsWebsite
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+# Strona, której ekstrakcja tyle razy przekroczyła limit czasu, trafia na
+# kwarantannę zamiast kolejnych prób
+QUARANTINE_AFTER_TIMEOUTS = 2
+RETRY_BACKOFF_SECONDS = 60
+LEASE_SECONDS = 300
+
+# Ponowne wizyty: odstęp rośnie dwukrotnie przy braku zmian treści i maleje
+# dwukrotnie po wykryciu zmiany, w granicach [MIN, MAX]
+MIN_REVISIT_SECONDS = 60 * 60
+MAX_REVISIT_SECONDS = 30 * 24 * 60 * 60
+# Początkowy odstęp zależy od wieku artykułu: świeże sprawdzamy często, stare rzadko
+AGE_REVISIT_SECONDS = [
+    (timedelta(days=1), MIN_REVISIT_SECONDS),
+    (timedelta(days=7), 6 * 60 * 60),
+    (timedelta(days=30), 24 * 60 * 60),
+]
+OLD_ARTICLE_REVISIT_SECONDS = 7 * 24 * 60 * 60
+
+def _get_websites(domains: Iterable[str]) -> dict:
+    websites = {website.domain: website for website in NewsWebsite.objects.filter(domain__in=domains)}
+    for domain in domains:
+        if domain not in websites:
+            websites[domain], created = NewsWebsite.objects.get_or_create(
+                domain=domain,
+                defaults={
+                    'name': domain,
+                    'url': f"https://{domain}",
+                    'description': f"Strona {domain}"
+                }
+            )
+    return websites
+
+def _flush(urls: List[str], crawl_session: Optional[CrawlSession], priority: int, requeue: bool) -> int:
+    # Zwraca liczbę URL-i faktycznie dodanych lub przywróconych do kolejki -
+    # znane URL-e (bez requeue) i te w trakcie pobierania nie są liczone
+    websites = _get_websites({urlparse(url).netloc for url in urls})
+    now = timezone.now()
+    existing = set(FrontierURL.objects.filter(url__in=urls).values_list('url', flat=True))
+    new_urls = [url for url in urls if url not in existing]
+
+    # ignore_conflicts na wypadek URL-a dodanego w międzyczasie przez inny proces
+    FrontierURL.objects.bulk_create([
+        FrontierURL(
+            url=url,
+            website=websites[urlparse(url).netloc],
+            crawl_session=crawl_session,
+            priority=priority,
+            next_eligible_at=now
+        )
+        for url in new_urls
+    ], ignore_conflicts=True)
+
+    requeued = 0
+    if requeue and existing:
+        # Już znane URL-e wracają do kolejki w ramach nowej sesji
+        requeued = FrontierURL.objects.filter(url__in=existing).exclude(state='in_flight').update(
+            crawl_session=crawl_session,
+            state='queued',
+            priority=priority,
+            attempts=0,
+            next_eligible_at=now
+        )
+    return len(new_urls) + requeued
+
+def enqueue_urls(urls: Iterable[str], crawl_session: Optional[CrawlSession] = None, priority: int = 0,
+                 batch_size: int = 1000, requeue: bool = False) -> int:
+    enqueued = 0
+    batch = []
+    seen = set()
+
+    for url in urls:
+        url = url.strip()
+        if not url or url.startswith('#') or url in seen:
+            continue
+        if urlparse(url).scheme not in ('http', 'https'):
+            logger.warning(f"Pominięto nieprawidłowy URL: {url}")
+            continue
+
+        seen.add(url)
+        batch.append(url)
+        if len(batch) >= batch_size:
+            enqueued += _flush(batch, crawl_session, priority, requeue)
+            batch = []
+            seen.clear()
+
+    if batch:
+        enqueued += _flush(batch, crawl_session, priority, requeue)
+    return enqueued
+
+def _claimable(now):
+    # Kolejka: gotowe do pobrania URL-e oraz te, których dzierżawa wygasła
+    # (worker, który je pobrał, prawdopodobnie przestał działać)
+    return Q(state='queued', next_eligible_at__lte=now) | Q(state='in_flight', lease_expires_at__lt=now)
+
+def claim_batch(limit: int, worker_id: str = '', crawl_session: Optional[CrawlSession] = None,
+                lease_seconds: int = LEASE_SECONDS) -> List[FrontierURL]:
+    now = timezone.now()
+    expires = now + timedelta(seconds=lease_seconds)
+    lease = {'state': 'in_flight', 'lease_owner': worker_id, 'lease_expires_at': expires}
+
+    candidates = FrontierURL.objects.filter(_claimable(now))
+    if crawl_session:
+        candidates = candidates.filter(crawl_session=crawl_session)
+    candidates = candidates.order_by('-priority', 'next_eligible_at')
+
+    if connection.features.has_select_for_update_skip_locked:
+        # Postgres: wiersze zablokowane przez innych workerów są pomijane,
+        # więc równoległe procesy nie czekają na siebie ani nie dublują pracy
+        with transaction.atomic():
+            ids = list(candidates.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            FrontierURL.objects.filter(pk__in=ids).update(**lease)
+    else:
+        # SQLite: zapisy są serializowane, więc warunkowy UPDATE jest atomowy -
+        # wiersze przejęte w międzyczasie przez inny proces nie spełnią warunku,
+        # a własne rozpoznajemy po znaczniku czasu dzierżawy
+        ids = list(candidates.values_list('pk', flat=True)[:limit])
+        FrontierURL.objects.filter(_claimable(now), pk__in=ids).update(**lease)
+        ids = list(FrontierURL.objects.filter(pk__in=ids, lease_owner=worker_id, lease_expires_at=expires).values_list('pk', flat=True))
+
+    if not ids:
+        return []
+
+    session_ids = set(FrontierURL.objects.filter(pk__in=ids, crawl_session__isnull=False).values_list('crawl_session_id', flat=True))
+    if session_ids:
+        CrawlSession.objects.filter(pk__in=session_ids, status='pending').update(
+            status='running',
+            worker_id=worker_id,
+            started_at=now
+        )
+
+    return list(FrontierURL.objects.filter(pk__in=ids).select_related('website', 'crawl_session').order_by('-priority', 'next_eligible_at'))
+
+def extend_lease(items: Iterable[FrontierURL], worker_id: str, lease_seconds: int = LEASE_SECONDS) -> int:
+    return FrontierURL.objects.filter(
+        pk__in=[item.pk for item in items],
+        state='in_flight',
+        lease_owner=worker_id
+    ).update(lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds))
+
+def _leased(item: FrontierURL):
+    # Wynik zapisuje tylko worker, który nadal trzyma dzierżawę - po jej
+    # wygaśnięciu URL mógł przejąć i zakończyć inny worker
+    return FrontierURL.objects.filter(pk=item.pk, state='in_flight', lease_owner=item.lease_owner)
+
+def content_hash(article_data: Dict) -> str:
+    if article_data.get('status') != 'success':
+        return ''
+    content = f"{article_data.get('title', '')}\n{article_data.get('plain_text_content', '')}"
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def website_change_rate(website_id: Optional[int]) -> Optional[float]:
+    # Odsetek ponownych pobrań, które przyniosły zmianę treści, dla całego serwisu
+    if website_id is None:
+        return None
+    stats = FrontierURL.objects.filter(website_id=website_id, fetch_count__gt=1).aggregate(
+        urls=Count('pk'),
+        fetches=Sum('fetch_count'),
+        changes=Sum('change_count')
+    )
+    revisits = (stats['fetches'] or 0) - stats['urls']
+    if revisits <= 0:
+        return None
+    return stats['changes'] / revisits
+
+def _initial_interval(published_at: Optional[datetime], site_rate: Optional[float], now: datetime) -> int:
+    interval = OLD_ARTICLE_REVISIT_SECONDS
+    if published_at is not None:
+        if timezone.is_naive(published_at):
+            published_at = timezone.make_aware(published_at)
+        age = now - published_at
+        for max_age, seconds in AGE_REVISIT_SECONDS:
+            if age < max_age:
+                interval = seconds
+                break
+
+    # Bez historii URL-a korzystamy z historii serwisu
+    if site_rate is not None:
+        if site_rate >= 0.5:
+            interval //= 2
+        elif site_rate < 0.1:
+            interval *= 2
+    return interval
+
+def next_revisit_interval(item: FrontierURL, changed: bool, published_at: Optional[datetime] = None,
+                          site_rate: Optional[float] = None, now: Optional[datetime] = None) -> int:
+    now = now or timezone.now()
+    if not item.revisit_interval:
+        interval = _initial_interval(published_at, site_rate, now)
+    elif changed:
+        interval = item.revisit_interval // 2
+    else:
+        interval = item.revisit_interval * 2
+    return max(MIN_REVISIT_SECONDS, min(MAX_REVISIT_SECONDS, interval))
+
+def mark_done(item: FrontierURL, content_hash: str = '', published_at: Optional[datetime] = None) -> bool:
+    # False, gdy dzierżawa została utracona i wynik nie został zapisany
+    now = timezone.now()
+    # Zmiana liczy się dopiero przy porównaniu z poprzednim skrótem
+    changed = bool(content_hash and item.content_hash and content_hash != item.content_hash)
+    site_rate = None if item.revisit_interval else website_change_rate(item.website_id)
+    interval = next_revisit_interval(item, changed, published_at, site_rate, now)
+
+    update = {
+        'state': 'done',
+        'attempts': item.attempts + 1,
+        'last_error': '',
+        'lease_owner': '',
+        'lease_expires_at': None,
+        'fetch_count': item.fetch_count + 1,
+        'last_fetched_at': now,
+        'revisit_interval': interval,
+        'next_eligible_at': now + timedelta(seconds=interval),
+    }
+    if content_hash:
+        update['content_hash'] = content_hash
+    if changed:
+        update['change_count'] = item.change_count + 1
+        update['last_changed_at'] = now
+    elif content_hash and not item.content_hash:
+        update['last_changed_at'] = now
+
+    return bool(_leased(item).update(**update))
+
+def schedule_revisits(budget_per_hour: Optional[int] = None) -> int:
+    # Zaległe ponowne wizyty wracają do kolejki w granicach godzinnego budżetu
+    # pobrań, wspólnego dla wszystkich workerów; najbardziej spóźnione najpierw
+    if budget_per_hour is None:
+        budget_per_hour = settings.CRAWLER_RECRAWL_BUDGET_PER_HOUR
+    now = timezone.now()
+
+    fetched = FrontierURL.objects.filter(last_fetched_at__gte=now - timedelta(hours=1)).count()
+    pending = FrontierURL.objects.filter(state__in=['queued', 'in_flight'], fetch_count__gt=0).count()
+    available = budget_per_hour - fetched - pending
+    if available <= 0:
+        return 0
+
+    ids = list(
+        FrontierURL.objects.filter(state='done', next_eligible_at__lte=now)
+        .order_by('next_eligible_at')
+        .values_list('pk', flat=True)[:available]
+    )
+    if not ids:
+        return 0
+    return FrontierURL.objects.filter(pk__in=ids, state='done').update(
+        state='queued',
+        attempts=0,
+        crawl_session=None
+    )
+
+def mark_failed(item: FrontierURL, error: str) -> bool:
+    # Zwraca True, gdy URL nie będzie już ponawiany; po utracie dzierżawy False
+    attempts = item.attempts + 1
+    final = attempts >= MAX_ATTEMPTS
+
+    updated = _leased(item).update(
+        state='failed' if final else 'queued',
+        attempts=attempts,
+        last_error=error,
+        lease_owner='',
+        lease_expires_at=None,
+        next_eligible_at=timezone.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    )
+    return final and bool(updated)
+
+def mark_timeout(item: FrontierURL, error: str) -> bool:
+    timeouts = item.timeout_count + 1
+    if timeouts < QUARANTINE_AFTER_TIMEOUTS:
+        if not _leased(item).update(timeout_count=timeouts):
+            return False
+        item.timeout_count = timeouts
+        return mark_failed(item, error)
+
+    return bool(_leased(item).update(
+        state='quarantined',
+        attempts=item.attempts + 1,
+        timeout_count=timeouts,
+        last_error=error,
+        lease_owner='',
+        lease_expires_at=None
+    ))
+
+def complete_finished_sessions() -> int:
+    # Sesja jest zakończona, gdy żaden z jej URL-i nie czeka ani nie jest w trakcie.
+    # Sesje bez URL-i we frontierze (profilowanie, utworzone w adminie) prowadzi
+    # ktoś inny - worker ich nie zamyka
+    urls = FrontierURL.objects.filter(crawl_session=OuterRef('pk'))
+    return CrawlSession.objects.filter(
+        Exists(urls),
+        ~Exists(urls.filter(state__in=['queued', 'in_flight'])),
+        status__in=['pending', 'running']
+    ).update(status='completed', completed_at=timezone.now())
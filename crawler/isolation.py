@@ -0,0 +1,116 @@
+import math
+import multiprocessing
+import resource
+import signal
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import NewsWebsite
+
+# Serwis, którego strony tyle razy przekroczyły limit ekstrakcji, trafia na
+# kwarantannę: do jej końca wszystkie jego strony są parsowane w osobnym procesie
+SITE_QUARANTINE_TIMEOUTS = 3
+SITE_QUARANTINE_SECONDS = 24 * 60 * 60
+
+class ExtractionTimeout(BaseException):
+    # BaseException jak KeyboardInterrupt: sygnał może przerwać dowolny
+    # ekstraktor, a ich bloki "except Exception" nie mogą go połknąć
+    pass
+
+def _wall_message(seconds: float) -> str:
+    return f"Przekroczono limit czasu ekstrakcji ({seconds:g} s czasu rzeczywistego)"
+
+def _cpu_message(seconds: float) -> str:
+    return f"Przekroczono limit czasu ekstrakcji ({seconds:g} s czasu CPU)"
+
+def signals_available() -> bool:
+    # Sygnały są obsługiwane tylko w głównym wątku
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+def isolation_available() -> bool:
+    # Proces potomny dziedziczy stan scrapera przez fork, bez serializacji
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+@contextmanager
+def deadline(wall_seconds: float = 0, cpu_seconds: float = 0):
+    # Przerywa blok wyjątkiem ExtractionTimeout po przekroczeniu czasu
+    # rzeczywistego (SIGALRM) lub czasu CPU procesu (SIGVTALRM)
+    if not (wall_seconds or cpu_seconds) or not signals_available():
+        yield
+        return
+
+    def on_wall(signum, frame):
+        raise ExtractionTimeout(_wall_message(wall_seconds))
+
+    def on_cpu(signum, frame):
+        raise ExtractionTimeout(_cpu_message(cpu_seconds))
+
+    previous = {
+        signal.SIGALRM: signal.signal(signal.SIGALRM, on_wall),
+        signal.SIGVTALRM: signal.signal(signal.SIGVTALRM, on_cpu),
+    }
+    signal.setitimer(signal.ITIMER_REAL, wall_seconds or 0)
+    signal.setitimer(signal.ITIMER_VIRTUAL, cpu_seconds or 0)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.setitimer(signal.ITIMER_VIRTUAL, 0)
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+def _run_child(sender, func: Callable, args: tuple, cpu_seconds: float) -> None:
+    if cpu_seconds:
+        # Po przekroczeniu limitu jądro wysyła SIGXCPU i proces kończy się bez odpowiedzi
+        limit = max(1, math.ceil(cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, limit + 1))
+    try:
+        sender.send(('ok', func(*args)))
+    except Exception as e:
+        sender.send(('error', str(e)))
+    finally:
+        sender.close()
+
+def run_isolated(func: Callable, *args, wall_seconds: float = 0, cpu_seconds: float = 0):
+    # Wykonuje func(*args) w procesie potomnym, który jest zabijany po
+    # przekroczeniu limitu - także gdy utknie w kodzie, którego sygnał nie przerwie
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_child, args=(sender, func, args, cpu_seconds), daemon=True)
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(wall_seconds or None):
+            raise ExtractionTimeout(_wall_message(wall_seconds))
+        try:
+            status, value = receiver.recv()
+        except EOFError:
+            raise ExtractionTimeout(_cpu_message(cpu_seconds)) if cpu_seconds else Exception(
+                "Proces ekstrakcji zakończył się bez wyniku"
+            )
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        receiver.close()
+
+    if status == 'error':
+        raise Exception(value)
+    return value
+
+def record_site_timeout(website: NewsWebsite) -> bool:
+    # Zwraca True, jeśli serwis właśnie trafił na kwarantannę
+    NewsWebsite.objects.filter(pk=website.pk).update(parse_timeouts=F('parse_timeouts') + 1)
+    website.refresh_from_db(fields=['parse_timeouts', 'quarantined_until'])
+    if website.parse_timeouts < SITE_QUARANTINE_TIMEOUTS:
+        return False
+
+    website.quarantined_until = timezone.now() + timedelta(seconds=SITE_QUARANTINE_SECONDS)
+    website.parse_timeouts = 0
+    website.save(update_fields=['quarantined_until', 'parse_timeouts'])
+    return True
@@ -0,0 +1,85 @@
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from typing import Iterable, Optional
+
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from . import frontier
+from .memory import set_worker_processes
+from .models import CrawlSession
+from .scraper import ArticleScraper
+
+logger = logging.getLogger(__name__)
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def enqueue_crawl_job(urls: Optional[Iterable[str]] = None, name: Optional[str] = None,
+                      priority: int = 0) -> CrawlSession:
+    if urls is None:
+        urls = ArticleScraper().target_urls
+
+    # Sesja i jej URL-e muszą pojawić się razem - inaczej worker mógłby uznać
+    # pustą sesję za zakończoną
+    with transaction.atomic():
+        crawl_session = CrawlSession.objects.create(
+            name=name or f"Crawl {timezone.now().strftime('%d.%m.%Y %H:%M:%S')}",
+            status='pending'
+        )
+        total = frontier.enqueue_urls(urls, crawl_session=crawl_session, priority=priority, requeue=True)
+        CrawlSession.objects.filter(pk=crawl_session.pk).update(total_articles=total)
+    crawl_session.total_articles = total
+    return crawl_session
+
+def run_worker(worker_id: Optional[str] = None, poll_interval: float = 5.0, once: bool = False,
+               batch_size: int = 20, lease_seconds: int = frontier.LEASE_SECONDS, delay: float = 1.0) -> int:
+    # Worker pobiera partie URL-i z kolejki wspólnej dla wszystkich sesji;
+    # wiele procesów (także na różnych maszynach) może działać równolegle.
+    # Zaległe ponowne wizyty są dokładane do kolejki w każdym obiegu.
+    worker_id = worker_id or default_worker_id()
+    scraper = ArticleScraper()
+    processed = 0
+
+    while True:
+        close_old_connections()
+        frontier.schedule_revisits()
+        results = scraper.process_frontier(
+            max_urls=batch_size,
+            batch_size=batch_size,
+            worker_id=worker_id,
+            lease_seconds=lease_seconds,
+            delay=delay
+        )
+        processed += results['total']
+        frontier.complete_finished_sessions()
+
+        if results['total']:
+            continue
+        if once:
+            return processed
+        time.sleep(poll_interval)
+
+def _worker_process(worker_id: str, processes: int, options: dict):
+    set_worker_processes(processes)
+    run_worker(worker_id=worker_id, **options)
+
+def run_worker_pool(processes: int, worker_id: Optional[str] = None, **options) -> int:
+    worker_id = worker_id or default_worker_id()
+    if processes <= 1:
+        return run_worker(worker_id=worker_id, **options)
+
+    # Połączenia z bazą nie mogą być współdzielone przez procesy potomne
+    connections.close_all()
+    pool = [
+        multiprocessing.Process(target=_worker_process, args=(f"{worker_id}/{i}", processes, options), daemon=False)
+        for i in range(processes)
+    ]
+    for process in pool:
+        process.start()
+    for process in pool:
+        process.join()
+    return sum(1 for process in pool if process.exitcode == 0)
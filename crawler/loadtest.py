@@ -0,0 +1,353 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .cache import bump_data_version, response_cache
+from .models import Article, NewsWebsite
+
+SEED_DOMAIN_SUFFIX = '.loadtest.invalid'
+SEED_WORDS = (
+    'silnik', 'paliwo', 'przepis', 'kurczak', 'schab', 'samochód', 'historia', 'model',
+    'osiągi', 'kuchnia', 'obiad', 'wiadomości', 'region', 'miasto', 'sport', 'pogoda',
+)
+
+# Maksymalna liczba zapytań SQL na jedno wywołanie endpointu (przy pustym cache
+# odpowiedzi). Liczba zapytań nie może zależeć od liczby rekordów - wzrost
+# oznacza N+1 lub zgubione select_related.
+QUERY_BUDGETS = {
+    'home': 5,
+    'articles_list': 4,
+    # +1: wyszukanie serwisów dla ?source=
+    'articles_list_filtered': 5,
+    'articles_list_source': 5,
+    'articles_list_dates': 4,
+    'articles_list_deep_page': 4,
+    'article_detail': 2,
+    'articles_batch': 1,
+    'websites_list': 4,
+    'export_ndjson': 3,
+    'articles_page': 2,
+    'articles_search': 2,
+    'article_page': 1,
+    # histogramy, liczniki zdarzeń i dwa zestawienia stanów
+    'metrics': 4,
+    'cache_stats': 1,
+}
+
+# Tabele, które rosną z liczbą artykułów - zapytanie widoku nie może ich czytać
+# pełnym skanem ani sortować bez indeksu (check_query_plans)
+PLAN_TABLES = (Article._meta.db_table,)
+# Wyjątki świadomie akceptowane: wyszukiwanie LIKE '%...%' nie może użyć indeksu B-drzewa
+PLAN_ALLOWED_SCANS = {'articles_search'}
+# "SCAN tabela" także z "USING [COVERING] INDEX" - to przejście całego indeksu
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+PG_SCAN_RE = re.compile(r'^(Seq Scan|Index Scan|Index Only Scan) (\w+)( bez warunku)?')
+SQL_WHERE_RE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+SQLITE_TABLE_RE = re.compile(r'^(?:SCAN|SEARCH) (\w+)')
+
+def _seed_websites(count: int) -> List[NewsWebsite]:
+    existing = NewsWebsite.objects.filter(domain__endswith=SEED_DOMAIN_SUFFIX).count()
+    NewsWebsite.objects.bulk_create([
+        NewsWebsite(
+            name=f"Serwis testowy {i}",
+            url=f"https://site-{i}{SEED_DOMAIN_SUFFIX}",
+            domain=f"site-{i}{SEED_DOMAIN_SUFFIX}",
+            description="Dane syntetyczne do testów obciążeniowych"
+        )
+        for i in range(existing, count)
+    ], batch_size=1000)
+    return list(NewsWebsite.objects.filter(domain__endswith=SEED_DOMAIN_SUFFIX).order_by('id')[:count])
+
+def _seed_articles(websites: List[NewsWebsite], count: int, rng: random.Random, offset: int) -> Iterator[Article]:
+    now = timezone.now()
+    for n in range(offset, offset + count):
+        website = websites[n % len(websites)]
+        words = rng.choices(SEED_WORDS, k=60)
+        text = ' '.join(words).capitalize() + '.'
+        failed = rng.random() < 0.05
+        yield Article(
+            website=website,
+            url=f"{website.url}/artykul-{n}",
+            title=f"Artykuł {n}: {' '.join(words[:6])}",
+            original_content='' if failed else f"<article><p>{text}</p></article>",
+            plain_text_content='' if failed else text,
+            published_date_normalized=now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+            status='failed' if failed else 'success',
+            error_message='Timeout' if failed else '',
+            http_status_code=None if failed else 200,
+            content_length=len(text)
+        )
+
+def seed_database(articles: int = 10000, websites: int = 50, batch_size: int = 5000, seed: int = 1,
+                  progress=None) -> Dict:
+    # Dokłada syntetyczne artykuły do zadanej liczby; kolejne wywołanie z większą
+    # liczbą uzupełnia brakujące rekordy
+    rng = random.Random(seed)
+    sites = _seed_websites(websites)
+    existing = Article.objects.filter(website__domain__endswith=SEED_DOMAIN_SUFFIX).count()
+
+    created = 0
+    batch = []
+    for article in _seed_articles(sites, max(articles - existing, 0), rng, existing):
+        batch.append(article)
+        if len(batch) >= batch_size:
+            Article.objects.bulk_create(batch, batch_size=batch_size)
+            created += len(batch)
+            batch = []
+            if progress:
+                progress(existing + created)
+    if batch:
+        Article.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+
+    if created:
+        bump_data_version()
+    return {'websites': len(sites), 'articles': existing + created, 'created': created}
+
+def clear_seed() -> int:
+    deleted, _ = Article.objects.filter(website__domain__endswith=SEED_DOMAIN_SUFFIX).delete()
+    NewsWebsite.objects.filter(domain__endswith=SEED_DOMAIN_SUFFIX).delete()
+    bump_data_version()
+    return deleted
+
+def default_endpoints() -> List[Tuple[str, str]]:
+    # Pełne eksporty CSV/JSON są pomijane - przy milionie rekordów to test
+    # przepustowości dysku, nie widoków
+    article_ids = list(Article.objects.order_by('-id').values_list('id', flat=True)[:20])
+    article_id = article_ids[0] if article_ids else 1
+    domain = NewsWebsite.objects.order_by('id').values_list('domain', flat=True).first() or 'example.com'
+    date_to = timezone.localdate()
+    date_from = date_to - timedelta(days=7)
+
+    return [
+        ('home', '/'),
+        ('articles_list', '/api/articles/'),
+        ('articles_list_filtered', f'/api/articles/?source={domain}&status=success'),
+        ('articles_list_source', f'/api/articles/?source={domain}'),
+        ('articles_list_dates', f'/api/articles/?date_from={date_from:%Y-%m-%d}&date_to={date_to:%Y-%m-%d}'),
+        ('articles_list_deep_page', '/api/articles/?page=50'),
+        ('article_detail', f'/api/articles/{article_id}/'),
+        ('articles_batch', f"/api/articles/batch/?ids={','.join(str(i) for i in article_ids) or article_id}"),
+        ('websites_list', '/api/websites/'),
+        ('export_ndjson', '/api/export/ndjson/?limit=500'),
+        ('articles_page', '/articles/'),
+        ('articles_search', '/articles/?search=silnik'),
+        ('article_page', f'/articles/{article_id}/'),
+        ('metrics', '/metrics'),
+        ('cache_stats', '/api/cache/stats/'),
+    ]
+
+def measure_queries(endpoints: Optional[List[Tuple[str, str]]] = None) -> Dict[str, int]:
+    # Liczba zapytań przy pierwszym (niezcache'owanym) wywołaniu każdego endpointu
+    # Client domyślnie wysyła Host "testserver", dozwolony tylko w testach
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    counts = {}
+    for name, path in endpoints or default_endpoints():
+        response_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        counts[name] = len(queries)
+    return counts
+
+def check_query_budgets(counts: Dict[str, int], budgets: Optional[Dict[str, int]] = None) -> List[Dict]:
+    budgets = budgets or QUERY_BUDGETS
+    return [
+        {'endpoint': name, 'queries': count, 'budget': budgets[name]}
+        for name, count in counts.items()
+        if name in budgets and count > budgets[name]
+    ]
+
+def explain(sql: str) -> List[str]:
+    # Plan zapytania jako lista kroków ("SCAN ...", "Seq Scan crawler_article")
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            steps = []
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop(0)
+                keys = ', '.join(node.get('Sort Key', []))
+                # Skan indeksu bez Index Cond przechodzi cały indeks
+                unbounded = 'bez warunku' if 'Index' in node['Node Type'] and 'Index Cond' not in node else ''
+                steps.append(' '.join(filter(None, [node['Node Type'], node.get('Relation Name'), unbounded, keys])))
+                nodes.extend(node.get('Plans', []))
+            return steps
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+def capture_query_plans(endpoints: Optional[List[Tuple[str, str]]] = None) -> Dict[str, List[Tuple[str, List[str]]]]:
+    # Plan każdego zapytania SELECT wykonanego przez endpoint
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    plans = {}
+    for name, path in endpoints or default_endpoints():
+        response_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        plans[name] = [
+            (query['sql'], explain(query['sql']))
+            for query in queries.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+    return plans
+
+def _plan_problems(sql: str, steps: List[str], tables: Tuple[str, ...]) -> List[str]:
+    # Zapytanie z filtrem nie może przechodzić całej tabeli, także po indeksie
+    # (sortowanie z indeksu + filtr na każdym wierszu). Bez filtra (COUNT(*)
+    # całej tabeli) przejście samego indeksu jest najtańszą możliwością.
+    filtered = bool(SQL_WHERE_RE.search(sql))
+    problems = []
+    if connection.vendor == 'postgresql':
+        for step in steps:
+            node, _, rest = step.partition(' ')
+            match = PG_SCAN_RE.match(step)
+            if match and match.group(2) in tables and (match.group(1) == 'Seq Scan' or (filtered and match.group(3))):
+                problems.append(f'pelny skan tabeli {match.group(2)}' + (' (indeks)' if match.group(3) else ''))
+            elif node == 'Sort' and any(f'{table}.' in rest for table in tables):
+                problems.append(f'sortowanie bez indeksu ({rest})')
+        return problems
+
+    driving = next((match.group(1) for match in map(SQLITE_TABLE_RE.match, steps) if match), None)
+    for step in steps:
+        match = SQLITE_SCAN_RE.match(step)
+        if match and match.group(1) in tables and (filtered or not match.group(2)):
+            problems.append(f'pelny skan tabeli {match.group(1)}' + (f' (indeks {match.group(2)})' if match.group(2) else ''))
+        elif step.startswith('USE TEMP B-TREE FOR ORDER BY') and driving in tables:
+            problems.append(f'sortowanie bez indeksu ({driving})')
+    return problems
+
+def check_query_plans(plans: Dict[str, List[Tuple[str, List[str]]]], tables: Tuple[str, ...] = PLAN_TABLES,
+                      allowed: Optional[set] = None) -> List[Dict]:
+    allowed = PLAN_ALLOWED_SCANS if allowed is None else allowed
+    return [
+        {'endpoint': name, 'problem': problem, 'sql': sql, 'plan': steps}
+        for name, queries in plans.items() if name not in allowed
+        for sql, steps in queries
+        for problem in _plan_problems(sql, steps, tables)
+    ]
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    # Metoda najbliższej rangi
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class LocalServer:
+    # Wielowątkowy serwer WSGI aplikacji na losowym porcie; share_connection
+    # przekazuje wątkom bieżące połączenie z bazą (jak LiveServerTestCase),
+    # co jest potrzebne dla bazy SQLite w pamięci w testach
+
+    def __init__(self, share_connection: bool = False):
+        self.share_connection = share_connection
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        override = None
+        if self.share_connection:
+            override = {'default': connections['default']}
+            connections['default'].inc_thread_sharing()
+        self._server = ThreadedWSGIServer(('127.0.0.1', 0), _QuietHandler, allow_reuse_address=False,
+                                          connections_override=override)
+        self._server.set_app(get_wsgi_application())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        if self.share_connection:
+            connections['default'].dec_thread_sharing()
+
+def _timed_get(http: requests.Session, url: str, timeout: float) -> Tuple[float, bool]:
+    started = time.perf_counter()
+    try:
+        response = http.get(url, timeout=timeout)
+        ok = response.status_code < 400
+    except requests.exceptions.RequestException:
+        ok = False
+    return time.perf_counter() - started, ok
+
+def run_load(base_url: str, endpoints: List[Tuple[str, str]], concurrency: int = 8,
+             requests_per_endpoint: int = 200, timeout: float = 30.0) -> Dict:
+    local = threading.local()
+
+    def get(url):
+        # Jedna sesja HTTP (keep-alive) na wątek klienta
+        if not hasattr(local, 'http'):
+            local.http = requests.Session()
+        return _timed_get(local.http, url, timeout)
+
+    results = {}
+    total_requests = total_errors = 0
+    total_seconds = 0.0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for name, path in endpoints:
+            url = base_url.rstrip('/') + path
+            started = time.perf_counter()
+            samples = list(pool.map(get, [url] * requests_per_endpoint))
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(seconds * 1000 for seconds, ok in samples)
+            errors = sum(1 for seconds, ok in samples if not ok)
+            results[name] = {
+                'path': path,
+                'requests': len(samples),
+                'errors': errors,
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'mean_ms': round(sum(latencies) / len(latencies), 2),
+                'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+            }
+            total_requests += len(samples)
+            total_errors += errors
+            total_seconds += elapsed
+
+    return {
+        'config': {
+            'base_url': base_url,
+            'concurrency': concurrency,
+            'requests_per_endpoint': requests_per_endpoint,
+        },
+        'summary': {
+            'requests': total_requests,
+            'errors': total_errors,
+            'throughput_rps': round(total_requests / total_seconds, 1) if total_seconds else None,
+        },
+        'endpoints': results,
+    }
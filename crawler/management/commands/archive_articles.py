@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from crawler.retention import archive_articles, cutoff
+
+class Command(BaseCommand):
+    help = 'Przenosi stare artykuły do archiwum (ArticleArchive) małymi partiami'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.CRAWLER_ARCHIVE_AFTER_DAYS,
+            help='Archiwizuj artykuły pobrane wcześniej niż podana liczba dni temu',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Liczba artykułów przenoszonych w jednej transakcji',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help='Przerwa między partiami (s), żeby nie blokować scrapera',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Tylko policz artykuły do archiwizacji',
+        )
+
+    def handle(self, *args, **options):
+        older_than = cutoff(options['older_than_days'])
+
+        def progress(stats):
+            self.stdout.write(f'   ... przeniesiono {stats["archived"]}')
+
+        stats = archive_articles(
+            older_than,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+            progress=progress
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'Do archiwizacji: {stats["archived"]} artykulow pobranych przed {older_than:%d.%m.%Y}')
+            return
+        self.stdout.write(self.style.SUCCESS('Archiwizacja zakonczona!'))
+        self.stdout.write(f'   - Przeniesione artykuly: {stats["archived"]} ({stats["batches"]} partii)')
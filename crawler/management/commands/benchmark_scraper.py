@@ -0,0 +1,97 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from crawler.benchmark import compare, load_results, run_benchmark
+
+class Command(BaseCommand):
+    help = 'Benchmark scrapera na lokalnym korpusie stron (bez dostępu do internetu)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Ile razy pobrać każdą stronę korpusu',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.0,
+            help='Sztuczne opóźnienie serwera testowego (s)',
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Odsetek odpowiedzi zakończonych błędem 503 (0-1)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Ziarno losowania błędów',
+        )
+        parser.add_argument(
+            '--huge-kb',
+            type=int,
+            default=2048,
+            help='Rozmiar generowanej strony-giganta (KB)',
+        )
+        parser.add_argument(
+            '--page',
+            action='append',
+            default=[],
+            help='Ogranicz do wybranych stron korpusu (np. blog.html)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Zapisz wyniki jako JSON do pliku',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Porównaj z wynikami z pliku JSON (np. z poprzedniego commita)',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.1,
+            help='Próg regresji przy porównaniu (domyślnie 0.1 = 10%%)',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Zakończ z błędem, jeśli porównanie wykaże regresję',
+        )
+
+    def handle(self, *args, **options):
+        results = run_benchmark(
+            repeat=options['repeat'],
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+            huge_kb=options['huge_kb'],
+            pages=options['page'] or None
+        )
+
+        summary = results['summary']
+        self.stdout.write(self.style.SUCCESS(f'Benchmark zakonczony ({results["commit"] or "brak commita"})'))
+        self.stdout.write(f'   - Strony: {summary["pages"]} (sukces: {summary["successful"]}, bledy: {summary["failed"]})')
+        self.stdout.write(f'   - Strony/s: {summary["pages_per_second"]}')
+        self.stdout.write(f'   - Czas CPU: {summary["cpu_seconds"]} s')
+        self.stdout.write(f'   - Szczytowe RSS: {summary["peak_rss_kb"]} KB')
+        self.stdout.write(f'   - Zapytania SQL na artykul: {summary["queries_per_article"]}')
+        for stage, values in results['stages'].items():
+            self.stdout.write(f'     {stage:<24} cpu {values["cpu_seconds"]:>10.4f} s   srednio {values["mean_ms"]} ms')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Wyniki zapisane do {options["output"]}')
+
+        if options['compare']:
+            changes = compare(results, load_results(options['compare']), options['threshold'])
+            regressions = [change for change in changes if change['regression']]
+            for change in changes:
+                line = f'   {change["metric"]:<22} {change["baseline"]} -> {change["current"]} ({change["delta_percent"]:+}%)'
+                self.stdout.write(self.style.ERROR(line) if change['regression'] else line)
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'Wykryto regresje: {", ".join(change["metric"] for change in regressions)}')
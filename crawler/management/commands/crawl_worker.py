@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from crawler.frontier import LEASE_SECONDS
+from crawler.jobs import default_worker_id, run_worker, run_worker_pool
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+class Command(BaseCommand):
+    help = 'Uruchamia workera przetwarzającego kolejkę URL-i i zlecone sesje crawlowania'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--worker-id',
+            default='',
+            help='Identyfikator workera (domyślnie host:pid)',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Liczba równoległych procesów workera',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Liczba URL-i przejmowanych jednorazowo z kolejki',
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=LEASE_SECONDS,
+            help='Czas dzierżawy URL-i; po jego upływie URL-e wracają do kolejki',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=1.0,
+            help='Przerwa między kolejnymi pobraniami (s)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Co ile sekund sprawdzać pustą kolejkę',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Przetwórz dostępne URL-e i zakończ',
+        )
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+        worker_options = {
+            'poll_interval': options['poll_interval'],
+            'once': options['once'],
+            'batch_size': options['batch_size'],
+            'lease_seconds': options['lease_seconds'],
+            'delay': options['delay'],
+        }
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Worker {worker_id} ({options["processes"]} proc.) nasluchuje na zadania...')
+        )
+
+        if options['processes'] > 1:
+            finished = run_worker_pool(options['processes'], worker_id=worker_id, **worker_options)
+            self.stdout.write(
+                self.style.SUCCESS(f'Zakonczone procesy workera: {finished}/{options["processes"]}')
+            )
+        else:
+            processed = run_worker(worker_id=worker_id, **worker_options)
+            self.stdout.write(
+                self.style.SUCCESS(f'Przetworzone URL-e: {processed}')
+            )
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from crawler.discovery import discover_urls
+from crawler.models import DiscoverySource, NewsWebsite
+
+class Command(BaseCommand):
+    help = 'Odkrywa nowe artykuły z sitemap i kanałów RSS/Atom i dodaje je do kolejki crawlowania'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--website',
+            help='Domena serwisu (domyślnie wszystkie aktywne)',
+        )
+        parser.add_argument(
+            '--add-sitemap',
+            action='append',
+            default=[],
+            help='Dodaj adres sitemapy dla serwisu z --website',
+        )
+        parser.add_argument(
+            '--add-feed',
+            action='append',
+            default=[],
+            help='Dodaj adres kanału RSS/Atom dla serwisu z --website',
+        )
+
+    def handle(self, *args, **options):
+        websites = NewsWebsite.objects.filter(is_active=True)
+        if options['website']:
+            websites = websites.filter(domain=options['website'])
+            if not websites.exists():
+                raise CommandError(f'Serwis {options["website"]} nie istnieje')
+        elif options['add_sitemap'] or options['add_feed']:
+            raise CommandError('--add-sitemap i --add-feed wymagają --website')
+
+        for kind, urls in (('sitemap', options['add_sitemap']), ('feed', options['add_feed'])):
+            for url in urls:
+                DiscoverySource.objects.get_or_create(
+                    url=url,
+                    defaults={'website': websites.first(), 'kind': kind}
+                )
+
+        stats = discover_urls(websites)
+
+        self.stdout.write(
+            self.style.SUCCESS('Odkrywanie zakonczone!')
+        )
+        self.stdout.write(f'   - Sprawdzone zrodla: {stats["sources"]}')
+        self.stdout.write(f'   - Bez zmian (304 / lastmod): {stats["not_modified"]}')
+        self.stdout.write(f'   - Wpisy: {stats["entries"]}')
+        self.stdout.write(f'   - Dodane do kolejki: {stats["enqueued"]}')
+        if stats['errors']:
+            self.stdout.write(
+                self.style.WARNING(f'   - Bledy: {stats["errors"]}')
+            )
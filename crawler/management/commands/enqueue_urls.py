@@ -0,0 +1,70 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from crawler.frontier import enqueue_urls
+from crawler.models import CrawlSession
+
+class Command(BaseCommand):
+    help = 'Dodaje URL-e do kolejki crawlowania (z plików lub stdin, jeden URL na linię)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help='Pliki z URL-ami; "-" lub brak argumentów oznacza stdin',
+        )
+        parser.add_argument(
+            '--priority',
+            type=int,
+            default=0,
+            help='Priorytet dodawanych URL-i (wyższy = wcześniej)',
+        )
+        parser.add_argument(
+            '--session',
+            type=int,
+            help='ID sesji crawlowania, do której przypisać URL-e',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Liczba URL-i zapisywanych w jednym zapytaniu',
+        )
+        parser.add_argument(
+            '--requeue',
+            action='store_true',
+            help='Przywróć do kolejki URL-e, które już są w bazie',
+        )
+
+    def handle(self, *args, **options):
+        crawl_session = None
+        if options['session']:
+            try:
+                crawl_session = CrawlSession.objects.get(pk=options['session'])
+            except CrawlSession.DoesNotExist:
+                raise CommandError(f'Sesja {options["session"]} nie istnieje')
+
+        total = 0
+        for path in options['files'] or ['-']:
+            if path == '-':
+                total += self._enqueue(sys.stdin, crawl_session, options)
+            else:
+                with open(path, encoding='utf-8') as handle:
+                    total += self._enqueue(handle, crawl_session, options)
+
+        if crawl_session:
+            crawl_session.total_articles += total
+            crawl_session.save(update_fields=['total_articles'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Dodano lub przywrocono do kolejki URL-i: {total}')
+        )
+
+    def _enqueue(self, lines, crawl_session, options):
+        return enqueue_urls(
+            lines,
+            crawl_session=crawl_session,
+            priority=options['priority'],
+            batch_size=options['batch_size'],
+            requeue=options['requeue']
+        )
@@ -0,0 +1,93 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from crawler.loadtest import (
+    LocalServer, capture_query_plans, check_query_budgets, check_query_plans, default_endpoints, measure_queries, run_load
+)
+
+class Command(BaseCommand):
+    help = 'Test obciążeniowy endpointów API i stron (opóźnienia p50/p95/p99, przepustowość, budżet zapytań SQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            help='Adres działającego serwera (domyślnie uruchamiany lokalnie w procesie)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Liczba równoległych klientów',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Liczba żądań na endpoint',
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            default=[],
+            help='Ogranicz do wybranych endpointów (np. websites_list)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Zapisz wyniki jako JSON do pliku',
+        )
+        parser.add_argument(
+            '--check-budgets',
+            action='store_true',
+            help='Sprawdź budżet zapytań SQL i zakończ z błędem przy przekroczeniu',
+        )
+        parser.add_argument(
+            '--check-plans',
+            action='store_true',
+            help='Sprawdź plany zapytań (EXPLAIN) i zakończ z błędem przy pełnym skanie lub sortowaniu bez indeksu',
+        )
+
+    def handle(self, *args, **options):
+        endpoints = default_endpoints()
+        if options['endpoint']:
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in options['endpoint']]
+
+        queries = measure_queries(endpoints)
+
+        if options['base_url']:
+            results = run_load(options['base_url'], endpoints, options['concurrency'], options['requests'])
+        else:
+            with LocalServer() as server:
+                results = run_load(server.base_url, endpoints, options['concurrency'], options['requests'])
+
+        for name, stats in results['endpoints'].items():
+            stats['queries'] = queries.get(name)
+            line = (f'{name:<26} p50 {stats["p50_ms"]:>8} ms  p95 {stats["p95_ms"]:>8} ms  '
+                    f'p99 {stats["p99_ms"]:>8} ms  {stats["throughput_rps"]:>8} req/s  '
+                    f'SQL {stats["queries"]}  bledy {stats["errors"]}')
+            self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
+
+        summary = results['summary']
+        self.stdout.write(self.style.SUCCESS(
+            f'Razem: {summary["requests"]} zadan, {summary["throughput_rps"]} req/s, bledy: {summary["errors"]}'
+        ))
+
+        violations = check_query_budgets(queries)
+        results['budget_violations'] = violations
+        plan_problems = check_query_plans(capture_query_plans(endpoints)) if options['check_plans'] else []
+        results['plan_problems'] = plan_problems
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Wyniki zapisane do {options["output"]}')
+
+        for violation in violations:
+            self.stdout.write(self.style.ERROR(
+                f'Przekroczony budzet zapytan: {violation["endpoint"]} ({violation["queries"]} > {violation["budget"]})'
+            ))
+        for problem in plan_problems:
+            self.stdout.write(self.style.ERROR(f'Plan zapytania: {problem["endpoint"]} - {problem["problem"]}'))
+            self.stdout.write(f'   {problem["sql"][:200]}')
+        if violations and options['check_budgets']:
+            raise CommandError('Przekroczony budzet zapytan SQL')
+        if plan_problems:
+            raise CommandError('Zapytania bez indeksu')
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from crawler.retention import cutoff, purge_archive
+
+class Command(BaseCommand):
+    help = 'Usuwa z archiwum artykuły starsze niż okres retencji (całe partycje lub małe partie)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.CRAWLER_ARCHIVE_RETENTION_DAYS,
+            help='Usuń artykuły pobrane wcześniej niż podana liczba dni temu',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Liczba wierszy usuwanych w jednej transakcji',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help='Przerwa między partiami (s)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Tylko policz artykuły do usunięcia',
+        )
+
+    def handle(self, *args, **options):
+        older_than = cutoff(options['older_than_days'])
+
+        def progress(stats):
+            self.stdout.write(f'   ... usunieto {stats["deleted"]}')
+
+        stats = purge_archive(
+            older_than,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+            progress=progress
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'Do usuniecia: {stats["deleted"]} artykulow pobranych przed {older_than:%d.%m.%Y}')
+            return
+        self.stdout.write(self.style.SUCCESS('Czyszczenie archiwum zakonczone!'))
+        self.stdout.write(f'   - Usuniete partycje: {stats["partitions"]}')
+        self.stdout.write(f'   - Usuniete wiersze: {stats["deleted"]} ({stats["batches"]} partii)')
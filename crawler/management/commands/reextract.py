@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from crawler.models import NewsWebsite
+from crawler.reextract import reextract_articles
+
+class Command(BaseCommand):
+    help = 'Ponownie wyciąga tytuł, treść i datę publikacji z zapisanego HTML artykułów (bez sieci)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--website',
+            help='Ogranicz do artykułów serwisu o podanej domenie',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            help='Liczba procesów ekstrakcji (domyślnie liczba rdzeni)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Liczba artykułów w jednym zakresie kluczy',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Liczba rekordów w jednym bulk_update',
+        )
+        parser.add_argument(
+            '--start-after',
+            type=int,
+            default=0,
+            help='Zacznij od artykułów o ID większym niż podane',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Plik postępu - zapisywany po każdym zakresie i wczytywany przy wznowieniu',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Tylko policz zmienione artykuły, bez zapisu',
+        )
+
+    def handle(self, *args, **options):
+        website = options['website']
+        if website and not NewsWebsite.objects.filter(domain=website).exists():
+            raise CommandError(f'Nie znaleziono serwisu o domenie {website}')
+
+        start_after = options['start_after']
+        checkpoint_path = Path(options['checkpoint']) if options['checkpoint'] else None
+        if checkpoint_path and checkpoint_path.exists():
+            saved = json.loads(checkpoint_path.read_text(encoding='utf-8'))
+            if saved.get('website') != website:
+                raise CommandError(
+                    f'Plik postępu dotyczy innego filtra serwisu ({saved.get("website") or "wszystkie"})'
+                )
+            start_after = max(start_after, saved['last_pk'])
+            self.stdout.write(f'Wznawiam od artykulu ID > {start_after}')
+
+        def checkpoint(stats):
+            self.stdout.write(f'   ... ID <= {stats["last_pk"]}: przetworzono {stats["processed"]}, zmieniono {stats["changed"]}')
+            if checkpoint_path and not options['dry_run']:
+                checkpoint_path.write_text(
+                    json.dumps({'website': website, 'last_pk': stats['last_pk']}),
+                    encoding='utf-8'
+                )
+
+        stats = reextract_articles(
+            website=website,
+            start_after=start_after,
+            chunk_size=options['chunk_size'],
+            processes=options['processes'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            checkpoint=checkpoint
+        )
+
+        self.stdout.write(self.style.SUCCESS('Ponowna ekstrakcja zakonczona!'))
+        self.stdout.write(f'   - Przetworzone artykuly: {stats["processed"]}')
+        self.stdout.write(f'   - {"Do zmiany" if options["dry_run"] else "Zmienione"}: {stats["changed"]}')
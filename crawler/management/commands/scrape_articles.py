@@ -1,5 +1,10 @@
 from django.core.management.base import BaseCommand
-from crawler.scraper import scrape_articles
+from django.utils import timezone
+from crawler import frontier
+from crawler.jobs import default_worker_id
+from crawler.models import CrawlSession
+from crawler.profiling import RunProfiler, profile_directory
+from crawler.scraper import ArticleScraper, ScrapeStats, iter_scrape_articles
 import logging
 
 # Konfiguracja logowania
@@ -17,6 +22,31 @@ class Command(BaseCommand):
             action='store_true',
             help='Szczegółowe wyświetlanie informacji',
         )
+        parser.add_argument(
+            '--frontier',
+            action='store_true',
+            help='Przetwarzaj kolejkę URL-i z bazy danych zamiast listy target_urls',
+        )
+        parser.add_argument(
+            '--max-urls',
+            type=int,
+            help='Maksymalna liczba URL-i pobranych z kolejki',
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Profiluj przebieg (cProfile), wynik w katalogu sesji',
+        )
+        parser.add_argument(
+            '--trace-memory',
+            action='store_true',
+            help='Śledź alokacje pamięci (tracemalloc) i zapisz największe miejsca alokacji',
+        )
+        parser.add_argument(
+            '--sql-log',
+            action='store_true',
+            help='Zapisz podsumowanie zapytań SQL (liczba i czas per kształt zapytania)',
+        )
 
     def handle(self, *args, **options):
         verbose = options['verbose']
@@ -26,8 +56,62 @@ class Command(BaseCommand):
                 self.style.SUCCESS('Rozpoczynam scrapowanie artykulow...')
             )
         
+        crawl_session = None
+        profiler = RunProfiler(
+            None,
+            profile=options['profile'],
+            trace_memory=options['trace_memory'],
+            sql_log=options['sql_log']
+        )
+        if profiler.enabled and options['frontier']:
+            # URL-e z kolejki należą do sesji, które je zleciły - przebieg kolejki
+            # nie zakłada własnej sesji, której nic by nie zamknęło
+            profiler.directory = profile_directory()
+        elif profiler.enabled:
+            # Wyniki profilowania są zapisywane obok rekordu sesji
+            crawl_session = CrawlSession.objects.create(
+                name=f"Profilowanie {timezone.now().strftime('%d.%m.%Y %H:%M:%S')}",
+                status='running',
+                started_at=timezone.now(),
+                worker_id=default_worker_id()
+            )
+            profiler.directory = profile_directory(crawl_session)
+            crawl_session.profile_dir = str(profiler.directory)
+            crawl_session.save(update_fields=['profile_dir'])
+        
+        stats = ScrapeStats()
         try:
-            results = scrape_articles()
+            with profiler:
+                if options['frontier']:
+                    # URL-e przerwane przez poprzedni proces wracają do kolejki po wygaśnięciu dzierżawy
+                    scraped = ArticleScraper().iter_frontier(
+                        max_urls=options['max_urls'],
+                        worker_id=default_worker_id(),
+                        stats=stats
+                    )
+                else:
+                    scraped = iter_scrape_articles(crawl_session=crawl_session, stats=stats)
+                
+                # Wyniki są wypisywane na bieżąco, bez zbierania listy artykułów w pamięci
+                for result in scraped:
+                    if result.status == 'success':
+                        self.stdout.write(
+                            f'   - ID: {result.article_id} | {result.title} | {result.published_date}'
+                        )
+                    elif result.status == 'failed' and verbose:
+                        self.stdout.write(self.style.WARNING(f'   - Blad: {result.url} | {result.error_message}'))
+                
+                if options['frontier']:
+                    frontier.complete_finished_sessions()
+            
+            results = stats.as_dict()
+            if crawl_session:
+                CrawlSession.objects.filter(pk=crawl_session.pk).update(
+                    status='completed',
+                    completed_at=timezone.now(),
+                    total_articles=results['total'],
+                    scraped_articles=results['total']
+                )
             
             self.stdout.write(
                 self.style.SUCCESS('Scrapowanie zakonczone!')
@@ -39,19 +123,28 @@ class Command(BaseCommand):
             self.stdout.write(f'   - Bledy: {results["failed"]}')
             self.stdout.write(f'   - Pominiete (duplikaty): {results["skipped"]}')
             
-            if results['articles']:
-                self.stdout.write('\nZescrapowane artykuly:')
-                for article in results['articles']:
-                    self.stdout.write(
-                        f'   - ID: {article["id"]} | {article["title"]} | {article["published_date"]}'
-                    )
-            
             if results['failed'] > 0:
                 self.stdout.write(
                     self.style.WARNING(f'{results["failed"]} artykulow nie zostalo zescrapowanych')
                 )
             
+            if profiler.enabled:
+                label = f' (sesja {crawl_session.pk})' if crawl_session else ''
+                self.stdout.write(f'\nProfilowanie{label}: {profiler.directory}')
+                if 'profile' in profiler.summary:
+                    self.stdout.write(f'   - cProfile: {profiler.summary["profile"]}')
+                if 'memory' in profiler.summary:
+                    self.stdout.write(f'   - Pamiec: {profiler.summary["memory"]["path"]} (szczyt {profiler.summary["memory"]["peak_kb"]} KB)')
+                if 'sql' in profiler.summary:
+                    self.stdout.write(f'   - SQL: {profiler.summary["sql"]["path"]} ({profiler.summary["sql"]["queries"]} zapytan, {profiler.summary["sql"]["total_seconds"]} s)')
+            
         except Exception as e:
+            if crawl_session:
+                CrawlSession.objects.filter(pk=crawl_session.pk).update(
+                    status='failed',
+                    completed_at=timezone.now(),
+                    error_message=str(e)
+                )
             self.stdout.write(
                 self.style.ERROR(f'Blad podczas scrapowania: {str(e)}')
             )
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from crawler.loadtest import clear_seed, seed_database
+
+class Command(BaseCommand):
+    help = 'Wypełnia bazę syntetycznymi serwisami i artykułami do testów obciążeniowych'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--articles',
+            type=int,
+            default=10000,
+            help='Docelowa liczba syntetycznych artykułów (np. 1000000)',
+        )
+        parser.add_argument(
+            '--websites',
+            type=int,
+            default=50,
+            help='Liczba syntetycznych serwisów (np. 500)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Liczba rekordów w jednym INSERT',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Ziarno generatora danych',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Usuń wcześniej wygenerowane dane syntetyczne i zakończ',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = clear_seed()
+            self.stdout.write(self.style.SUCCESS(f'Usunieto dane syntetyczne ({deleted} rekordow)'))
+            return
+
+        def progress(total):
+            self.stdout.write(f'   ... {total}/{options["articles"]}')
+
+        stats = seed_database(
+            articles=options['articles'],
+            websites=options['websites'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS('Dane syntetyczne gotowe!'))
+        self.stdout.write(f'   - Serwisy: {stats["websites"]}')
+        self.stdout.write(f'   - Artykuly: {stats["articles"]} (nowe: {stats["created"]})')
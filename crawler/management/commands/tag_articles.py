@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from crawler.tagging import tag_articles
+
+class Command(BaseCommand):
+    help = 'Przypisuje artykułom tagi (słowa o najwyższym TF-IDF w treści) hurtowo, paczkami'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Tylko artykuły dodane od poprzedniego uruchomienia',
+        )
+        parser.add_argument(
+            '--existing-only',
+            action='store_true',
+            help='Przypisuj wyłącznie tagi już zdefiniowane w ArticleTag (bez tworzenia nowych)',
+        )
+        parser.add_argument(
+            '--max-tags',
+            type=int,
+            default=5,
+            help='Maksymalna liczba tagów na artykuł',
+        )
+        parser.add_argument(
+            '--min-score',
+            type=float,
+            default=0.15,
+            help='Minimalna waga TF-IDF słowa (0-1), żeby zostało tagiem',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Liczba artykułów w jednej macierzy TF-IDF',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Liczba relacji w jednym bulk_create',
+        )
+        parser.add_argument(
+            '--sample-size',
+            type=int,
+            default=50000,
+            help='Liczba najnowszych artykułów, z których liczone są częstości słów (IDF)',
+        )
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            self.stdout.write(f'   ... ID <= {stats["last_pk"]}: otagowano {stats["processed"]}, relacji {stats["relations"]}')
+
+        stats = tag_articles(
+            incremental=options['incremental'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            max_tags=options['max_tags'],
+            min_score=options['min_score'],
+            sample_size=options['sample_size'],
+            existing_only=options['existing_only'],
+            progress=progress
+        )
+
+        self.stdout.write(self.style.SUCCESS('Tagowanie zakonczone!'))
+        self.stdout.write(f'   - Przetworzone artykuly: {stats["processed"]}')
+        self.stdout.write(f'   - Nowe relacje: {stats["relations"]}')
+        self.stdout.write(f'   - Slownik: {stats["vocabulary"]} slow')
@@ -0,0 +1,141 @@
+import resource
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+# Drzewo BeautifulSoup (html.parser) zajmuje w pamięci kilkanaście razy więcej
+# niż surowy HTML; szacunek służy do rezerwowania miejsca przed parsowaniem
+PARSE_MEMORY_FACTOR = 12
+
+def current_rss_kb() -> int:
+    # Bieżące RSS z /proc (Linux); gdzie indziej szczytowe RSS procesu
+    try:
+        with open('/proc/self/statm') as handle:
+            pages = int(handle.read().split()[1])
+        return pages * resource.getpagesize() // 1024
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+
+class PageTooLarge(Exception):
+    pass
+
+class ParseBudget:
+    # Ogranicza liczbę jednocześnie sparsowanych dokumentów w procesie tak, by
+    # ich szacowany rozmiar zmieścił się w budżecie RSS ponad bieżące zużycie
+    # procesu. Jeden dokument jest przepuszczany zawsze, o ile sam mieści się
+    # w całym budżecie - większe strony są odrzucane (PageTooLarge).
+
+    def __init__(self, budget_bytes: Optional[int] = None):
+        self.budget_bytes = budget_bytes
+        self.in_use = 0
+        self.documents = 0
+        self._condition = threading.Condition()
+
+    def headroom_bytes(self) -> int:
+        # Liczone przy każdej rezerwacji: RSS rośnie w trakcie crawla (cache,
+        # fragmentacja sterty). Dokumenty w trakcie parsowania są już w RSS,
+        # a osobno liczy je in_use, więc odejmujemy je od zużycia bazowego
+        baseline = max(current_rss_kb() * 1024 - self.in_use, 0)
+        return max(self.budget_bytes - baseline, 0)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.budget_bytes)
+
+    def estimate(self, page_bytes: int) -> int:
+        return page_bytes * PARSE_MEMORY_FACTOR
+
+    @contextmanager
+    def reserve(self, page_bytes: int):
+        if not self.enabled:
+            yield
+            return
+
+        needed = self.estimate(page_bytes)
+        if needed > self.budget_bytes:
+            raise PageTooLarge(
+                f"Strona ({page_bytes // 1024} KB) po sparsowaniu przekroczyłaby budżet pamięci "
+                f"({self.budget_bytes // 1024} KB)"
+            )
+
+        with self._condition:
+            while self.documents and self.in_use + needed > self.headroom_bytes():
+                self._condition.wait()
+            self.in_use += needed
+            self.documents += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_use -= needed
+                self.documents -= 1
+                self._condition.notify_all()
+
+_budgets: Dict[int, ParseBudget] = {}
+_budgets_lock = threading.Lock()
+_processes = 1
+# tracemalloc włączony przez budżet (a nie przez --trace-memory) - tylko wtedy
+# PageMemory może zerować szczyt śledzonej pamięci
+_budget_tracing = False
+
+def set_worker_processes(processes: int) -> None:
+    # Wołane w procesach potomnych crawl_worker --processes N: budżet z ustawień
+    # dotyczy całego workera, więc każdy proces dostaje jego N-tą część
+    global _processes
+    _processes = max(processes, 1)
+
+def share_tracing() -> None:
+    # Wołane przez profiler, który korzysta z tracemalloc włączonego przez
+    # budżet: jego szczyt dotyczy całego przebiegu, więc nie wolno go zerować
+    global _budget_tracing
+    _budget_tracing = False
+
+def shared_budget() -> ParseBudget:
+    # Budżet jest wspólny dla wszystkich scraperów (wątków) w procesie
+    global _budget_tracing
+    budget_bytes = int(float(getattr(settings, 'CRAWLER_MEMORY_BUDGET_MB', 0) or 0) * 1024 * 1024) // _processes
+    with _budgets_lock:
+        if budget_bytes not in _budgets:
+            _budgets[budget_bytes] = ParseBudget(budget_bytes or None)
+            if budget_bytes and not tracemalloc.is_tracing():
+                # Pomiar pamięci per strona; jedna ramka stosu wystarcza i jest najtańsza
+                tracemalloc.start(1)
+                _budget_tracing = True
+        return _budgets[budget_bytes]
+
+class PageMemory:
+    # Szczyt pamięci śledzonej przez tracemalloc w trakcie pobrania jednej
+    # strony ponad stan z początku pobrania. Gdy tracemalloc włączył budżet,
+    # szczyt jest zerowany na starcie strony (reset_peak), więc obejmuje też
+    # chwilowe alokacje między próbkami. Gdy włączył go profiler (--trace-memory),
+    # szczyt przebiegu zostaje nietknięty: liczy się bieżące zużycie w próbkach,
+    # a szczyt tylko wtedy, gdy przekroczył wartość z początku strony.
+    # Bez włączonego tracemalloc nic nie mierzy. Przy wielu wątkach wynik
+    # zawiera też alokacje pozostałych wątków, więc jest tylko przybliżeniem.
+
+    def __init__(self):
+        self.tracing = tracemalloc.is_tracing()
+        self.baseline = 0
+        self.start_peak = 0
+        self.peak = 0
+        if self.tracing:
+            if _budget_tracing:
+                tracemalloc.reset_peak()
+            self.baseline, self.start_peak = tracemalloc.get_traced_memory()
+
+    def sample(self) -> None:
+        if self.tracing and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if peak > self.start_peak:
+                current = max(current, peak)
+            self.peak = max(self.peak, current - self.baseline)
+
+    @property
+    def peak_kb(self) -> Optional[float]:
+        self.sample()
+        return round(self.peak / 1024, 1) if self.tracing else None
@@ -0,0 +1,171 @@
+import bisect
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import CrawlSession, EventCounter, StageMetric
+
+# Górne granice przedziałów histogramów (s), jak w klientach Prometheusa;
+# ostatni licznik to przedział +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGES = (
+    'queue_wait',
+    'dns',
+    'first_byte',
+    'download',
+    'decode',
+    'parse',
+    'extract_embedded',
+    'extract_title',
+    'extract_content',
+    'extract_plain_text',
+    'extract_published_date',
+    'parse_date',
+    'db_write',
+    'total',
+)
+
+# Zdarzenia liczone per domena (EventCounter, crawler_events_total na /metrics)
+EVENTS = (
+    # Kodowanie odgadnięte - bez deklaracji strony i bez kodowania zapamiętanego
+    # dla domeny; stosunek do licznika etapu decode to odsetek odgadnięć
+    'decode_fallback',
+)
+
+def empty_histogram() -> Dict:
+    return {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0, 'count': 0}
+
+def observe(histogram: Dict, seconds: float) -> None:
+    histogram['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+    histogram['sum'] += seconds
+    histogram['count'] += 1
+
+def merge(target: Dict, source: Dict) -> Dict:
+    target['buckets'] = [a + b for a, b in zip(target['buckets'], source['buckets'])]
+    target['sum'] += source['sum']
+    target['count'] += source['count']
+    return target
+
+class StageTimer:
+    # Czasy etapów jednego pobrania; etap mierzony kilka razy (np. parse_date)
+    # jest sumowany. Obok czasu rzeczywistego zbierany jest czas CPU wątku,
+    # niezależny od opóźnień sieci i innych wątków procesu.
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.cpu_timings: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.timings[stage] = self.timings.get(stage, 0.0) + max(seconds, 0.0)
+
+    def add_cpu(self, stage: str, seconds: float) -> None:
+        self.cpu_timings[stage] = self.cpu_timings.get(stage, 0.0) + max(seconds, 0.0)
+
+    @contextmanager
+    def stage(self, stage: str):
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+            self.add_cpu(stage, time.thread_time() - cpu_started)
+
+    def rounded(self) -> Dict[str, float]:
+        return {stage: round(seconds, 6) for stage, seconds in self.timings.items()}
+
+class MetricsRecorder:
+    # Histogramy per domena i etap zbierane w pamięci workera i okresowo
+    # dopisywane do bazy: globalnie (StageMetric, dla /metrics) oraz do sesji
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.domains = defaultdict(lambda: defaultdict(empty_histogram))
+        self.sessions = defaultdict(lambda: defaultdict(lambda: defaultdict(empty_histogram)))
+        self.events = defaultdict(lambda: defaultdict(int))
+
+    def record(self, domain: str, timings: Dict[str, float], session_id: Optional[int] = None,
+               events: Optional[Dict[str, int]] = None) -> None:
+        for stage, seconds in timings.items():
+            observe(self.domains[domain][stage], seconds)
+            if session_id:
+                observe(self.sessions[session_id][domain][stage], seconds)
+        for name, count in (events or {}).items():
+            self.events[domain][name] += count
+
+    def flush(self) -> None:
+        if not self.domains and not self.events:
+            return
+        with transaction.atomic():
+            for domain, events in self.events.items():
+                for name, count in events.items():
+                    counter, created = EventCounter.objects.get_or_create(domain=domain, name=name)
+                    EventCounter.objects.filter(pk=counter.pk).update(value=F('value') + count)
+
+            for domain, stages in self.domains.items():
+                for stage, histogram in stages.items():
+                    metric, created = StageMetric.objects.select_for_update().get_or_create(
+                        domain=domain,
+                        stage=stage,
+                        defaults={'buckets': empty_histogram()['buckets']}
+                    )
+                    merged = merge(
+                        {'buckets': metric.buckets, 'sum': metric.total_seconds, 'count': metric.count},
+                        histogram
+                    )
+                    metric.buckets = merged['buckets']
+                    metric.total_seconds = merged['sum']
+                    metric.count = merged['count']
+                    metric.save()
+
+            for session in CrawlSession.objects.select_for_update().filter(pk__in=list(self.sessions)):
+                metrics = session.metrics or {}
+                for domain, stages in self.sessions[session.pk].items():
+                    for stage, histogram in stages.items():
+                        merge(metrics.setdefault(domain, {}).setdefault(stage, empty_histogram()), histogram)
+                CrawlSession.objects.filter(pk=session.pk).update(metrics=metrics)
+        self.reset()
+
+def _labels(**labels) -> str:
+    escaped = {
+        key: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        for key, value in labels.items()
+    }
+    return ','.join(f'{key}="{value}"' for key, value in escaped.items())
+
+def render_histograms(metrics: List[StageMetric]) -> List[str]:
+    lines = [
+        '# HELP crawler_stage_duration_seconds Czas etapów crawlowania per domena',
+        '# TYPE crawler_stage_duration_seconds histogram',
+    ]
+    for metric in metrics:
+        labels = _labels(domain=metric.domain, stage=metric.stage)
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), metric.buckets):
+            cumulative += count
+            lines.append(f'crawler_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'crawler_stage_duration_seconds_sum{{{labels}}} {metric.total_seconds}')
+        lines.append(f'crawler_stage_duration_seconds_count{{{labels}}} {metric.count}')
+    return lines
+
+def render_counters(counters: List[EventCounter]) -> List[str]:
+    lines = [
+        '# HELP crawler_events_total Liczba zdarzeń crawlowania per domena',
+        '# TYPE crawler_events_total counter',
+    ]
+    for counter in counters:
+        lines.append(f'crawler_events_total{{{_labels(domain=counter.domain, event=counter.name)}}} {counter.value}')
+    return lines
+
+def render_gauge(name: str, help_text: str, label: str, values: Dict[str, int]) -> List[str]:
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    for key, value in sorted(values.items()):
+        lines.append(f'{name}{{{_labels(**{label: key})}}} {value}')
+    return lines
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0002_article_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nazwa')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Wersja')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Zaktualizowano')),
+            ],
+            options={
+                'verbose_name': 'Wersja danych',
+                'verbose_name_plural': 'Wersje danych',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0003_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawlsession',
+            name='error_message',
+            field=models.TextField(blank=True, verbose_name='Komunikat błędu'),
+        ),
+        migrations.AddField(
+            model_name='crawlsession',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Ostatni sygnał workera'),
+        ),
+        migrations.AddField(
+            model_name='crawlsession',
+            name='worker_id',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Worker'),
+        ),
+        migrations.AlterField(
+            model_name='crawlsession',
+            name='website',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='crawler.newswebsite', verbose_name='Serwis'),
+        ),
+    ]
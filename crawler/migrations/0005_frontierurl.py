@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0004_crawlsession_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrontierURL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1000, unique=True, verbose_name='URL')),
+                ('state', models.CharField(choices=[('queued', 'W kolejce'), ('in_flight', 'W trakcie'), ('done', 'Zakończony'), ('failed', 'Błąd')], default='queued', max_length=20, verbose_name='Stan')),
+                ('priority', models.IntegerField(default=0, verbose_name='Priorytet')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Liczba prób')),
+                ('next_eligible_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Najwcześniejsze pobranie')),
+                ('last_error', models.TextField(blank=True, verbose_name='Ostatni błąd')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Utworzono')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Zaktualizowano')),
+                ('crawl_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='crawler.crawlsession', verbose_name='Sesja')),
+                ('website', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='crawler.newswebsite', verbose_name='Serwis')),
+            ],
+            options={
+                'verbose_name': 'URL do crawlowania',
+                'verbose_name_plural': 'Kolejka URL-i (frontier)',
+                'ordering': ['-priority', 'next_eligible_at'],
+                'indexes': [models.Index(fields=['state', '-priority', 'next_eligible_at'], name='crawler_fro_state_9a2eeb_idx'), models.Index(fields=['crawl_session', 'state'], name='crawler_fro_crawl_s_a8ca72_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0005_frontierurl'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='frontierurl',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Dzierżawa wygasa'),
+        ),
+        migrations.AddField(
+            model_name='frontierurl',
+            name='lease_owner',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Worker dzierżawiący'),
+        ),
+        migrations.AddIndex(
+            model_name='frontierurl',
+            index=models.Index(fields=['state', 'lease_expires_at'], name='crawler_fro_state_526960_idx'),
+        ),
+    ]
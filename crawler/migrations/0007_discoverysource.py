@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0006_frontierurl_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscoverySource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1000, unique=True, verbose_name='URL źródła')),
+                ('kind', models.CharField(choices=[('sitemap', 'Sitemap'), ('feed', 'RSS/Atom')], default='sitemap', max_length=20, verbose_name='Rodzaj')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Aktywne')),
+                ('etag', models.CharField(blank=True, max_length=500, verbose_name='ETag')),
+                ('last_modified', models.CharField(blank=True, max_length=100, verbose_name='Last-Modified')),
+                ('last_seen_lastmod', models.DateTimeField(blank=True, null=True, verbose_name='Najnowszy lastmod')),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True, verbose_name='Ostatnio sprawdzono')),
+                ('last_status_code', models.PositiveIntegerField(blank=True, null=True, verbose_name='Ostatni kod HTTP')),
+                ('last_error', models.TextField(blank=True, verbose_name='Ostatni błąd')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Utworzono')),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='crawler.discoverysource', verbose_name='Indeks sitemap')),
+                ('website', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crawler.newswebsite', verbose_name='Serwis')),
+            ],
+            options={
+                'verbose_name': 'Źródło odkrywania URL-i',
+                'verbose_name_plural': 'Źródła odkrywania URL-i',
+                'ordering': ['website', 'url'],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0007_discoverysource'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='frontierurl',
+            name='change_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Liczba zmian treści'),
+        ),
+        migrations.AddField(
+            model_name='frontierurl',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Skrót treści'),
+        ),
+        migrations.AddField(
+            model_name='frontierurl',
+            name='fetch_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Liczba pobrań'),
+        ),
+        migrations.AddField(
+            model_name='frontierurl',
+            name='last_changed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Ostatnia zmiana treści'),
+        ),
+        migrations.AddField(
+            model_name='frontierurl',
+            name='last_fetched_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Ostatnio pobrano'),
+        ),
+        migrations.AddField(
+            model_name='frontierurl',
+            name='revisit_interval',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Odstęp ponownej wizyty (s)'),
+        ),
+        migrations.AddIndex(
+            model_name='frontierurl',
+            index=models.Index(fields=['state', 'next_eligible_at'], name='crawler_fro_state_502528_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='frontierurl',
+            index=models.Index(fields=['last_fetched_at'], name='crawler_fro_last_fe_bcda82_idx'),
+        ),
+    ]
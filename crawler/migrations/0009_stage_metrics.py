@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0008_frontierurl_revisits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawlsession',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Czasy etapów (histogramy)'),
+        ),
+        migrations.CreateModel(
+            name='StageMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=200, verbose_name='Domena')),
+                ('stage', models.CharField(max_length=50, verbose_name='Etap')),
+                ('buckets', models.JSONField(default=list, verbose_name='Liczniki przedziałów')),
+                ('total_seconds', models.FloatField(default=0, verbose_name='Suma czasów (s)')),
+                ('count', models.PositiveBigIntegerField(default=0, verbose_name='Liczba pomiarów')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Zaktualizowano')),
+            ],
+            options={
+                'verbose_name': 'Czas etapu crawlowania',
+                'verbose_name_plural': 'Czasy etapów crawlowania',
+                'ordering': ['domain', 'stage'],
+                'unique_together': {('domain', 'stage')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0009_stage_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawlsession',
+            name='profile_dir',
+            field=models.CharField(blank=True, max_length=500, verbose_name='Katalog profilowania'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0010_crawlsession_profile_dir'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='frontierurl',
+            name='timeout_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Przekroczenia limitu ekstrakcji'),
+        ),
+        migrations.AddField(
+            model_name='newswebsite',
+            name='parse_timeouts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Przekroczenia limitu ekstrakcji'),
+        ),
+        migrations.AddField(
+            model_name='newswebsite',
+            name='quarantined_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Kwarantanna do'),
+        ),
+        migrations.AlterField(
+            model_name='frontierurl',
+            name='state',
+            field=models.CharField(choices=[('queued', 'W kolejce'), ('in_flight', 'W trakcie'), ('done', 'Zakończony'), ('failed', 'Błąd'), ('quarantined', 'Kwarantanna')], default='queued', max_length=20, verbose_name='Stan'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class CreatePartitionedModel(migrations.CreateModel):
+    # Na PostgreSQL tabela jest partycjonowana zakresami scraped_at (partycje
+    # miesięczne tworzy crawler.retention). Klucz główny tabeli partycjonowanej
+    # musi zawierać kolumnę partycjonującą, dlatego w bazie jest to (id, scraped_at).
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+        model = to_state.apps.get_model(app_label, self.name)
+        quote = schema_editor.quote_name
+        sql, params = schema_editor.table_sql(model)
+        sql = sql.replace(' NOT NULL PRIMARY KEY', ' NOT NULL', 1)
+        sql = sql[:-1] + (
+            f", PRIMARY KEY ({quote('id')}, {quote('scraped_at')}))"
+            f" PARTITION BY RANGE ({quote('scraped_at')})"
+        )
+        schema_editor.execute(sql, params or None)
+        schema_editor.deferred_sql.extend(schema_editor._model_indexes_sql(model))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0011_parse_deadlines'),
+    ]
+
+    operations = [
+        CreatePartitionedModel(
+            name='ArticleArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID artykułu')),
+                ('url', models.URLField(max_length=1000, verbose_name='URL artykułu')),
+                ('title', models.CharField(max_length=500, verbose_name='Tytuł artykułu')),
+                ('original_content', models.TextField(verbose_name='Oryginalna treść artykułu (HTML)')),
+                ('plain_text_content', models.TextField(verbose_name='Treść artykułu (plain text)')),
+                ('published_date_normalized', models.DateTimeField(verbose_name='Data publikacji (dd.mm.yyyy HH:mm:ss)')),
+                ('status', models.CharField(choices=[('success', 'Sukces'), ('failed', 'Błąd'), ('skipped', 'Pominięto')], default='success', max_length=20, verbose_name='Status')),
+                ('http_status_code', models.PositiveIntegerField(blank=True, null=True, verbose_name='Kod odpowiedzi HTTP')),
+                ('response_time', models.FloatField(blank=True, null=True, verbose_name='Czas odpowiedzi (s)')),
+                ('content_length', models.PositiveIntegerField(blank=True, null=True, verbose_name='Długość zawartości')),
+                ('error_message', models.TextField(blank=True, verbose_name='Komunikat błędu')),
+                ('scraped_at', models.DateTimeField(verbose_name='Scrapowano')),
+                ('updated_at', models.DateTimeField(verbose_name='Zaktualizowano')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Zarchiwizowano')),
+                ('metadata', models.JSONField(blank=True, default=dict, verbose_name='Metadane')),
+                ('tags', models.JSONField(blank=True, default=list, verbose_name='Tagi')),
+                ('crawl_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='crawler.crawlsession', verbose_name='Sesja')),
+                ('website', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crawler.newswebsite', verbose_name='Serwis')),
+            ],
+            options={
+                'verbose_name': 'Zarchiwizowany artykuł',
+                'verbose_name_plural': 'Zarchiwizowane artykuły',
+                'ordering': ['-scraped_at'],
+                'indexes': [models.Index(fields=['url'], name='crawler_archive_url_idx'), models.Index(fields=['scraped_at'], name='crawler_archive_scraped_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0012_articlearchive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='crawler_art_url_0d7bd2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='crawler_art_status_4a65e0_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='crawler_art_publish_c636a2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='crawler_art_scraped_004737_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='crawler_art_website_8bb833_idx',
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='website',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='crawler.newswebsite', verbose_name='Serwis'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-published_date_normalized'], name='article_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['status', '-published_date_normalized'], name='article_status_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['website', '-published_date_normalized'], name='article_website_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['scraped_at', 'id'], name='article_scraped_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:50
+
+from django.db import migrations, models
+
+
+def move_tagging_watermark(apps, schema_editor):
+    # Znacznik tagowania był wcześniej wierszem 'tagging' w DataVersion
+    DataVersion = apps.get_model('crawler', 'DataVersion')
+    TaggingState = apps.get_model('crawler', 'TaggingState')
+    legacy = DataVersion.objects.filter(name='tagging').first()
+    if legacy:
+        TaggingState.objects.create(pk=1, last_article_id=legacy.version)
+        legacy.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0014_article_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaggingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_article_id', models.PositiveBigIntegerField(default=0, verbose_name='ID ostatniego otagowanego artykułu')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Zaktualizowano')),
+            ],
+            options={
+                'verbose_name': 'Stan tagowania',
+                'verbose_name_plural': 'Stan tagowania',
+            },
+        ),
+        migrations.AlterField(
+            model_name='articletag',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, unique=True, verbose_name='Slug'),
+        ),
+        migrations.RunPython(move_tagging_watermark, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0015_taggingstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=200, verbose_name='Domena')),
+                ('name', models.CharField(max_length=50, verbose_name='Zdarzenie')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Liczba zdarzeń')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Zaktualizowano')),
+            ],
+            options={
+                'verbose_name': 'Licznik zdarzeń crawlowania',
+                'verbose_name_plural': 'Liczniki zdarzeń crawlowania',
+                'ordering': ['domain', 'name'],
+                'unique_together': {('domain', 'name')},
+            },
+        ),
+    ]
@@ -8,6 +8,8 @@ class NewsWebsite(models.Model):
     name = models.CharField(max_length=200, verbose_name="Nazwa serwisu")
     description = models.TextField(blank=True, verbose_name="Opis")
     is_active = models.BooleanField(default=True, verbose_name="Aktywna")
+    parse_timeouts = models.PositiveIntegerField(default=0, verbose_name="Przekroczenia limitu ekstrakcji")
+    quarantined_until = models.DateTimeField(null=True, blank=True, verbose_name="Kwarantanna do")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")
     
     class Meta:
@@ -17,6 +19,9 @@ class NewsWebsite(models.Model):
     
     def __str__(self):
         return self.name
+    
+    def is_quarantined(self):
+        return bool(self.quarantined_until and self.quarantined_until > timezone.now())
 
 class CrawlSession(models.Model):
     STATUS_CHOICES = [
@@ -28,12 +33,17 @@ class CrawlSession(models.Model):
     ]
     
     name = models.CharField(max_length=200, verbose_name="Nazwa sesji")
-    website = models.ForeignKey(NewsWebsite, on_delete=models.CASCADE, verbose_name="Serwis")
+    website = models.ForeignKey(NewsWebsite, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Serwis")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Status")
     started_at = models.DateTimeField(null=True, blank=True, verbose_name="Rozpoczęto")
     completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Zakończono")
     total_articles = models.PositiveIntegerField(default=0, verbose_name="Całkowita liczba artykułów")
     scraped_articles = models.PositiveIntegerField(default=0, verbose_name="Scrapowane artykuły")
+    worker_id = models.CharField(max_length=200, blank=True, verbose_name="Worker")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Ostatni sygnał workera")
+    error_message = models.TextField(blank=True, verbose_name="Komunikat błędu")
+    metrics = models.JSONField(default=dict, blank=True, verbose_name="Czasy etapów (histogramy)")
+    profile_dir = models.CharField(max_length=500, blank=True, verbose_name="Katalog profilowania")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")
     
     class Meta:
@@ -42,7 +52,9 @@ class CrawlSession(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.name} - {self.website.name}"
+        if self.website:
+            return f"{self.name} - {self.website.name}"
+        return self.name
     
     def get_progress_percentage(self):
         if self.total_articles == 0:
@@ -59,7 +71,7 @@ class Article(models.Model):
         ('skipped', 'Pominięto'),
     ]
     
-    website = models.ForeignKey(NewsWebsite, on_delete=models.CASCADE, verbose_name="Serwis")
+    website = models.ForeignKey(NewsWebsite, on_delete=models.CASCADE, db_index=False, verbose_name="Serwis")
     crawl_session = models.ForeignKey(CrawlSession, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Sesja")
     
     url = models.URLField(max_length=1000, unique=True, verbose_name="URL artykułu")
@@ -78,6 +90,7 @@ class Article(models.Model):
     error_message = models.TextField(blank=True, verbose_name="Komunikat błędu")
     
     scraped_at = models.DateTimeField(auto_now_add=True, verbose_name="Scrapowano")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Zaktualizowano")
     
     metadata = models.JSONField(default=dict, blank=True, verbose_name="Metadane")
     
@@ -85,12 +98,16 @@ class Article(models.Model):
         verbose_name = "Artykuł"
         verbose_name_plural = "Artykuły"
         ordering = ['-published_date_normalized']
+        # Indeksy odpowiadają zapytaniom widoków (filtr + sortowanie razem);
+        # url ma już indeks z unique, a indeks klucza obcego website zastępuje
+        # (website, data publikacji). Plany sprawdza QueryPlanTest.
         indexes = [
-            models.Index(fields=['url']),
-            models.Index(fields=['status']),
-            models.Index(fields=['published_date_normalized']),
-            models.Index(fields=['scraped_at']),
-            models.Index(fields=['website']),
+            models.Index(fields=['-published_date_normalized'], name='article_published_idx'),
+            models.Index(fields=['status', '-published_date_normalized'], name='article_status_published_idx'),
+            models.Index(fields=['website', '-published_date_normalized'], name='article_website_published_idx'),
+            models.Index(fields=['scraped_at', 'id'], name='article_scraped_idx'),
+            # Last-Modified list API i eksportów (MAX(updated_at))
+            models.Index(fields=['updated_at'], name='article_updated_idx'),
         ]
     
     def __str__(self):
@@ -112,9 +129,179 @@ class Article(models.Model):
             return self.plain_text_content[:length] + "..." if len(self.plain_text_content) > length else self.plain_text_content
         return ""
 
+class ArticleArchive(models.Model):
+    # Artykuły przeniesione z tabeli Article przez archive_articles (crawler.retention).
+    # Na PostgreSQL tabela jest partycjonowana miesięcznie po scraped_at, a klucz
+    # główny to (id, scraped_at) - id pozostaje identyfikatorem artykułu
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID artykułu")
+    website = models.ForeignKey(NewsWebsite, on_delete=models.CASCADE, verbose_name="Serwis")
+    crawl_session = models.ForeignKey(CrawlSession, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Sesja")
+    
+    url = models.URLField(max_length=1000, verbose_name="URL artykułu")
+    title = models.CharField(max_length=500, verbose_name="Tytuł artykułu")
+    
+    original_content = models.TextField(verbose_name="Oryginalna treść artykułu (HTML)")
+    plain_text_content = models.TextField(verbose_name="Treść artykułu (plain text)")
+    
+    published_date_normalized = models.DateTimeField(verbose_name="Data publikacji (dd.mm.yyyy HH:mm:ss)")
+    
+    status = models.CharField(max_length=20, choices=Article.STATUS_CHOICES, default='success', verbose_name="Status")
+    http_status_code = models.PositiveIntegerField(null=True, blank=True, verbose_name="Kod odpowiedzi HTTP")
+    response_time = models.FloatField(null=True, blank=True, verbose_name="Czas odpowiedzi (s)")
+    content_length = models.PositiveIntegerField(null=True, blank=True, verbose_name="Długość zawartości")
+    
+    error_message = models.TextField(blank=True, verbose_name="Komunikat błędu")
+    
+    scraped_at = models.DateTimeField(verbose_name="Scrapowano")
+    updated_at = models.DateTimeField(verbose_name="Zaktualizowano")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Zarchiwizowano")
+    
+    metadata = models.JSONField(default=dict, blank=True, verbose_name="Metadane")
+    tags = models.JSONField(default=list, blank=True, verbose_name="Tagi")
+    
+    class Meta:
+        verbose_name = "Zarchiwizowany artykuł"
+        verbose_name_plural = "Zarchiwizowane artykuły"
+        ordering = ['-scraped_at']
+        indexes = [
+            models.Index(fields=['url'], name='crawler_archive_url_idx'),
+            models.Index(fields=['scraped_at'], name='crawler_archive_scraped_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} ({self.scraped_at:%Y-%m})"
+
+class FrontierURL(models.Model):
+    STATE_CHOICES = [
+        ('queued', 'W kolejce'),
+        ('in_flight', 'W trakcie'),
+        ('done', 'Zakończony'),
+        ('failed', 'Błąd'),
+        ('quarantined', 'Kwarantanna'),
+    ]
+    
+    url = models.URLField(max_length=1000, unique=True, verbose_name="URL")
+    website = models.ForeignKey(NewsWebsite, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Serwis")
+    crawl_session = models.ForeignKey(CrawlSession, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Sesja")
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='queued', verbose_name="Stan")
+    priority = models.IntegerField(default=0, verbose_name="Priorytet")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Liczba prób")
+    timeout_count = models.PositiveIntegerField(default=0, verbose_name="Przekroczenia limitu ekstrakcji")
+    next_eligible_at = models.DateTimeField(default=timezone.now, verbose_name="Najwcześniejsze pobranie")
+    last_error = models.TextField(blank=True, verbose_name="Ostatni błąd")
+    lease_owner = models.CharField(max_length=200, blank=True, verbose_name="Worker dzierżawiący")
+    lease_expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Dzierżawa wygasa")
+    content_hash = models.CharField(max_length=64, blank=True, verbose_name="Skrót treści")
+    fetch_count = models.PositiveIntegerField(default=0, verbose_name="Liczba pobrań")
+    change_count = models.PositiveIntegerField(default=0, verbose_name="Liczba zmian treści")
+    last_fetched_at = models.DateTimeField(null=True, blank=True, verbose_name="Ostatnio pobrano")
+    last_changed_at = models.DateTimeField(null=True, blank=True, verbose_name="Ostatnia zmiana treści")
+    revisit_interval = models.PositiveIntegerField(null=True, blank=True, verbose_name="Odstęp ponownej wizyty (s)")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Zaktualizowano")
+    
+    class Meta:
+        verbose_name = "URL do crawlowania"
+        verbose_name_plural = "Kolejka URL-i (frontier)"
+        ordering = ['-priority', 'next_eligible_at']
+        indexes = [
+            models.Index(fields=['state', '-priority', 'next_eligible_at']),
+            models.Index(fields=['crawl_session', 'state']),
+            models.Index(fields=['state', 'lease_expires_at']),
+            models.Index(fields=['state', 'next_eligible_at']),
+            models.Index(fields=['last_fetched_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.url} ({self.state})"
+
+class DiscoverySource(models.Model):
+    KIND_CHOICES = [
+        ('sitemap', 'Sitemap'),
+        ('feed', 'RSS/Atom'),
+    ]
+    
+    website = models.ForeignKey(NewsWebsite, on_delete=models.CASCADE, verbose_name="Serwis")
+    url = models.URLField(max_length=1000, unique=True, verbose_name="URL źródła")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='sitemap', verbose_name="Rodzaj")
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, verbose_name="Indeks sitemap")
+    is_active = models.BooleanField(default=True, verbose_name="Aktywne")
+    etag = models.CharField(max_length=500, blank=True, verbose_name="ETag")
+    last_modified = models.CharField(max_length=100, blank=True, verbose_name="Last-Modified")
+    last_seen_lastmod = models.DateTimeField(null=True, blank=True, verbose_name="Najnowszy lastmod")
+    last_checked_at = models.DateTimeField(null=True, blank=True, verbose_name="Ostatnio sprawdzono")
+    last_status_code = models.PositiveIntegerField(null=True, blank=True, verbose_name="Ostatni kod HTTP")
+    last_error = models.TextField(blank=True, verbose_name="Ostatni błąd")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")
+    
+    class Meta:
+        verbose_name = "Źródło odkrywania URL-i"
+        verbose_name_plural = "Źródła odkrywania URL-i"
+        ordering = ['website', 'url']
+    
+    def __str__(self):
+        return f"{self.url} ({self.get_kind_display()})"
+
+class DataVersion(models.Model):
+    name = models.CharField(max_length=100, unique=True, verbose_name="Nazwa")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Wersja")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Zaktualizowano")
+    
+    class Meta:
+        verbose_name = "Wersja danych"
+        verbose_name_plural = "Wersje danych"
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+class TaggingState(models.Model):
+    # Postęp tag_articles --incremental; jeden wiersz (pk=1), osobno od
+    # DataVersion, która służy wyłącznie do unieważniania cache
+    last_article_id = models.PositiveBigIntegerField(default=0, verbose_name="ID ostatniego otagowanego artykułu")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Zaktualizowano")
+    
+    class Meta:
+        verbose_name = "Stan tagowania"
+        verbose_name_plural = "Stan tagowania"
+    
+    def __str__(self):
+        return f"Tagowanie do ID {self.last_article_id}"
+
+class StageMetric(models.Model):
+    domain = models.CharField(max_length=200, verbose_name="Domena")
+    stage = models.CharField(max_length=50, verbose_name="Etap")
+    buckets = models.JSONField(default=list, verbose_name="Liczniki przedziałów")
+    total_seconds = models.FloatField(default=0, verbose_name="Suma czasów (s)")
+    count = models.PositiveBigIntegerField(default=0, verbose_name="Liczba pomiarów")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Zaktualizowano")
+    
+    class Meta:
+        verbose_name = "Czas etapu crawlowania"
+        verbose_name_plural = "Czasy etapów crawlowania"
+        unique_together = ['domain', 'stage']
+        ordering = ['domain', 'stage']
+    
+    def __str__(self):
+        return f"{self.domain} / {self.stage}"
+
+class EventCounter(models.Model):
+    domain = models.CharField(max_length=200, verbose_name="Domena")
+    name = models.CharField(max_length=50, verbose_name="Zdarzenie")
+    value = models.PositiveBigIntegerField(default=0, verbose_name="Liczba zdarzeń")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Zaktualizowano")
+    
+    class Meta:
+        verbose_name = "Licznik zdarzeń crawlowania"
+        verbose_name_plural = "Liczniki zdarzeń crawlowania"
+        unique_together = ['domain', 'name']
+        ordering = ['domain', 'name']
+    
+    def __str__(self):
+        return f"{self.domain} / {self.name}"
+
 class ArticleTag(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="Nazwa tagu")
-    slug = models.SlugField(unique=True, verbose_name="Slug")
+    slug = models.SlugField(unique=True, allow_unicode=True, verbose_name="Slug")
     description = models.TextField(blank=True, verbose_name="Opis")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")
     
@@ -0,0 +1,180 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from .memory import share_tracing
+from .models import CrawlSession
+from .writer import get_writer
+
+TOP_FUNCTIONS = 50
+TOP_ALLOCATIONS = 30
+TRACEMALLOC_FRAMES = 25
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+def statement_shape(sql: str) -> str:
+    # Ten sam kształt zapytania niezależnie od wartości parametrów i długości list IN
+    shape = STRING_RE.sub('?', sql)
+    shape = NUMBER_RE.sub('?', shape)
+    shape = IN_LIST_RE.sub('IN (...)', shape)
+    return WHITESPACE_RE.sub(' ', shape).strip()
+
+def profile_directory(crawl_session: Optional[CrawlSession] = None) -> Path:
+    if crawl_session is None:
+        # Przebieg kolejki (frontier) obsługuje URL-e wielu sesji - katalog
+        # nazwany czasem startu i procesem
+        return Path(settings.CRAWLER_PROFILE_DIR) / f"frontier-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return Path(settings.CRAWLER_PROFILE_DIR) / f"session-{crawl_session.pk}"
+
+class SqlLog:
+    # execute_wrapper działa bez DEBUG=True i nie trzyma treści wszystkich zapytań,
+    # tylko agregaty per kształt zapytania. Połączenia Django są per wątek, więc
+    # wrapper trafia do każdego połączenia otwartego w trakcie przebiegu
+    # (sygnał connection_created) - także do połączenia wątku zapisującego
+
+    def __init__(self):
+        self.statements = defaultdict(lambda: {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        self.connections = []
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            shape = statement_shape(sql)
+            with self._lock:
+                stats = self.statements[shape]
+                stats['count'] += 1
+                stats['total_seconds'] += elapsed
+                stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+
+    def install(self, connection, **kwargs) -> None:
+        with self._lock:
+            if self not in connection.execute_wrappers:
+                connection.execute_wrappers.append(self)
+                self.connections.append(connection)
+
+    def uninstall(self) -> None:
+        with self._lock:
+            for connection in self.connections:
+                if self in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(self)
+            self.connections = []
+
+    def summary(self) -> Dict:
+        statements = sorted(
+            ({'statement': shape, **stats} for shape, stats in self.statements.items()),
+            key=lambda item: item['total_seconds'],
+            reverse=True
+        )
+        return {
+            'queries': sum(item['count'] for item in statements),
+            'total_seconds': round(sum(item['total_seconds'] for item in statements), 6),
+            'statements': statements,
+        }
+
+class RunProfiler:
+    # Kontekst włączający wybrane profilery na czas przebiegu scrapera i zapisujący
+    # wyniki do katalogu sesji (settings.CRAWLER_PROFILE_DIR/session-<id>/)
+
+    def __init__(self, directory: Optional[Path], profile: bool = False, trace_memory: bool = False,
+                 sql_log: bool = False):
+        self.directory = Path(directory) if directory else None
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.sql_log = sql_log
+        self.summary: Dict = {}
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sql: Optional[SqlLog] = None
+        self._started_tracing = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.profile or self.trace_memory or self.sql_log
+
+    def __enter__(self):
+        if self.sql_log:
+            self._sql = SqlLog()
+            self._sql.install(connection)
+            connection_created.connect(self._sql.install, weak=False)
+            # Wątek zapisujący (SingleWriter) ma już otwarte połączenie - po
+            # zamknięciu następny zapis uruchomi go z nowym, już śledzonym
+            get_writer().close()
+        if self.trace_memory:
+            # tracemalloc mógł już włączyć budżet pamięci - wtedy zostaje włączony po przebiegu
+            if tracemalloc.is_tracing():
+                share_tracing()
+            else:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._started_tracing = True
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._profiler:
+            self._profiler.disable()
+        if self.enabled:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        if self._profiler:
+            self._profiler.dump_stats(self.directory / 'profile.prof')
+            output = io.StringIO()
+            pstats.Stats(self._profiler, stream=output).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            (self.directory / 'profile.txt').write_text(output.getvalue(), encoding='utf-8')
+            self.summary['profile'] = str(self.directory / 'profile.prof')
+
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            ])
+            current, peak = tracemalloc.get_traced_memory()
+            if self._started_tracing:
+                tracemalloc.stop()
+            snapshot.dump(str(self.directory / 'memory.snapshot'))
+
+            lines = [f"Pamięć śledzona: bieżąca {current / 1024:.1f} KB, szczytowa {peak / 1024:.1f} KB", '']
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                lines.append(str(stat))
+            (self.directory / 'memory.txt').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+            self.summary['memory'] = {'path': str(self.directory / 'memory.txt'), 'peak_kb': round(peak / 1024, 1)}
+
+        if self._sql:
+            # Zapisy zlecone w przebiegu kończą się przed podsumowaniem
+            get_writer().close()
+            connection_created.disconnect(self._sql.install)
+            self._sql.uninstall()
+            sql_summary = self._sql.summary()
+            with open(self.directory / 'sql.json', 'w', encoding='utf-8') as handle:
+                json.dump(sql_summary, handle, ensure_ascii=False, indent=2)
+
+            lines = [f"Zapytania: {sql_summary['queries']}, łączny czas: {sql_summary['total_seconds']:.4f} s", '']
+            for item in sql_summary['statements']:
+                lines.append(f"{item['count']:>7}  {item['total_seconds']:>10.4f} s  max {item['max_seconds']:.4f} s  {item['statement']}")
+            (self.directory / 'sql.txt').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+            self.summary['sql'] = {
+                'path': str(self.directory / 'sql.txt'),
+                'queries': sql_summary['queries'],
+                'total_seconds': sql_summary['total_seconds'],
+            }
+        return False
@@ -0,0 +1,152 @@
+import contextlib
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .extractors import html_to_text
+from .models import Article
+
+FIELDS = ['title', 'plain_text_content', 'published_date_normalized']
+ROW_FIELDS = ('pk', 'url', 'original_content', 'metadata', 'scraped_at', *FIELDS)
+
+_scraper = None
+
+def _get_scraper():
+    # Jeden scraper na proces puli (inicjalizacja parsera dat jest kosztowna)
+    global _scraper
+    if _scraper is None:
+        from .scraper import ArticleScraper
+        _scraper = ArticleScraper()
+    return _scraper
+
+def _init_worker():
+    # Przy starcie przez spawn proces potomny musi sam skonfigurować Django
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+def reextract_row(row: Dict) -> Optional[Dict]:
+    # Zwraca tylko pola, które po ponownej ekstrakcji mają inną wartość
+    scraper = _get_scraper()
+    changes = {}
+
+    if row['metadata'].get('extractor'):
+        # Artykuł z osadzonego JSON-a: original_content to treść z JSON-a,
+        # tytuł i data pochodzą spoza niej i nie da się ich odtworzyć
+        plain_text = html_to_text(row['original_content'])
+        if len(plain_text) >= 50 and plain_text != row['plain_text_content']:
+            changes['plain_text_content'] = plain_text
+        return changes or None
+
+    # Daty względne ("wczoraj", "2 godziny temu") liczymy od chwili pobrania
+    scraper.date_parser.now = row['scraped_at']
+    fallback_date = scraper.date_parser.now.replace(hour=0, minute=0, second=0)
+    soup = BeautifulSoup(row['original_content'], 'html.parser')
+    try:
+        # Metody ekstrakcji logują na stdout - przy archiwum to tysiące linii
+        with contextlib.redirect_stdout(io.StringIO()):
+            title = scraper.extract_title(soup, row['url'])
+            published = scraper.extract_published_date(soup, row['url'])
+            plain_text = scraper.extract_plain_text(soup, row['url'])
+    finally:
+        soup.decompose()
+
+    if title and title != "Brak tytułu" and title[:500] != row['title']:
+        changes['title'] = title[:500]
+    if plain_text and len(plain_text.strip()) >= 50 and plain_text != row['plain_text_content']:
+        changes['plain_text_content'] = plain_text
+    if published and published != fallback_date:
+        if timezone.is_naive(published):
+            published = timezone.make_aware(published)
+        if published != row['published_date_normalized']:
+            changes['published_date_normalized'] = published
+    return changes or None
+
+def reextract_chunk(rows: List[Dict]) -> Tuple[int, List[Tuple[int, Dict]]]:
+    # Dla zmienionych wierszy zwracamy komplet pól, żeby bulk_update nie
+    # musiał doczytywać niezmienionych wartości
+    changed = []
+    for row in rows:
+        changes = reextract_row(row)
+        if changes:
+            changed.append((row['pk'], {field: changes.get(field, row[field]) for field in FIELDS}))
+    return rows[-1]['pk'], changed
+
+def iter_chunks(start_after: int = 0, chunk_size: int = 500, website: Optional[str] = None) -> Iterator[List[Dict]]:
+    # Zakresy kluczy głównych zamiast OFFSET - każde zapytanie korzysta z indeksu
+    # PK niezależnie od tego, jak daleko jesteśmy w tabeli
+    queryset = Article.objects.filter(status='success').order_by('pk')
+    if website:
+        queryset = queryset.filter(website__domain=website)
+
+    last_pk = start_after
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).values(*ROW_FIELDS)[:chunk_size])
+        if not rows:
+            return
+        last_pk = rows[-1]['pk']
+        yield rows
+
+def apply_changes(changed: List[Tuple[int, Dict]], batch_size: int = 500) -> int:
+    if not changed:
+        return 0
+    now = timezone.now()
+    articles = [Article(pk=pk, updated_at=now, **values) for pk, values in changed]
+    with transaction.atomic():
+        Article.objects.bulk_update(articles, FIELDS + ['updated_at'], batch_size=batch_size)
+    return len(articles)
+
+def reextract_articles(website: Optional[str] = None, start_after: int = 0, chunk_size: int = 500,
+                       processes: Optional[int] = None, batch_size: int = 500, dry_run: bool = False,
+                       checkpoint: Optional[Callable[[Dict], None]] = None) -> Dict:
+    processes = processes or os.cpu_count() or 1
+    stats = {'processed': 0, 'changed': 0, 'last_pk': start_after}
+
+    def handle(last_pk: int, rows: int, changed: List[Tuple[int, Dict]]):
+        stats['processed'] += rows
+        stats['changed'] += len(changed) if dry_run else apply_changes(changed, batch_size)
+        stats['last_pk'] = last_pk
+        if checkpoint:
+            checkpoint(dict(stats))
+
+    chunks = iter_chunks(start_after, chunk_size, website)
+    if processes <= 1:
+        for rows in chunks:
+            last_pk, changed = reextract_chunk(rows)
+            handle(last_pk, len(rows), changed)
+    else:
+        # Połączenia z bazą nie mogą być współdzielone przez procesy potomne
+        connections.close_all()
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context(method),
+                                 initializer=_init_worker) as pool:
+            # Przy fork wszystkie procesy startują z pierwszym zadaniem - musi to
+            # nastąpić, zanim odczyt pierwszego zakresu otworzy nowe połączenie
+            pool.submit(int).result()
+            # Ograniczona liczba zadań w locie (stała pamięć), wyniki zapisywane
+            # w kolejności zakresów - punkt wznowienia nigdy nie wyprzedza
+            # niezapisanych zmian
+            pending = deque()
+            for rows in chunks:
+                pending.append((len(rows), pool.submit(reextract_chunk, rows)))
+                if len(pending) >= processes * 2:
+                    count, future = pending.popleft()
+                    last_pk, changed = future.result()
+                    handle(last_pk, count, changed)
+            while pending:
+                count, future = pending.popleft()
+                last_pk, changed = future.result()
+                handle(last_pk, count, changed)
+
+    if stats['changed'] and not dry_run:
+        bump_data_version()
+    return stats
@@ -0,0 +1,151 @@
+import re
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .models import Article, ArticleArchive, ArticleTagRelation, FrontierURL
+
+# Pola przepisywane 1:1 z Article do ArticleArchive
+ARCHIVE_FIELDS = (
+    'id', 'website_id', 'crawl_session_id', 'url', 'title', 'original_content', 'plain_text_content',
+    'published_date_normalized', 'status', 'http_status_code', 'response_time', 'content_length',
+    'error_message', 'scraped_at', 'updated_at', 'metadata',
+)
+PARTITION_RE = re.compile(r'_p(\d{4})(\d{2})$')
+
+def cutoff(days: int) -> datetime:
+    return timezone.now() - timedelta(days=days)
+
+def partitioned() -> bool:
+    # Partycje miesięczne archiwum istnieją tylko na PostgreSQL (migracja 0012);
+    # na SQLite archiwum to zwykła tabela czyszczona partiami
+    return connection.vendor == 'postgresql'
+
+def month_start(moment: datetime) -> date:
+    return date(moment.year, moment.month, 1)
+
+def next_month(month: date) -> date:
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f'{ArticleArchive._meta.db_table}_p{month:%Y%m}'
+
+def ensure_partitions(months: Iterable[date]) -> None:
+    table = connection.ops.quote_name(ArticleArchive._meta.db_table)
+    with connection.cursor() as cursor:
+        for month in sorted(set(months)):
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(partition_name(month))} '
+                f'PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+                [month.isoformat(), next_month(month).isoformat()]
+            )
+
+def archive_partitions() -> List[date]:
+    # Miesiące istniejących partycji, od najstarszego
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = %s',
+            [ArticleArchive._meta.db_table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = []
+    for name in names:
+        match = PARTITION_RE.search(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+def _archive_batch(articles: List[Dict]) -> int:
+    ids = [article['id'] for article in articles]
+    tags = defaultdict(list)
+    for article_id, name in ArticleTagRelation.objects.filter(article_id__in=ids).values_list('article_id', 'tag__name'):
+        tags[article_id].append(name)
+
+    with transaction.atomic():
+        if partitioned():
+            ensure_partitions(month_start(article['scraped_at']) for article in articles)
+        ArticleArchive.objects.bulk_create([
+            ArticleArchive(tags=sorted(tags[article['id']]), **article) for article in articles
+        ])
+        Article.objects.filter(pk__in=ids).delete()
+        # Bez wpisu we frontierze URL nie wróci na ponowną wizytę, która
+        # utworzyłaby artykuł w Article od nowa
+        FrontierURL.objects.filter(url__in=[article['url'] for article in articles]).delete()
+    return len(ids)
+
+def archive_articles(older_than: datetime, batch_size: int = 500, pause: float = 0.1, dry_run: bool = False,
+                     progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    # Przenosi artykuły pobrane przed older_than do archiwum. Każda partia to
+    # krótka, osobna transakcja, a przerwa między partiami zostawia bazę dla
+    # scrapera - zamiast jednego DELETE blokującego tabelę na długo
+    queryset = Article.objects.filter(scraped_at__lt=older_than).order_by('pk')
+    stats = {'archived': 0, 'batches': 0}
+    if dry_run:
+        stats['archived'] = queryset.count()
+        return stats
+
+    last_pk = 0
+    while True:
+        articles = list(queryset.filter(pk__gt=last_pk).values(*ARCHIVE_FIELDS)[:batch_size])
+        if not articles:
+            break
+        last_pk = articles[-1]['id']
+        stats['archived'] += _archive_batch(articles)
+        stats['batches'] += 1
+        if progress:
+            progress(dict(stats))
+        if pause and len(articles) == batch_size:
+            time.sleep(pause)
+
+    if stats['archived']:
+        bump_data_version()
+    return stats
+
+def _drop_partitions(older_than: datetime) -> int:
+    # Partycja, która w całości jest starsza niż older_than, znika bez kasowania wierszy:
+    # DETACH i DROP zajmują chwilę niezależnie od jej rozmiaru
+    table = connection.ops.quote_name(ArticleArchive._meta.db_table)
+    dropped = 0
+    for month in archive_partitions():
+        if next_month(month) > month_start(older_than):
+            break
+        name = connection.ops.quote_name(partition_name(month))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name}')
+            cursor.execute(f'DROP TABLE {name}')
+        dropped += 1
+    return dropped
+
+def purge_archive(older_than: datetime, batch_size: int = 500, pause: float = 0.1, dry_run: bool = False,
+                  progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    # Usuwa z archiwum artykuły pobrane przed older_than
+    queryset = ArticleArchive.objects.filter(scraped_at__lt=older_than)
+    stats = {'deleted': 0, 'partitions': 0, 'batches': 0}
+    if dry_run:
+        stats['deleted'] = queryset.count()
+        return stats
+
+    if partitioned():
+        stats['partitions'] = _drop_partitions(older_than)
+
+    # Reszta (np. początek bieżącego miesiąca) - małymi partiami
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted, _ = queryset.filter(pk__in=ids).delete()
+        stats['deleted'] += deleted
+        stats['batches'] += 1
+        if progress:
+            progress(dict(stats))
+        if pause and len(ids) == batch_size:
+            time.sleep(pause)
+    return stats
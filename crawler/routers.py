@@ -0,0 +1,99 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+
+STICKY_COOKIE = 'crawler_primary_until'
+
+# Odczyty kierowane na replikę tylko wewnątrz use_replica(); scraper, workery,
+# polecenia i admin zawsze czytają z bazy głównej
+_use_replica = ContextVar('crawler_use_replica', default=False)
+_pinned = ContextVar('crawler_pinned_to_primary', default=False)
+
+def replica_alias() -> Optional[str]:
+    alias = getattr(settings, 'CRAWLER_READ_REPLICA', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+@contextmanager
+def use_replica():
+    replica = _use_replica.set(True)
+    pinned = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(pinned)
+        _use_replica.reset(replica)
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _pinned.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Po zapisie kolejne odczyty w tym samym żądaniu widzą własne zmiany
+        if _use_replica.get():
+            _pinned.set(True)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replika zawiera te same dane co baza główna
+        return True
+
+def _stream_on_replica(content):
+    # Treść odpowiedzi strumieniowej (eksporty) jest generowana już po wyjściu
+    # z widoku, więc każdy fragment pobieramy ponownie w kontekście repliki
+    iterator = iter(content)
+    while True:
+        with use_replica():
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+def read_replica(view):
+    # Widok tylko do odczytu - zapytania idą na replikę, chyba że klient
+    # niedawno coś zapisał (ReplicaStickinessMiddleware)
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replica_alias() or getattr(request, 'read_from_primary', False):
+            return view(request, *args, **kwargs)
+
+        with use_replica():
+            response = view(request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = _stream_on_replica(response.streaming_content)
+        return response
+    return wrapper
+
+class ReplicaStickinessMiddleware:
+    # Read-your-writes: po żądaniu zmieniającym dane klient przez
+    # CRAWLER_REPLICA_STICKY_SECONDS czyta z bazy głównej, zanim replika nadrobi opóźnienie
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            request.read_from_primary = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            request.read_from_primary = False
+
+        response = self.get_response(request)
+
+        if request.method not in self.SAFE_METHODS and replica_alias():
+            sticky_seconds = getattr(settings, 'CRAWLER_REPLICA_STICKY_SECONDS', 10)
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + sticky_seconds),
+                max_age=sticky_seconds,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
@@ -5,10 +5,26 @@ from datetime import datetime, timedelta
 import time
 import logging
 import re
-from typing import Dict, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from .models import NewsWebsite, Article, CrawlSession
+from . import frontier
+from .cache import bump_data_version
+from .encoding import DecodedPage, decode_html
+from .extractors import extract_embedded
+from .isolation import ExtractionTimeout, deadline, isolation_available, record_site_timeout, run_isolated, signals_available
+from .memory import PageMemory, shared_budget
+from .metrics import MetricsRecorder, StageTimer
+from .models import NewsWebsite, Article, ArticleArchive, CrawlSession
+from .transport import timed, timed_session
+from .writer import get_writer
 
 logger = logging.getLogger(__name__)
 
@@ -145,6 +161,54 @@ class UniversalDateParser:
         
         return None
 
+@dataclass(slots=True)
+class ScrapeResult:
+    # Zwięzły wynik jednego URL-a - bez treści artykułu, która jest już w bazie
+    url: str
+    status: str
+    article_id: Optional[int] = None
+    title: str = ''
+    published_date: str = ''
+    error_message: str = ''
+    duration: float = 0.0
+    peak_memory_kb: Optional[float] = None
+    
+    @classmethod
+    def from_article_data(cls, url: str, article_data: Dict, article: Optional[Article] = None) -> 'ScrapeResult':
+        status = article_data['status']
+        return cls(
+            url=url,
+            status=status,
+            article_id=article.id if article and status == 'success' else None,
+            title=article.title if article and status == 'success' else '',
+            published_date=article.get_published_date_formatted() if article and status == 'success' else '',
+            error_message=article_data.get('error_message', '') if status == 'failed' else '',
+            duration=round(article_data.get('timings', {}).get('total', 0.0), 6),
+            peak_memory_kb=article_data.get('peak_memory_kb')
+        )
+    
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+@dataclass(slots=True)
+class ScrapeStats:
+    total: int = 0
+    successful: int = 0
+    failed: int = 0
+    skipped: int = 0
+    
+    def add(self, result: ScrapeResult) -> None:
+        self.total += 1
+        if result.status == 'success':
+            self.successful += 1
+        elif result.status == 'skipped':
+            self.skipped += 1
+        else:
+            self.failed += 1
+    
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
 class ArticleScraper:
     
     def __init__(self):
@@ -158,6 +222,13 @@ class ArticleScraper:
             'Upgrade-Insecure-Requests': '1',
         }
         self.date_parser = UniversalDateParser()
+        self.http = timed_session()
+        self.metrics = MetricsRecorder()
+        self.memory_budget = shared_budget()
+        self.writer = get_writer()
+        self._timer = StageTimer()
+        self._events: Dict[str, int] = {}
+        self._page_memory = PageMemory()
         
         self.target_urls = [
             "https://galicjaexpress.pl/ford-c-max-jaki-silnik-benzynowy-wybrac-aby-zaoszczedzic-na-paliwie",
@@ -168,7 +239,18 @@ class ArticleScraper:
     
     def get_page_content(self, url: str) -> Tuple[Optional[requests.Response], str]:
         try:
-            response = requests.get(url, headers=self.session_headers, timeout=60)
+            # DNS mierzy połączenie urllib3 (transport.py); 'first_byte' to reszta
+            # czasu do nagłówków: połączenie TCP/TLS i oczekiwanie na serwer
+            dns_before = self._timer.timings.get('dns', 0.0)
+            started = time.perf_counter()
+            cpu_started = time.thread_time()
+            with timed(self._timer):
+                response = self.http.get(url, headers=self.session_headers, timeout=60)
+            total = time.perf_counter() - started
+            dns = self._timer.timings.get('dns', 0.0) - dns_before
+            self._timer.add('first_byte', response.elapsed.total_seconds() - dns)
+            self._timer.add('download', total - response.elapsed.total_seconds())
+            self._timer.add_cpu('download', time.thread_time() - cpu_started)
             response.raise_for_status()
             return response, ""
         except requests.exceptions.Timeout:
@@ -192,10 +274,33 @@ class ArticleScraper:
             print(f"BLAD: {error_msg}")
             return None, error_msg
     
-    def scrape_article(self, url: str) -> Dict:
+    def scrape_article(self, url: str, refresh: bool = False, isolate: bool = False) -> Dict:
+        self._timer = StageTimer()
+        self._events = {}
+        self._page_memory = PageMemory()
+        with self._timer.stage('total'):
+            article_data = self._scrape_article(url, refresh, isolate)
+        
+        article_data['timings'] = self._timer.timings
+        article_data['cpu_timings'] = self._timer.cpu_timings
+        article_data['events'] = self._events
+        peak_memory_kb = self._page_memory.peak_kb
+        if peak_memory_kb is not None:
+            article_data['peak_memory_kb'] = peak_memory_kb
+        if article_data['status'] == 'success':
+            metadata = article_data.setdefault('metadata', {})
+            metadata['timings'] = self._timer.rounded()
+            if peak_memory_kb is not None:
+                metadata['peak_memory_kb'] = peak_memory_kb
+        return article_data
+    
+    def _scrape_article(self, url: str, refresh: bool, isolate: bool = False) -> Dict:
         print(f"SCRAPOWANIE: {url}")
         
-        if Article.objects.filter(url=url).exists():
+        # Artykuł przeniesiony do archiwum też był już pobrany - również przy
+        # ponownej wizycie nie wraca do tabeli Article
+        if ((not refresh and Article.objects.filter(url=url).exists())
+                or ArticleArchive.objects.filter(url=url).exists()):
             print(f"POMINIETO: Artykuł już istnieje, pomijam: {url}")
             return {
                 'status': 'skipped',
@@ -211,18 +316,29 @@ class ArticleScraper:
                 'url': url
             }
         
+        self._page_memory.sample()
+        
         try:
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Dekodowanie z BOM, nagłówków, kodowania domeny i <meta charset> - parser i ekstraktory
+            # dostają gotowy tekst zamiast zgadywać kodowanie z całego dokumentu
+            with self._timer.stage('decode'):
+                decoded = decode_html(response.content, response.headers.get('Content-Type', ''), urlparse(url).netloc)
+            if decoded.fallback:
+                self._events['decode_fallback'] = self._events.get('decode_fallback', 0) + 1
             
-            title = self.extract_title(soup, url)
-            original_content = self.extract_content(soup, url)
-            plain_text_content = self.extract_plain_text(soup, url)
-            published_date = self.extract_published_date(soup, url)
+            # W trybie budżetu pamięci ekstrakcja czeka, aż sparsowane dokumenty
+            # innych wątków zwolnią miejsce
+            with self.memory_budget.reserve(len(response.content)):
+                embedded, extracted = self._extract_page(decoded.text, url, isolate)
+            if embedded:
+                print(f"SUKCES: Pomyślnie zescrapowano ({embedded['extractor']}): {embedded['title']}")
+                return self._embedded_result(url, response, embedded, decoded)
+            title, original_content, plain_text_content, published_date = extracted
             
             if not title or title == "Brak tytułu":
                 raise Exception("Nie udało się wyciągnąć tytułu")
             
-            if not plain_text_content or len(plain_text_content.strip()) < 50:
+            if not self._has_content(plain_text_content):
                 raise Exception("Treść artykułu jest za krótka lub pusta")
             
             print(f"SUKCES: Pomyślnie zescrapowano: {title}")
@@ -236,9 +352,20 @@ class ArticleScraper:
                 'published_date_normalized': published_date,
                 'http_status_code': response.status_code,
                 'response_time': response.elapsed.total_seconds(),
-                'content_length': len(response.content)
+                'content_length': len(response.content),
+                'metadata': {'charset': decoded.charset, 'charset_source': decoded.source}
             }
             
+        except ExtractionTimeout as e:
+            error_msg = f"{str(e)}: {url}"
+            logger.error(error_msg)
+            print(f"BLAD: {error_msg}")
+            return {
+                'status': 'failed',
+                'error_message': error_msg,
+                'url': url,
+                'timed_out': True
+            }
         except Exception as e:
             error_msg = f"Błąd podczas parsowania {url}: {str(e)}"
             logger.error(error_msg)
@@ -249,6 +376,132 @@ class ArticleScraper:
                 'url': url
             }
     
+    def _extract_page(self, text: str, url: str, isolate: bool = False) -> Tuple:
+        # Ekstrakcja z limitem czasu: w głównym wątku przerywana sygnałem, a dla
+        # stron podejrzanych (lub poza głównym wątkiem) w procesie potomnym,
+        # który można zabić nawet wtedy, gdy utknął
+        wall_seconds = getattr(settings, 'CRAWLER_PARSE_WALL_SECONDS', 0)
+        cpu_seconds = getattr(settings, 'CRAWLER_PARSE_CPU_SECONDS', 0)
+        limited = wall_seconds or cpu_seconds
+        
+        if limited and isolation_available() and (isolate or not signals_available()):
+            extracted, timings, cpu_timings = run_isolated(
+                self._extract_isolated, text, url,
+                wall_seconds=wall_seconds, cpu_seconds=cpu_seconds
+            )
+            for stage, seconds in timings.items():
+                self._timer.add(stage, seconds)
+            for stage, seconds in cpu_timings.items():
+                self._timer.add_cpu(stage, seconds)
+            return extracted
+        
+        with deadline(wall_seconds, cpu_seconds):
+            return self._extract(text, url)
+    
+    def _extract_isolated(self, text: str, url: str) -> Tuple:
+        # Uruchamiane w procesie potomnym - czasy etapów wracają do rodzica.
+        # Własna sesja HTTP: połączeń odziedziczonych po rodzicu nie wolno używać
+        self._timer = StageTimer()
+        self.http = timed_session()
+        return self._extract(text, url), self._timer.timings, self._timer.cpu_timings
+    
+    def _extract(self, text: str, url: str) -> Tuple:
+        # Zwraca (embedded, None) albo (None, pola z DOM). Treść osadzona w stronie
+        # jako JSON (SSR/SPA) to szybka ścieżka bez budowania drzewa, ale też może
+        # utknąć (duży JSON, dociąganie pliku z treścią), więc działa w tym samym limicie
+        with self._timer.stage('extract_embedded'):
+            embedded = extract_embedded(text, url)
+        self._page_memory.sample()
+        if embedded:
+            return embedded, None
+        
+        extracted = self._extract_dom(text, url)
+        title, original_content, plain_text_content, published_date = extracted
+        if title and title != "Brak tytułu" and self._has_content(plain_text_content):
+            return None, extracted
+        
+        # DOM bez treści (powłoka SPA) - dopiero teraz dowolny JSON w <script>
+        # i dociąganie pliku JSON zapowiedzianego w <link>
+        with self._timer.stage('extract_embedded'):
+            embedded = extract_embedded(text, url, fetch=self._fetch_embedded, fallback=True)
+        self._page_memory.sample()
+        if embedded:
+            return embedded, None
+        return None, extracted
+    
+    def _has_content(self, plain_text_content: Optional[str]) -> bool:
+        return bool(plain_text_content) and len(plain_text_content.strip()) >= 50
+    
+    def _fetch_embedded(self, url: str) -> Tuple[Optional[requests.Response], str]:
+        # Dodatkowe żądanie do tego samego serwisu: z odstępem jak między
+        # stronami i z osobnym licznikiem, by nie doliczać go do etapów
+        # pobrania strony (czas i tak wchodzi w 'extract_embedded')
+        delay = getattr(settings, 'CRAWLER_EMBEDDED_FETCH_DELAY', 1.0)
+        if delay:
+            time.sleep(delay)
+        timer, self._timer = self._timer, StageTimer()
+        try:
+            return self.get_page_content(url)
+        finally:
+            self._timer = timer
+    
+    def _extract_dom(self, text: str, url: str) -> Tuple:
+        with self._timer.stage('parse'):
+            soup = BeautifulSoup(text, 'html.parser')
+        try:
+            with self._timer.stage('extract_title'):
+                title = self.extract_title(soup, url)
+            with self._timer.stage('extract_content'):
+                original_content = self.extract_content(soup, url)
+            with self._timer.stage('extract_plain_text'):
+                plain_text_content = self.extract_plain_text(soup, url)
+            with self._timer.stage('extract_published_date'):
+                published_date = self.extract_published_date(soup, url)
+            return title, original_content, plain_text_content, published_date
+        finally:
+            self._page_memory.sample()
+            # Drzewo ma cykle referencji (rodzic <-> dzieci), więc bez
+            # decompose() zwolniłby je dopiero cykliczny GC
+            soup.decompose()
+            del soup
+    
+    def _embedded_result(self, url: str, response: requests.Response, embedded: Dict,
+                         decoded: DecodedPage) -> Dict:
+        published_date = None
+        if isinstance(embedded.get('published'), str):
+            # parse_datetime zgłasza ValueError dla niemożliwych dat (np. 2024-02-30) -
+            # taka data nie może przerwać zapisu całego artykułu
+            try:
+                published_date = parse_datetime(embedded['published'])
+            except ValueError:
+                published_date = None
+            if published_date is None:
+                try:
+                    published_date = self._parse_date(embedded['published'])
+                except ValueError:
+                    published_date = None
+        
+        return {
+            'status': 'success',
+            'url': url,
+            'title': embedded['title'][:500],
+            'original_content': embedded['content'],
+            'plain_text_content': embedded['plain_text'],
+            'published_date_normalized': published_date or self.date_parser.now.replace(hour=0, minute=0, second=0),
+            'http_status_code': response.status_code,
+            'response_time': response.elapsed.total_seconds(),
+            'content_length': len(response.content),
+            'metadata': {
+                'extractor': embedded['extractor'],
+                'charset': decoded.charset,
+                'charset_source': decoded.source
+            }
+        }
+    
+    def _parse_date(self, value: str) -> datetime:
+        with self._timer.stage('parse_date'):
+            return self.date_parser.parse_date(value)
+    
     def extract_title(self, soup: BeautifulSoup, url: str) -> str:
         try:
             title_selectors = [
@@ -388,13 +641,13 @@ class ArticleScraper:
                 if date_elem:
                     datetime_attr = date_elem.get('datetime')
                     if datetime_attr:
-                        parsed_date = self.date_parser.parse_date(datetime_attr)
+                        parsed_date = self._parse_date(datetime_attr)
                         if parsed_date != self.date_parser.now.replace(hour=0, minute=0, second=0):
                             return parsed_date
                     
                     date_text = date_elem.get_text().strip()
                     if date_text:
-                        parsed_date = self.date_parser.parse_date(date_text)
+                        parsed_date = self._parse_date(date_text)
                         if parsed_date != self.date_parser.now.replace(hour=0, minute=0, second=0):
                             return parsed_date
             
@@ -410,7 +663,7 @@ class ArticleScraper:
                 if meta_elem:
                     content = meta_elem.get('content')
                     if content:
-                        parsed_date = self.date_parser.parse_date(content)
+                        parsed_date = self._parse_date(content)
                         if parsed_date != self.date_parser.now.replace(hour=0, minute=0, second=0):
                             return parsed_date
             
@@ -421,98 +674,306 @@ class ArticleScraper:
             print(f"Błąd podczas wyciągania daty z {url}: {str(e)}")
             return self.date_parser.now.replace(hour=0, minute=0, second=0)
     
-    def scrape_all_articles(self) -> Dict:
+    def get_website(self, url: str) -> NewsWebsite:
+        domain = urlparse(url).netloc
+        website, created = NewsWebsite.objects.get_or_create(
+            domain=domain,
+            defaults={
+                'name': domain,
+                'url': f"https://{domain}",
+                'description': f"Strona {domain}"
+            }
+        )
+        return website
+    
+    def save_result(self, url: str, website: NewsWebsite, article_data: Dict,
+                    crawl_session: Optional[CrawlSession] = None,
+                    update_existing: bool = False) -> Optional[Article]:
+        if update_existing and article_data['status'] == 'success':
+            existing = Article.objects.filter(url=url).first()
+            if existing:
+                return self._update_article(existing, article_data)
+            if ArticleArchive.objects.filter(url=url).exists():
+                # Zarchiwizowany w trakcie pobierania
+                article_data['status'] = 'skipped'
+                return None
+        
+        try:
+            with transaction.atomic():
+                article = self._create_article(url, website, article_data, crawl_session)
+        except IntegrityError:
+            # Inny proces zapisał ten URL w międzyczasie
+            logger.info(f"Artykuł {url} został już zapisany przez inny proces")
+            article_data['status'] = 'skipped'
+            return None
+        
+        if article:
+            bump_data_version()
+        return article
+    
+    def _update_article(self, article: Article, article_data: Dict) -> Article:
+        published = article_data['published_date_normalized']
+        if timezone.is_naive(published):
+            article_data['published_date_normalized'] = timezone.make_aware(published)
+        
+        fields = ['title', 'original_content', 'plain_text_content', 'published_date_normalized']
+        changed = [field for field in fields if getattr(article, field) != article_data[field]]
+        if article.status != 'success':
+            changed.append('status')
+        
+        article.http_status_code = article_data.get('http_status_code')
+        article.response_time = article_data.get('response_time')
+        article.content_length = article_data.get('content_length')
+        article.metadata = {**article.metadata, **article_data.get('metadata', {})}
+        if not changed:
+            article.save(update_fields=['http_status_code', 'response_time', 'content_length', 'metadata'])
+            return article
+        
+        for field in fields:
+            setattr(article, field, article_data[field])
+        article.status = 'success'
+        article.error_message = ''
+        article.save()
+        bump_data_version()
+        return article
+    
+    def _create_article(self, url: str, website: NewsWebsite, article_data: Dict,
+                        crawl_session: Optional[CrawlSession]) -> Optional[Article]:
+        if article_data['status'] == 'success':
+            article = Article.objects.create(
+                website=website,
+                url=article_data['url'],
+                title=article_data['title'],
+                original_content=article_data['original_content'],
+                plain_text_content=article_data['plain_text_content'],
+                published_date_normalized=article_data['published_date_normalized'],
+                http_status_code=article_data.get('http_status_code'),
+                response_time=article_data.get('response_time'),
+                content_length=article_data.get('content_length'),
+                crawl_session=crawl_session,
+                status='success',
+                metadata=article_data.get('metadata', {})
+            )
+        elif article_data['status'] == 'failed':
+            article = Article.objects.create(
+                website=website,
+                url=url,
+                title="Błąd scrapowania",
+                original_content="",
+                plain_text_content="",
+                published_date_normalized=self.date_parser.now.replace(hour=0, minute=0, second=0),
+                error_message=article_data.get('error_message', 'Nieznany błąd'),
+                crawl_session=crawl_session,
+                status='failed'
+            )
+        else:
+            return None
+        return article
+    
+    def scrape_all_articles(self, crawl_session: Optional[CrawlSession] = None) -> Dict:
+        stats = ScrapeStats()
+        for _ in self.iter_articles(crawl_session=crawl_session, stats=stats):
+            pass
+        self.print_summary(stats.as_dict())
+        return stats.as_dict()
+    
+    def iter_articles(self, crawl_session: Optional[CrawlSession] = None,
+                      stats: Optional[ScrapeStats] = None) -> Iterator[ScrapeResult]:
+        # Wynik każdego URL-a jest oddawany od razu po zapisie - pamięć nie rośnie
+        # z liczbą artykułów, a liczniki zbiera przekazany obiekt stats
         print("ROZPOCZYNAM: Rozpoczynam scrapowanie artykułów...")
         print(f"LISTA: Lista URL-i do scrapowania: {len(self.target_urls)}")
         
-        results = {
-            'total': len(self.target_urls),
-            'successful': 0,
-            'failed': 0,
-            'skipped': 0,
-            'articles': []
-        }
-        
-        for i, url in enumerate(self.target_urls, 1):
-            print(f"\nARTYKUL: Scrapowanie artykułu {i}/{len(self.target_urls)}")
-            
-            try:
-                domain = urlparse(url).netloc
-                website, created = NewsWebsite.objects.get_or_create(
-                    domain=domain,
-                    defaults={
-                        'name': domain,
-                        'url': f"https://{domain}",
-                        'description': f"Strona {domain}"
-                    }
-                )
+        try:
+            for i, url in enumerate(self.target_urls, 1):
+                print(f"\nARTYKUL: Scrapowanie artykułu {i}/{len(self.target_urls)}")
                 
-                article_data = self.scrape_article(url)
+                try:
+                    website = self.writer.run(self.get_website, url)
+                    article_data = self.scrape_article(url, isolate=website.is_quarantined())
+                    result = self.writer.run(self._store_article, url, website, article_data, crawl_session)
+                    
+                    time.sleep(1)
+                    
+                except Exception as e:
+                    error_msg = f"Nieoczekiwany błąd dla {url}: {str(e)}"
+                    logger.error(error_msg)
+                    print(f"BLAD: {error_msg}")
+                    result = ScrapeResult(url=url, status='failed', error_message=error_msg)
                 
-                if article_data['status'] == 'success':
-                    article = Article.objects.create(
-                        website=website,
-                        url=article_data['url'],
-                        title=article_data['title'],
-                        original_content=article_data['original_content'],
-                        plain_text_content=article_data['plain_text_content'],
-                        published_date_normalized=article_data['published_date_normalized'],
-                        http_status_code=article_data.get('http_status_code'),
-                        response_time=article_data.get('response_time'),
-                        content_length=article_data.get('content_length'),
-                        status='success'
+                if crawl_session:
+                    self.writer.submit(
+                        CrawlSession.objects.filter(pk=crawl_session.pk).update,
+                        scraped_articles=i,
+                        heartbeat_at=timezone.now()
                     )
+                
+                if stats is not None:
+                    stats.add(result)
+                yield result
+        finally:
+            self.writer.run(self.metrics.flush)
+    
+    def _store_article(self, url: str, website: NewsWebsite, article_data: Dict,
+                       crawl_session: Optional[CrawlSession]) -> ScrapeResult:
+        if article_data.get('timed_out'):
+            record_site_timeout(website)
+        timings = article_data.get('timings', {})
+        started = time.perf_counter()
+        article = self.save_result(url, website, article_data, crawl_session)
+        timings['db_write'] = time.perf_counter() - started
+        self.metrics.record(urlparse(url).netloc, timings, crawl_session.pk if crawl_session else None,
+                            article_data.get('events'))
+        return ScrapeResult.from_article_data(url, article_data, article)
+    
+    def process_frontier(self, crawl_session: Optional[CrawlSession] = None, batch_size: int = 20,
+                         max_urls: Optional[int] = None, delay: float = 1.0, worker_id: str = '',
+                         lease_seconds: int = frontier.LEASE_SECONDS) -> Dict:
+        stats = ScrapeStats()
+        for _ in self.iter_frontier(crawl_session=crawl_session, batch_size=batch_size, max_urls=max_urls,
+                                    delay=delay, worker_id=worker_id, lease_seconds=lease_seconds,
+                                    stats=stats):
+            pass
+        self.print_summary(stats.as_dict())
+        return stats.as_dict()
+    
+    def iter_frontier(self, crawl_session: Optional[CrawlSession] = None, batch_size: int = 20,
+                      max_urls: Optional[int] = None, delay: float = 1.0, worker_id: str = '',
+                      lease_seconds: int = frontier.LEASE_SECONDS,
+                      stats: Optional[ScrapeStats] = None) -> Iterator[ScrapeResult]:
+        print("ROZPOCZYNAM: Przetwarzanie kolejki URL-i (frontier)...")
+        
+        processed = 0
+        while max_urls is None or processed < max_urls:
+            limit = batch_size if max_urls is None else min(batch_size, max_urls - processed)
+            batch = self.writer.run(frontier.claim_batch, limit, worker_id=worker_id,
+                                    crawl_session=crawl_session, lease_seconds=lease_seconds)
+            if not batch:
+                break
+            claimed_at = timezone.now()
+            
+            # Przy wątku zapisującym (CRAWLER_SQLITE_TUNING) zapis artykułu trwa w tle,
+            # a scraper w tym czasie pobiera następny URL; wyniki oddajemy w kolejności
+            pending = deque()
+            try:
+                for position, item in enumerate(batch):
+                    processed += 1
+                    pending.append(self._process_frontier_item(item, claimed_at))
                     
-                    results['successful'] += 1
-                    results['articles'].append({
-                        'id': article.id,
-                        'title': article.title,
-                        'url': article.url,
-                        'published_date': article.get_published_date_formatted()
-                    })
+                    remaining = batch[position + 1:]
+                    if remaining:
+                        self.writer.submit(frontier.extend_lease, remaining, worker_id, lease_seconds)
                     
-                elif article_data['status'] == 'skipped':
-                    results['skipped'] += 1
+                    while pending and pending[0].done():
+                        result = pending.popleft().result()
+                        if stats is not None:
+                            stats.add(result)
+                        yield result
                     
+                    if delay:
+                        time.sleep(delay)
+                
+                while pending:
+                    result = pending.popleft().result()
+                    if stats is not None:
+                        stats.add(result)
+                    yield result
+            finally:
+                # Przerwana iteracja zostawia resztę partii z dzierżawą - wróci do
+                # kolejki po jej wygaśnięciu
+                for future in pending:
+                    future.exception()
+                self.writer.run(self.metrics.flush)
+    
+    def _process_frontier_item(self, item, claimed_at: datetime) -> Future:
+        print(f"\nARTYKUL: Scrapowanie {item.url} (priorytet {item.priority}, próba {item.attempts + 1})")
+        
+        # URL pobrany już wcześniej to ponowna wizyta - artykuł jest aktualizowany
+        revisit = item.fetch_count > 0
+        
+        try:
+            website = item.website or self.writer.run(self.get_website, item.url)
+            # Strona, która już przekroczyła limit, i strony serwisu na kwarantannie
+            # są parsowane w osobnym procesie
+            isolate = item.timeout_count > 0 or website.is_quarantined()
+            article_data = self.scrape_article(item.url, refresh=revisit, isolate=isolate)
+            timings = article_data.get('timings', {})
+            timings['queue_wait'] = max((claimed_at - item.next_eligible_at).total_seconds(), 0.0)
+        except Exception as e:
+            return self.writer.submit(self._store_frontier_error, item, e)
+        return self.writer.submit(self._store_frontier_item, item, website, article_data, revisit)
+    
+    def _store_frontier_item(self, item, website: NewsWebsite, article_data: Dict, revisit: bool) -> ScrapeResult:
+        try:
+            # Zapisy jednego URL-a w jednej transakcji - błąd bazy wycofuje je
+            # w całości, zanim URL zostanie oznaczony jako nieudany
+            with transaction.atomic():
+                timings = article_data.get('timings', {})
+                started = time.perf_counter()
+                article = None
+                
+                if article_data.get('timed_out'):
+                    record_site_timeout(website)
+                    finished = frontier.mark_timeout(item, article_data['error_message'])
+                    if finished:
+                        self.save_result(item.url, website, article_data, item.crawl_session)
+                elif article_data['status'] == 'failed':
+                    # Rekord błędu zapisujemy dopiero po wyczerpaniu prób - inaczej
+                    # kolejna próba uznałaby URL za istniejący i go pominęła
+                    finished = frontier.mark_failed(item, article_data.get('error_message', 'Nieznany błąd'))
+                    if finished:
+                        self.save_result(item.url, website, article_data, item.crawl_session)
                 else:
-                    website, created = NewsWebsite.objects.get_or_create(
-                        domain=domain,
-                        defaults={
-                            'name': domain,
-                            'url': f"https://{domain}",
-                            'description': f"Strona {domain}"
-                        }
-                    )
-                    
-                    Article.objects.create(
-                        website=website,
-                        url=url,
-                        title="Błąd scrapowania",
-                        original_content="",
-                        plain_text_content="",
-                        published_date_normalized=self.date_parser.now.replace(hour=0, minute=0, second=0),
-                        error_message=article_data.get('error_message', 'Nieznany błąd'),
-                        status='failed'
+                    article = self.save_result(item.url, website, article_data, item.crawl_session,
+                                               update_existing=revisit)
+                    if article:
+                        published_at = article.published_date_normalized
+                    else:
+                        published_at = Article.objects.filter(url=item.url).values_list(
+                            'published_date_normalized', flat=True).first()
+                    finished = frontier.mark_done(
+                        item,
+                        content_hash=frontier.content_hash(article_data),
+                        published_at=published_at
                     )
-                    
-                    results['failed'] += 1
-                
-                time.sleep(1)
                 
-            except Exception as e:
-                error_msg = f"Nieoczekiwany błąd dla {url}: {str(e)}"
-                logger.error(error_msg)
-                print(f"BLAD: {error_msg}")
-                results['failed'] += 1
+                timings['db_write'] = time.perf_counter() - started
+                self.metrics.record(urlparse(item.url).netloc, timings, item.crawl_session_id, article_data.get('events'))
+                result = ScrapeResult.from_article_data(item.url, article_data, article)
         
+        except Exception as e:
+            return self._store_frontier_error(item, e)
+        
+        self._count_finished(item, finished)
+        return result
+    
+    def _store_frontier_error(self, item, error: Exception) -> ScrapeResult:
+        error_msg = f"Nieoczekiwany błąd dla {item.url}: {str(error)}"
+        logger.error(error_msg)
+        print(f"BLAD: {error_msg}")
+        finished = frontier.mark_failed(item, error_msg)
+        self._count_finished(item, finished)
+        return ScrapeResult(url=item.url, status='failed', error_message=error_msg)
+    
+    def _count_finished(self, item, finished: bool) -> None:
+        if item.crawl_session_id and finished:
+            CrawlSession.objects.filter(pk=item.crawl_session_id).update(
+                scraped_articles=F('scraped_articles') + 1,
+                heartbeat_at=timezone.now()
+            )
+    
+    def print_summary(self, results: Dict):
         print(f"\nZAKONCZONO: Scrapowanie zakończone!")
         print(f"STATYSTYKI:")
         print(f"   - Pomyślnie: {results['successful']}")
         print(f"   - Błędy: {results['failed']}")
         print(f"   - Pominięte: {results['skipped']}")
-        
-        return results
 
-def scrape_articles():
+def scrape_articles(crawl_session: Optional[CrawlSession] = None):
+    scraper = ArticleScraper()
+    return scraper.scrape_all_articles(crawl_session=crawl_session)
+
+def iter_scrape_articles(crawl_session: Optional[CrawlSession] = None,
+                         stats: Optional[ScrapeStats] = None) -> Iterator[ScrapeResult]:
     scraper = ArticleScraper()
-    return scraper.scrape_all_articles()
\ No newline at end of file
+    return scraper.iter_articles(crawl_session=crawl_session, stats=stats)
\ No newline at end of file
@@ -0,0 +1,54 @@
+from django.db.models import QuerySet
+
+# Pole API -> (kolumny modelu potrzebne do jego wyliczenia, funkcja serializująca)
+ARTICLE_FIELDS = {
+    'id': (['id'], lambda article: article.id),
+    'title': (['title'], lambda article: article.title),
+    'url': (['url'], lambda article: article.url),
+    'source_domain': (['website__domain'], lambda article: article.website.domain),
+    'published_date': (['published_date_normalized'], lambda article: article.get_published_date_formatted()),
+    'scraped_at': (['scraped_at'], lambda article: article.scraped_at.strftime('%d.%m.%Y %H:%M:%S')),
+    'status': (['status'], lambda article: article.status),
+    'word_count': (['plain_text_content'], lambda article: article.get_word_count()),
+    'excerpt': (['plain_text_content'], lambda article: article.get_excerpt(200)),
+    'original_content': (['original_content'], lambda article: article.original_content),
+    'plain_text_content': (['plain_text_content'], lambda article: article.plain_text_content),
+    'http_status_code': (['http_status_code'], lambda article: article.http_status_code),
+    'response_time': (['response_time'], lambda article: article.response_time),
+    'content_length': (['content_length'], lambda article: article.content_length),
+    'error_message': (['error_message'], lambda article: article.error_message if article.error_message else None),
+}
+
+LIST_FIELDS = [
+    'id', 'title', 'url', 'source_domain', 'published_date',
+    'scraped_at', 'status', 'word_count', 'excerpt',
+]
+
+DETAIL_FIELDS = [
+    'id', 'title', 'url', 'source_domain', 'published_date',
+    'scraped_at', 'status', 'word_count', 'original_content',
+    'plain_text_content', 'http_status_code', 'response_time',
+    'content_length', 'error_message',
+]
+
+def parse_fields(value: str, default: list) -> list:
+    if not value:
+        return default
+
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in ARTICLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Nieznane pola: {', '.join(unknown)}")
+    return fields
+
+def restrict_queryset(articles: QuerySet, fields: list) -> QuerySet:
+    columns = {'id'}
+    for field in fields:
+        columns.update(ARTICLE_FIELDS[field][0])
+
+    if 'website__domain' in columns:
+        articles = articles.select_related('website')
+    return articles.only(*sorted(columns))
+
+def serialize_article(article, fields: list) -> dict:
+    return {field: ARTICLE_FIELDS[field][1](article) for field in fields}
@@ -0,0 +1,217 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.utils.text import slugify
+
+from .models import Article, ArticleTag, ArticleTagRelation, TaggingState
+
+# Słowa z samych liter, 4-40 znaków - krótsze to w praktyce spójniki i przyimki,
+# dłuższe to sklejone adresy lub śmieci z ekstrakcji
+TOKEN_RE = re.compile(r'\b[^\W\d_]{4,40}\b')
+STOPWORDS = frozenset('''
+    aby albo bardzo będą będzie bowiem były było chociaż czyli dlaczego dlatego dość gdyż gdzie
+    jako jakie jaki jakiś jednak jego jej jemu jest jeszcze jeśli już każdy kiedy która które
+    który których którzy lecz może można mnie musi nawet nich niej nigdy oraz pod przed przez
+    przy również się sobie swoje swój także tego teraz też tych tylko tutaj wiele więc wszystkie
+    wszystko właśnie zawsze zostać został została zostały żeby będąc ponieważ jednym jedną
+    pomiędzy według wśród około między kilka inne innych temu tymi
+'''.split())
+
+@dataclass(slots=True)
+class Vocabulary:
+    terms: List[str]
+    index: Dict[str, int]
+    idf: np.ndarray
+    # Terminy, które mogą zostać tagiem (wszystkie albo tylko istniejące ArticleTag)
+    candidates: np.ndarray
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+def count_matrix(texts: List[str], index: Dict[str, int], grow: bool = False) -> sparse.csr_matrix:
+    # Macierz rzadka dokumenty x terminy z liczbą wystąpień. Pętla w Pythonie
+    # tylko mapuje tokeny na numery kolumn, zliczanie robi scipy (sum_duplicates)
+    indices: List[int] = []
+    indptr = [0]
+    for text in texts:
+        if grow:
+            indices.extend(index.setdefault(token, len(index)) for token in tokenize(text or ''))
+        else:
+            indices.extend(index[token] for token in tokenize(text or '') if token in index)
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(texts), len(index))
+    )
+    matrix.sum_duplicates()
+    return matrix
+
+def build_vocabulary(texts: Iterable[List[str]], min_df: int = 2, max_df: float = 0.5,
+                     allowed: Optional[Iterable[str]] = None) -> Vocabulary:
+    # Częstości dokumentowe z próbki tekstów (podawanej paczkami). Terminy zbyt
+    # rzadkie (literówki) i zbyt częste (występujące w ponad max_df dokumentów)
+    # nie trafiają do słownika.
+    index: Dict[str, int] = {}
+    df = np.zeros(0, dtype=np.int64)
+    documents = 0
+    for chunk in texts:
+        matrix = count_matrix(chunk, index, grow=True)
+        df = np.pad(df, (0, len(index) - len(df)))
+        df += np.bincount(matrix.indices, minlength=len(index))
+        documents += len(chunk)
+
+    terms = np.array(list(index), dtype=object)
+    keep = (df >= min_df) & (df <= max(max_df * documents, min_df))
+    terms, df = terms[keep], df[keep]
+    idf = (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32)
+
+    if allowed is None:
+        candidates = np.ones(len(terms), dtype=np.float32)
+    else:
+        allowed = {name.lower() for name in allowed}
+        candidates = np.fromiter((term in allowed for term in terms), dtype=np.float32, count=len(terms))
+
+    terms = terms.tolist()
+    return Vocabulary(terms, {term: i for i, term in enumerate(terms)}, idf, candidates)
+
+def tfidf_matrix(texts: List[str], vocabulary: Vocabulary) -> sparse.csr_matrix:
+    matrix = count_matrix(texts, vocabulary.index)
+    # Logarytmiczne tf - powtórzone słowo nie dominuje wyniku
+    matrix.data = np.log1p(matrix.data)
+    matrix = matrix @ sparse.diags(vocabulary.idf)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return (sparse.diags(1 / norms) @ matrix).tocsr()
+
+def select_tags(texts: List[str], vocabulary: Vocabulary, max_tags: int = 5, min_score: float = 0.15) -> List[List[int]]:
+    # Dla każdego dokumentu numery terminów o najwyższym TF-IDF (malejąco)
+    matrix = (tfidf_matrix(texts, vocabulary) @ sparse.diags(vocabulary.candidates)).tocsr()
+    matrix.data[matrix.data < min_score] = 0
+    matrix.eliminate_zeros()
+
+    selected = []
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        scores, columns = matrix.data[start:end], matrix.indices[start:end]
+        if len(scores) > max_tags:
+            top = np.argpartition(-scores, max_tags - 1)[:max_tags]
+            scores, columns = scores[top], columns[top]
+        selected.append(columns[np.argsort(-scores, kind='stable')].tolist())
+    return selected
+
+def unique_slugs(names: List[str], max_length: int = 50) -> Dict[str, str]:
+    # Slugi z polskimi literami ('słowa', nie 'sowa'); kolizja z istniejącym
+    # slugiem (np. po obcięciu długości) dostaje przyrostek -2, -3...
+    base = {name: slugify(name, allow_unicode=True)[:max_length] or name[:max_length] for name in names}
+    taken = set(ArticleTag.objects.filter(slug__in=set(base.values())).values_list('slug', flat=True))
+    slugs = {}
+    for name, slug in base.items():
+        candidate, n = slug, 1
+        # Kolizje są rzadkie - kolejne przyrostki sprawdzamy pojedynczo
+        while candidate in taken or (n > 1 and ArticleTag.objects.filter(slug=candidate).exists()):
+            n += 1
+            candidate = f'{slug[:max_length - len(str(n)) - 1]}-{n}'
+        taken.add(candidate)
+        slugs[name] = candidate
+    return slugs
+
+class TagCache:
+    # Nazwa terminu -> ID ArticleTag; brakujące tagi tworzone hurtowo
+
+    def __init__(self, create: bool = True):
+        self.create = create
+        self.ids: Dict[str, Optional[int]] = {
+            name.lower(): pk for pk, name in ArticleTag.objects.values_list('pk', 'name')
+        }
+
+    def resolve(self, names: Iterable[str]) -> Dict[str, Optional[int]]:
+        missing = {name for name in names if name not in self.ids}
+        if missing and self.create:
+            ArticleTag.objects.bulk_create(
+                [ArticleTag(name=name, slug=slug) for name, slug in unique_slugs(sorted(missing)).items()],
+                ignore_conflicts=True
+            )
+            for pk, name in ArticleTag.objects.filter(name__in=missing).values_list('pk', 'name'):
+                self.ids[name.lower()] = pk
+        # Nazwa, której nie dało się zapisać (np. tag dodany w międzyczasie
+        # z innym slugiem), nie jest ponawiana w tym przebiegu
+        for name in missing:
+            self.ids.setdefault(name, None)
+        return self.ids
+
+def iter_texts(start_after: int = 0, chunk_size: int = 2000) -> Iterator[List[Tuple[int, str]]]:
+    # Zakresy kluczy głównych, jak w reextract - bez OFFSET
+    queryset = Article.objects.filter(status='success').order_by('pk')
+    last_pk = start_after
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).values_list('pk', 'plain_text_content')[:chunk_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield rows
+
+def sample_texts(sample_size: int, chunk_size: int = 2000) -> Iterator[List[str]]:
+    # Próbka do IDF: najnowsze artykuły - pełny przebieg po archiwum nie jest
+    # potrzebny, żeby oszacować, które słowa są pospolite
+    queryset = Article.objects.filter(status='success').order_by('-pk')
+    remaining, last_pk = sample_size, None
+    while remaining > 0:
+        page = queryset if last_pk is None else queryset.filter(pk__lt=last_pk)
+        rows = list(page.values_list('pk', 'plain_text_content')[:min(chunk_size, remaining)])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        remaining -= len(rows)
+        yield [text for pk, text in rows]
+
+def get_tagging_watermark() -> int:
+    # Znacznik trybu przyrostowego: ID ostatniego otagowanego artykułu
+    return TaggingState.objects.filter(pk=1).values_list('last_article_id', flat=True).first() or 0
+
+def set_tagging_watermark(last_pk: int) -> None:
+    TaggingState.objects.update_or_create(pk=1, defaults={'last_article_id': last_pk})
+
+def tag_articles(incremental: bool = False, chunk_size: int = 2000, batch_size: int = 5000, max_tags: int = 5,
+                 min_score: float = 0.15, sample_size: int = 50000, min_df: int = 2, max_df: float = 0.5,
+                 existing_only: bool = False, progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    # Tagi to słowa o najwyższym TF-IDF w treści artykułu. Przy existing_only
+    # przypisywane są wyłącznie tagi już zdefiniowane w ArticleTag.
+    start_after = get_tagging_watermark() if incremental else 0
+    stats = {'processed': 0, 'relations': 0, 'last_pk': start_after, 'vocabulary': 0}
+    if not Article.objects.filter(status='success', pk__gt=start_after).exists():
+        return stats
+
+    allowed = ArticleTag.objects.values_list('name', flat=True) if existing_only else None
+    vocabulary = build_vocabulary(sample_texts(sample_size, chunk_size), min_df, max_df, allowed)
+    stats['vocabulary'] = len(vocabulary.terms)
+    tags = TagCache(create=not existing_only)
+
+    for rows in iter_texts(start_after, chunk_size):
+        selected = select_tags([text for pk, text in rows], vocabulary, max_tags, min_score)
+        names = {vocabulary.terms[column] for columns in selected for column in columns}
+        ids = tags.resolve(names)
+        relations = [
+            ArticleTagRelation(article_id=pk, tag_id=ids[vocabulary.terms[column]])
+            for (pk, text), columns in zip(rows, selected)
+            for column in columns
+            if ids[vocabulary.terms[column]]
+        ]
+        # ignore_conflicts nie zwraca liczby wstawionych wierszy - liczymy relacje
+        # paczki przed i po zapisie (indeks unikalny zaczyna się od article_id)
+        existing = ArticleTagRelation.objects.filter(article_id__gte=rows[0][0], article_id__lte=rows[-1][0])
+        with transaction.atomic():
+            before = existing.count()
+            ArticleTagRelation.objects.bulk_create(relations, batch_size=batch_size, ignore_conflicts=True)
+            inserted = existing.count() - before
+            set_tagging_watermark(rows[-1][0])
+
+        stats['processed'] += len(rows)
+        stats['relations'] += inserted
+        stats['last_pk'] = rows[-1][0]
+        if progress:
+            progress(dict(stats))
+    return stats
@@ -1,8 +1,83 @@
-from django.test import TestCase
-from django.utils import timezone
-from datetime import datetime
+import codecs
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+from xml.etree import ElementTree
+
 import pytz
-from .models import NewsWebsite, Article, CrawlSession
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import encoding, memory, tagging, transport
+from .benchmark import compare, run_benchmark
+from .cache import ResponseCache, bump_data_version, get_data_version, response_cache
+from .discovery import discover_urls, iter_entries, parse_lastmod
+from .encoding import decode_html
+from .extractors import JsonScriptExtractor, NextDataExtractor, Page, extract_embedded
+from .fixture_server import FixtureServer
+from .frontier import (
+    MAX_ATTEMPTS, MIN_REVISIT_SECONDS, OLD_ARTICLE_REVISIT_SECONDS, QUARANTINE_AFTER_TIMEOUTS, claim_batch,
+    content_hash, enqueue_urls, extend_lease, mark_done, mark_failed, mark_timeout, schedule_revisits
+)
+from .isolation import ExtractionTimeout, SITE_QUARANTINE_TIMEOUTS, run_isolated
+from .jobs import enqueue_crawl_job, run_worker
+from .loadtest import (
+    LocalServer, QUERY_BUDGETS, capture_query_plans, check_query_budgets, check_query_plans, default_endpoints,
+    measure_queries, percentile, run_load, seed_database
+)
+from .memory import PageMemory, ParseBudget
+from .metrics import BUCKETS, empty_histogram, merge, observe
+from .models import (
+    Article, ArticleArchive, ArticleTag, ArticleTagRelation, CrawlSession, DiscoverySource, EventCounter,
+    FrontierURL, NewsWebsite, StageMetric, TaggingState
+)
+from .profiling import RunProfiler, statement_shape
+from .reextract import reextract_articles
+from .retention import archive_articles, cutoff, purge_archive
+from .routers import ReplicaRouter, STICKY_COOKIE
+from .scraper import ArticleScraper, ScrapeResult, ScrapeStats, UniversalDateParser
+from .tagging import TagCache, get_tagging_watermark, tag_articles
+from .writer import SingleWriter
+
+TESTDATA = Path(__file__).parent / 'testdata'
+
+def start_fixture_server(test, directory):
+    # Lokalny serwer HTTP z katalogu testdata/ (albo podanej ścieżki), zatrzymywany po teście
+    server = FixtureServer(TESTDATA / directory).start()
+    test.addCleanup(server.stop)
+    return server
+
+def temp_directory(test):
+    directory = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directory)
+    return directory
+
+def create_website(domain='test.com', name="Test"):
+    return NewsWebsite.objects.create(name=name, url=f"https://{domain}", domain=domain)
+
+def lease(item, worker_id=''):
+    # Ponowne przejęcie URL-a z pominięciem harmonogramu kolejki - wynik
+    # zapisuje tylko worker trzymający dzierżawę
+    FrontierURL.objects.filter(pk=item.pk).update(state='in_flight', lease_owner=worker_id)
+    item.refresh_from_db()
+    return item
 
 class NewsWebsiteModelTest(TestCase):
     def setUp(self):
@@ -153,6 +228,8 @@ class ArticleScraperTest(TestCase):
 
 class APIEndpointsTest(TestCase):
     def setUp(self):
+        response_cache.clear()
+        
         self.website = NewsWebsite.objects.create(
             name="Test News",
             url="https://test.com",
@@ -172,7 +249,6 @@ class APIEndpointsTest(TestCase):
         )
     
     def test_articles_list_api(self):
-        from django.test import Client
         client = Client()
         
         response = client.get('/api/articles/')
@@ -184,7 +260,6 @@ class APIEndpointsTest(TestCase):
         self.assertEqual(len(data['articles']), 1)
     
     def test_article_detail_api(self):
-        from django.test import Client
         client = Client()
         
         response = client.get(f'/api/articles/{self.article.id}/')
@@ -195,8 +270,119 @@ class APIEndpointsTest(TestCase):
         self.assertEqual(data['article']['title'], 'Test Article')
         self.assertEqual(data['article']['id'], self.article.id)
     
+    def test_article_detail_api_sparse_fields(self):
+        client = Client()
+        
+        # Walidator wersji artykułu + jedno zapytanie o dane (bez osobnego zapytania o serwis)
+        with self.assertNumQueries(2):
+            response = client.get(f'/api/articles/{self.article.id}/?fields=id,title,source_domain')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['article'], {
+            'id': self.article.id,
+            'title': 'Test Article',
+            'source_domain': 'test.com',
+        })
+        
+        response = client.get(f'/api/articles/{self.article.id}/?fields=id,nope')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_articles_list_api_defers_content(self):
+        client = Client()
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/articles/?fields=id,title')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['articles'], [{'id': self.article.id, 'title': 'Test Article'}])
+        for query in queries.captured_queries:
+            self.assertNotIn('original_content', query['sql'])
+            self.assertNotIn('plain_text_content', query['sql'])
+    
+    def test_articles_batch_api(self):
+        client = Client()
+        
+        with self.assertNumQueries(1):
+            response = client.get(f'/api/articles/batch/?ids={self.article.id},999999&fields=id,url')
+        self.assertEqual(response.status_code, 200)
+        
+        data = response.json()
+        self.assertEqual(data['articles'], [{'id': self.article.id, 'url': self.article.url}])
+        self.assertEqual(data['missing'], [999999])
+        
+        self.assertEqual(client.get('/api/articles/batch/').status_code, 400)
+    
+    def test_articles_list_api_conditional_get(self):
+        client = Client()
+        
+        response = client.get('/api/articles/')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        
+        # Walidatory zapisane z odpowiedzią w cache - tylko odczyt wersji danych
+        with self.assertNumQueries(1):
+            response = client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        # Bez cache: agregat walidatorów + wersja danych, bez zapytania o stronę wyników
+        response_cache.clear()
+        with self.assertNumQueries(2):
+            response = client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        Article.objects.create(
+            website=self.website,
+            url="https://test.com/article/2",
+            title="Second Article",
+            original_content="<h1>Second</h1>",
+            plain_text_content="Second content",
+            published_date_normalized=self.tz.localize(datetime(2024, 10, 15, 10, 30, 0)),
+            status='success'
+        )
+        bump_data_version()
+        response = client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_last_modified_follows_article_updates(self):
+        client = Client()
+        
+        Article.objects.filter(pk=self.article.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        last_modified = client.get('/api/articles/')['Last-Modified']
+        self.assertEqual(client.get('/api/articles/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        
+        # Aktualizacja w miejscu (ponowna wizyta, reextract) nie zmienia scraped_at
+        self.article.title = "Updated Article"
+        self.article.save()
+        response = client.get('/api/export/json/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[0]['title'], "Updated Article")
+        
+        # Lista jest w cache do podbicia wersji danych, jak po _update_article
+        bump_data_version()
+        response = client.get('/api/articles/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+        self.assertEqual(response.json()['articles'][0]['title'], "Updated Article")
+    
+    def test_article_detail_api_conditional_get(self):
+        client = Client()
+        
+        etag = client.get(f'/api/articles/{self.article.id}/')['ETag']
+        response = client.get(f'/api/articles/{self.article.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        self.article.title = "Updated Article"
+        self.article.save()
+        response = client.get(f'/api/articles/{self.article.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_websites_list_api_conditional_get(self):
+        client = Client()
+        
+        response = client.get('/api/websites/')
+        response = client.get('/api/websites/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
     def test_articles_filter_by_source(self):
-        from django.test import Client
         client = Client()
         
         response = client.get('/api/articles/?source=test.com')
@@ -205,3 +391,1560 @@ class APIEndpointsTest(TestCase):
         data = response.json()
         self.assertEqual(data['status'], 'success')
         self.assertEqual(data['total'], 1)
+
+class ExportEndpointsTest(TestCase):
+    def setUp(self):
+        self.website = NewsWebsite.objects.create(
+            name="Test News",
+            url="https://test.com",
+            domain="test.com"
+        )
+        self.other_website = NewsWebsite.objects.create(
+            name="Other News",
+            url="https://other.pl",
+            domain="other.pl"
+        )
+        
+        self.tz = pytz.timezone('Europe/Warsaw')
+        
+        Article.objects.create(
+            website=self.website,
+            url="https://test.com/article/1",
+            title="Test Article",
+            original_content="<h1>Test</h1>",
+            plain_text_content="Test content",
+            published_date_normalized=self.tz.localize(datetime(2024, 10, 14, 10, 30, 0)),
+            status='success'
+        )
+        Article.objects.create(
+            website=self.other_website,
+            url="https://other.pl/article/2",
+            title="Other Article",
+            original_content="<h1>Other</h1>",
+            plain_text_content="Other content, with comma",
+            published_date_normalized=self.tz.localize(datetime(2024, 9, 1, 8, 0, 0)),
+            status='failed'
+        )
+    
+    def _read_csv(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(content)))
+    
+    def test_export_csv_is_streamed(self):
+        client = Client()
+        
+        response = client.get('/api/export/csv/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        
+        rows = self._read_csv(response)
+        self.assertEqual(rows[0][0], 'ID')
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][3], 'test.com')
+        self.assertEqual(rows[1][7], '2')
+        self.assertEqual(rows[2][6], 'Błąd')
+        self.assertEqual(rows[2][8], 'Other content, with comma')
+    
+    def test_export_csv_filters(self):
+        client = Client()
+        
+        rows = self._read_csv(client.get('/api/export/csv/?source=other'))
+        self.assertEqual([row[2] for row in rows[1:]], ["https://other.pl/article/2"])
+        
+        rows = self._read_csv(client.get('/api/export/csv/?status=success'))
+        self.assertEqual([row[2] for row in rows[1:]], ["https://test.com/article/1"])
+        
+        rows = self._read_csv(client.get('/api/export/csv/?date_from=2024-10-01&date_to=2024-10-31'))
+        self.assertEqual([row[2] for row in rows[1:]], ["https://test.com/article/1"])
+    
+    def test_export_json_uses_same_filters_as_validators(self):
+        client = Client()
+        
+        response = client.get('/api/export/json/?source=other')
+        self.assertEqual([article['url'] for article in json.loads(response.content)], ["https://other.pl/article/2"])
+        self.assertNotEqual(response['ETag'], client.get('/api/export/json/')['ETag'])
+        
+        response = client.get('/api/export/json/?status=success')
+        self.assertEqual([article['url'] for article in json.loads(response.content)], ["https://test.com/article/1"])
+        self.assertEqual(client.get('/api/export/json/?date_from=wczoraj').status_code, 400)
+    
+    def test_export_csv_invalid_date(self):
+        client = Client()
+        
+        response = client.get('/api/export/csv/?date_from=wczoraj')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'error')
+    
+    def _read_ndjson(self, response):
+        content = b''.join(response.streaming_content)
+        if response['Content-Type'] == 'application/gzip':
+            content = gzip.decompress(content)
+        return [json.loads(line) for line in content.decode('utf-8').splitlines()]
+    
+    def test_export_ndjson(self):
+        client = Client()
+        
+        response = client.get('/api/export/ndjson/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        
+        records = self._read_ndjson(response)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['url'], "https://test.com/article/1")
+        self.assertIn('original_content', records[0])
+    
+    def test_export_ndjson_gzip(self):
+        client = Client()
+        
+        response = client.get('/api/export/ndjson/?compress=gzip')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(len(self._read_ndjson(response)), 2)
+    
+    def test_export_ndjson_since_cursor(self):
+        client = Client()
+        
+        first = self._read_ndjson(client.get('/api/export/ndjson/?limit=1'))
+        self.assertEqual(len(first), 1)
+        
+        rest = self._read_ndjson(client.get('/api/export/ndjson/', {
+            'since': first[0]['cursor'],
+            'since_id': first[0]['id'],
+        }))
+        self.assertEqual([record['url'] for record in rest], ["https://other.pl/article/2"])
+        
+        last = rest[-1]
+        self.assertEqual(self._read_ndjson(client.get('/api/export/ndjson/', {
+            'since': last['cursor'],
+            'since_id': last['id'],
+        })), [])
+
+class ResponseCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.website = NewsWebsite.objects.create(
+            name="Test News",
+            url="https://test.com",
+            domain="test.com"
+        )
+        Article.objects.create(
+            website=cls.website,
+            url="https://test.com/article/1",
+            title="Test Article",
+            original_content="<h1>Test</h1>",
+            plain_text_content="Test content",
+            published_date_normalized=timezone.now(),
+            status='success'
+        )
+    
+    def setUp(self):
+        response_cache.clear()
+    
+    def test_bump_data_version(self):
+        self.assertEqual(get_data_version(), 0)
+        bump_data_version()
+        bump_data_version()
+        self.assertEqual(get_data_version(), 2)
+    
+    def test_list_api_served_from_cache_until_version_bump(self):
+        client = Client()
+        
+        response = client.get('/api/articles/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        
+        response = client.get('/api/articles/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['total'], 1)
+        
+        Article.objects.filter(url="https://test.com/article/1").update(title="Changed")
+        self.assertEqual(client.get('/api/articles/').json()['articles'][0]['title'], 'Test Article')
+        
+        bump_data_version()
+        response = client.get('/api/articles/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['articles'][0]['title'], 'Changed')
+        
+        stats = client.get('/api/cache/stats/').json()['cache']
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+    
+    def test_cache_skips_oversized_entries(self):
+        cache = ResponseCache(alias='api', max_entry_bytes=100)
+        
+        self.assertFalse(cache.set('a', b'x' * 160, 160))
+        self.assertTrue(cache.set('b', b'x' * 60, 60))
+        
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+        self.assertEqual(cache.stats()['rejected'], 1)
+    
+    def test_stats_report_backend_memory_use(self):
+        cache = ResponseCache(alias='api')
+        cache.clear()
+        cache.set('a', b'x' * 1000, 1000)
+        cache.set('b', b'x' * 2000, 2000)
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertGreaterEqual(stats['used_bytes'], 3000)
+        
+        # Wpis usunięty przez backend znika także ze statystyk
+        cache.backend.delete('b')
+        self.assertLess(cache.stats()['used_bytes'], 2000)
+        
+        directory = temp_directory(self)
+        caches_setting = {'api_file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}}
+        with self.settings(CACHES={**settings.CACHES, **caches_setting}):
+            cache = ResponseCache(alias='api_file')
+            # Backend plikowy kompresuje wpisy (zlib) - liczy się rozmiar na dysku
+            cache.set('a', os.urandom(1000), 1000)
+            stats = cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertGreaterEqual(stats['used_bytes'], 1000)
+    
+    def test_backend_entry_limit_fits_byte_budget(self):
+        # Limit egzekwuje backend, więc obowiązuje też przy wielu procesach
+        backend = caches[settings.CRAWLER_API_CACHE_ALIAS]
+        self.assertLessEqual(
+            backend._max_entries * settings.CRAWLER_API_CACHE_MAX_ENTRY_BYTES,
+            settings.CRAWLER_API_CACHE_MAX_BYTES
+        )
+
+class CrawlJobTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch('crawler.scraper.ArticleScraper.scrape_article', return_value={
+            'status': 'skipped',
+            'message': 'Artykuł już istnieje w bazie danych'
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        sleep_patcher = mock.patch('crawler.scraper.time.sleep')
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+    
+    def test_scrape_api_enqueues_job(self):
+        client = Client()
+        
+        response = client.post('/api/scrape/')
+        self.assertEqual(response.status_code, 202)
+        
+        data = response.json()
+        crawl_session = CrawlSession.objects.get(pk=data['session_id'])
+        self.assertEqual(crawl_session.status, 'pending')
+        self.assertEqual(crawl_session.total_articles, 4)
+        
+        status = client.get(data['status_url']).json()['session']
+        self.assertEqual(status['status'], 'pending')
+        self.assertEqual(status['progress'], 0)
+    
+    def test_worker_claims_and_runs_job(self):
+        crawl_session = enqueue_crawl_job()
+        
+        self.assertEqual(run_worker(worker_id='test-worker', once=True, delay=0), 4)
+        self.assertFalse(FrontierURL.objects.filter(state__in=['queued', 'in_flight']).exists())
+        
+        crawl_session.refresh_from_db()
+        self.assertEqual(crawl_session.status, 'completed')
+        self.assertEqual(crawl_session.worker_id, 'test-worker')
+        self.assertEqual(crawl_session.scraped_articles, 4)
+        self.assertEqual(crawl_session.get_progress_percentage(), 100)
+        self.assertIsNotNone(crawl_session.completed_at)
+    
+    def test_worker_leaves_sessions_without_frontier_urls(self):
+        # Np. sesja profilowania scrape_articles - nie ma URL-i w kolejce
+        detached = CrawlSession.objects.create(name="Profilowanie", status='running', started_at=timezone.now())
+        crawl_session = enqueue_crawl_job()
+        
+        run_worker(worker_id='test-worker', once=True, delay=0)
+        
+        crawl_session.refresh_from_db()
+        detached.refresh_from_db()
+        self.assertEqual(crawl_session.status, 'completed')
+        self.assertEqual(detached.status, 'running')
+        self.assertIsNone(detached.completed_at)
+    
+    def test_scrape_api_accepts_url_list(self):
+        client = Client()
+        
+        response = client.post('/api/scrape/', data=json.dumps({
+            'urls': ["https://test.com/1", "https://test.com/2"],
+            'priority': 3
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        
+        crawl_session = CrawlSession.objects.get(pk=response.json()['session_id'])
+        self.assertEqual(crawl_session.total_articles, 2)
+        self.assertEqual(FrontierURL.objects.filter(crawl_session=crawl_session, priority=3).count(), 2)
+    
+    def test_scrape_api_rejects_non_string_urls(self):
+        client = Client()
+        
+        for payload in ({'urls': ["https://test.com/1", 42]}, {'urls': [None]}, ["https://test.com/1"]):
+            response = client.post('/api/scrape/', data=json.dumps(payload), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(CrawlSession.objects.exists())
+
+class FrontierTest(TestCase):
+    def test_enqueue_deduplicates_and_links_website(self):
+        enqueued = enqueue_urls([
+            "https://test.com/a",
+            "https://test.com/a",
+            "# komentarz",
+            "",
+            "ftp://test.com/b",
+            "https://other.pl/c",
+        ])
+        self.assertEqual(enqueued, 2)
+        # Znany URL nie jest liczony; z requeue wraca do kolejki, o ile nie jest pobierany
+        self.assertEqual(enqueue_urls(["https://test.com/a", "https://test.com/d"]), 1)
+        self.assertEqual(enqueue_urls(["https://test.com/a", "https://test.com/d"], requeue=True), 2)
+        FrontierURL.objects.filter(url="https://test.com/a").update(state='in_flight')
+        self.assertEqual(enqueue_urls(["https://test.com/a", "https://test.com/d"], requeue=True), 1)
+        
+        self.assertEqual(FrontierURL.objects.count(), 3)
+        self.assertEqual(FrontierURL.objects.get(url="https://test.com/a").website.domain, "test.com")
+        self.assertEqual(NewsWebsite.objects.count(), 2)
+    
+    def test_claim_batch_respects_priority_and_eligibility(self):
+        enqueue_urls(["https://test.com/low"], priority=0)
+        enqueue_urls(["https://test.com/high"], priority=10)
+        enqueue_urls(["https://test.com/later"], priority=20)
+        FrontierURL.objects.filter(url="https://test.com/later").update(
+            next_eligible_at=timezone.now() + timedelta(hours=1)
+        )
+        
+        batch = claim_batch(10)
+        self.assertEqual([item.url for item in batch], ["https://test.com/high", "https://test.com/low"])
+        self.assertEqual(claim_batch(10), [])
+        self.assertEqual(FrontierURL.objects.filter(state='in_flight').count(), 2)
+    
+    def test_mark_failed_retries_then_gives_up(self):
+        enqueue_urls(["https://test.com/flaky"])
+        item = claim_batch(1)[0]
+        
+        for attempt in range(1, MAX_ATTEMPTS):
+            self.assertFalse(mark_failed(item, "Timeout"))
+            item.refresh_from_db()
+            self.assertEqual(item.state, 'queued')
+            self.assertEqual(item.attempts, attempt)
+            self.assertGreater(item.next_eligible_at, timezone.now())
+            lease(item)
+        
+        self.assertTrue(mark_failed(item, "Timeout"))
+        item.refresh_from_db()
+        self.assertEqual(item.state, 'failed')
+    
+    def test_workers_do_not_share_claims(self):
+        enqueue_urls([f"https://test.com/{i}" for i in range(5)])
+        
+        first = claim_batch(3, worker_id='worker-1')
+        second = claim_batch(3, worker_id='worker-2')
+        
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({item.pk for item in first} & {item.pk for item in second})
+        self.assertTrue(all(item.lease_owner == 'worker-2' for item in second))
+    
+    def test_expired_lease_is_reclaimed(self):
+        enqueue_urls(["https://test.com/a", "https://test.com/b"])
+        crashed = claim_batch(2, worker_id='crashed-worker')
+        self.assertEqual(claim_batch(2, worker_id='other-worker'), [])
+        
+        FrontierURL.objects.filter(url="https://test.com/a").update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        reclaimed = claim_batch(2, worker_id='other-worker')
+        self.assertEqual([item.url for item in reclaimed], ["https://test.com/a"])
+        
+        # Utracona dzierżawa nie może zostać przedłużona przez poprzedniego właściciela
+        self.assertEqual(extend_lease(crashed, 'crashed-worker'), 1)
+    
+    def test_expired_lease_owner_cannot_overwrite_outcome(self):
+        enqueue_urls(["https://test.com/a"])
+        stale, = claim_batch(1, worker_id='slow-worker')
+        FrontierURL.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        current, = claim_batch(1, worker_id='other-worker')
+        
+        self.assertFalse(mark_failed(stale, "Timeout"))
+        self.assertFalse(mark_timeout(stale, "Przekroczono limit czasu ekstrakcji"))
+        self.assertTrue(mark_done(current))
+        self.assertFalse(mark_done(stale))
+        
+        item = FrontierURL.objects.get()
+        self.assertEqual(item.state, 'done')
+        self.assertEqual((item.attempts, item.fetch_count, item.timeout_count), (1, 1, 0))
+    
+    def test_enqueue_urls_command_reads_files(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as handle:
+            handle.write("https://test.com/1\nhttps://test.com/2\n")
+        self.addCleanup(os.unlink, handle.name)
+        
+        call_command('enqueue_urls', handle.name, '--priority', '5', stdout=StringIO())
+        
+        self.assertEqual(FrontierURL.objects.filter(priority=5, state='queued').count(), 2)
+
+class DiscoveryTest(TestCase):
+    def setUp(self):
+        self.server = start_fixture_server(self, 'discovery')
+        
+        self.website = NewsWebsite.objects.create(
+            name="Fixture",
+            url=self.server.base_url,
+            domain=self.server.base_url.split('//', 1)[1]
+        )
+    
+    def test_sitemap_index_with_gzip_child(self):
+        stats = discover_urls([self.website])
+        
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['entries'], 3)
+        self.assertEqual(set(FrontierURL.objects.values_list('url', flat=True)), {
+            self.server.url('ford-c-max-jaki-silnik-benzynowy-wybrac'),
+            self.server.url('bmw-e9-30-cs-szczegolowe-informacje'),
+            self.server.url('kontakt'),
+        })
+        
+        child = DiscoverySource.objects.get(url=self.server.url('sitemap-posts.xml.gz'))
+        self.assertEqual(child.parent.url, self.server.url('sitemap.xml'))
+        self.assertIsNotNone(child.last_seen_lastmod)
+        self.assertTrue(child.etag)
+    
+    def test_second_run_uses_conditional_requests(self):
+        discover_urls([self.website])
+        self.server.requests.clear()
+        
+        stats = discover_urls([self.website])
+        
+        self.assertEqual(stats['entries'], 0)
+        self.assertEqual(stats['not_modified'], 1)
+        index_requests = self.server.requests_for('/sitemap.xml')
+        self.assertEqual(len(index_requests), 1)
+        self.assertIn('If-None-Match', index_requests[0]['headers'])
+        self.assertEqual(self.server.requests_for('/sitemap-posts.xml.gz'), [])
+    
+    def test_feeds_enqueue_only_new_entries(self):
+        DiscoverySource.objects.create(website=self.website, url=self.server.url('atom.xml'), kind='feed')
+        feed = DiscoverySource.objects.create(
+            website=self.website,
+            url=self.server.url('feed.xml'),
+            kind='feed',
+            last_seen_lastmod=parse_lastmod("Mon, 14 Oct 2024 10:30:00 +0200")
+        )
+        
+        discover_urls([self.website])
+        
+        urls = set(FrontierURL.objects.values_list('url', flat=True))
+        self.assertIn(self.server.url('nowy-artykul-z-rss'), urls)
+        self.assertIn(self.server.url('jak-kroic-piers-z-kurczaka'), urls)
+        
+        feed.refresh_from_db()
+        self.assertEqual(feed.last_seen_lastmod, parse_lastmod("2024-10-15T06:00:00Z"))
+        self.assertEqual(
+            parse_lastmod("Mon, 14 Oct 2024 10:30:00 +0200") + timedelta(hours=2),
+            parse_lastmod("2024-10-14T10:30:00Z")
+        )
+    
+    def copy_server(self):
+        root = Path(temp_directory(self))
+        shutil.copytree(TESTDATA / 'discovery', root, dirs_exist_ok=True)
+        server = start_fixture_server(self, root)
+        website = NewsWebsite.objects.create(name="Kopia", url=server.base_url, domain=server.base_url.split('//', 1)[1])
+        return root, server, website
+    
+    def test_failed_child_sitemap_is_retried(self):
+        root, server, website = self.copy_server()
+        override = root / 'sitemap-posts.xml.gz.headers.json'
+        override.write_text('{"status": 500}')
+        
+        stats = discover_urls([website])
+        self.assertEqual(stats['errors'], 1)
+        self.assertFalse(FrontierURL.objects.filter(url=server.url('ford-c-max-jaki-silnik-benzynowy-wybrac')).exists())
+        
+        override.unlink()
+        stats = discover_urls([website])
+        self.assertEqual(stats['errors'], 0)
+        self.assertTrue(FrontierURL.objects.filter(url=server.url('ford-c-max-jaki-silnik-benzynowy-wybrac')).exists())
+    
+    def test_gzip_sitemap_with_content_encoding(self):
+        root, server, website = self.copy_server()
+        # Serwer kompresuje transfer - urllib3 rozpakowuje, pliku nie wolno rozpakować drugi raz
+        (root / 'sitemap-posts.xml.gz.headers.json').write_text('{"headers": {"Content-Encoding": "gzip"}}')
+        # Uszkodzony gzip psuje tylko swoje źródło
+        (root / 'sitemap-pages.xml.gz').write_bytes(b'\x1f\x8b\x08\x00uszkodzony')
+        (root / 'sitemap.xml').write_text(
+            (root / 'sitemap.xml').read_text().replace('sitemap-pages.xml', 'sitemap-pages.xml.gz')
+        )
+        
+        stats = discover_urls([website])
+        
+        self.assertEqual(stats['errors'], 1)
+        self.assertTrue(FrontierURL.objects.filter(url=server.url('ford-c-max-jaki-silnik-benzynowy-wybrac')).exists())
+        self.assertFalse(FrontierURL.objects.filter(url=server.url('kontakt')).exists())
+    
+    def test_processed_entries_are_detached_from_tree(self):
+        items = ''.join(f'<item><link>https://test.com/{i}</link></item>' for i in range(100))
+        feed = f'<rss><channel><title>Test</title>{items}</channel></rss>'.encode()
+        roots = []
+        original = ElementTree.iterparse
+        
+        def iterparse(*args, **kwargs):
+            for event, elem in original(*args, **kwargs):
+                if not roots:
+                    roots.append(elem)
+                yield event, elem
+        
+        with mock.patch('crawler.discovery.ElementTree.iterparse', iterparse):
+            entries = list(iter_entries(BytesIO(feed)))
+        
+        self.assertEqual(len(entries), 100)
+        channel = roots[0].find('channel')
+        self.assertEqual([child.tag for child in channel], ['title'])
+
+class RecrawlSchedulingTest(TestCase):
+    def setUp(self):
+        sleep_patcher = mock.patch('crawler.scraper.time.sleep')
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+    
+    def article_data(self, url, content):
+        return {
+            'status': 'success',
+            'url': url,
+            'title': "Artykuł do ponownej wizyty",
+            'original_content': f"<p>{content}</p>",
+            'plain_text_content': content,
+            'published_date_normalized': timezone.now() - timedelta(hours=2),
+            'http_status_code': 200,
+        }
+    
+    def test_interval_backs_off_until_content_changes(self):
+        url = "https://test.com/a"
+        enqueue_urls([url])
+        fresh = timezone.now() - timedelta(hours=2)
+        
+        mark_done(claim_batch(1)[0], content_hash=content_hash(self.article_data(url, "v1")), published_at=fresh)
+        item = FrontierURL.objects.get(url=url)
+        self.assertEqual(item.state, 'done')
+        self.assertEqual(item.revisit_interval, MIN_REVISIT_SECONDS)
+        self.assertGreater(item.next_eligible_at, timezone.now())
+        
+        mark_done(lease(item), content_hash=item.content_hash)
+        item.refresh_from_db()
+        self.assertEqual(item.revisit_interval, 2 * MIN_REVISIT_SECONDS)
+        self.assertEqual(item.change_count, 0)
+        
+        mark_done(lease(item), content_hash=content_hash(self.article_data(url, "v2")))
+        item.refresh_from_db()
+        self.assertEqual(item.revisit_interval, MIN_REVISIT_SECONDS)
+        self.assertEqual(item.change_count, 1)
+        self.assertEqual(item.fetch_count, 3)
+    
+    def test_old_articles_are_revisited_rarely(self):
+        enqueue_urls(["https://test.com/old"])
+        mark_done(claim_batch(1)[0], published_at=timezone.now() - timedelta(days=365))
+        
+        self.assertEqual(FrontierURL.objects.get().revisit_interval, OLD_ARTICLE_REVISIT_SECONDS)
+    
+    def test_schedule_revisits_respects_hourly_budget(self):
+        enqueue_urls([f"https://test.com/{i}" for i in range(5)])
+        FrontierURL.objects.update(
+            state='done',
+            fetch_count=1,
+            last_fetched_at=timezone.now() - timedelta(days=1),
+            next_eligible_at=timezone.now() - timedelta(minutes=1)
+        )
+        FrontierURL.objects.filter(url="https://test.com/0").update(last_fetched_at=timezone.now())
+        
+        self.assertEqual(schedule_revisits(budget_per_hour=3), 2)
+        self.assertEqual(FrontierURL.objects.filter(state='queued').count(), 2)
+        self.assertEqual(schedule_revisits(budget_per_hour=3), 0)
+    
+    def test_revisit_updates_existing_article(self):
+        url = "https://test.com/zmieniany"
+        enqueue_urls([url])
+        scraper = ArticleScraper()
+        
+        with mock.patch.object(ArticleScraper, 'scrape_article', return_value=self.article_data(url, "Pierwsza wersja")):
+            scraper.process_frontier(delay=0)
+        FrontierURL.objects.update(next_eligible_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(schedule_revisits(budget_per_hour=10), 1)
+        
+        version = get_data_version()
+        with mock.patch.object(ArticleScraper, 'scrape_article', return_value=self.article_data(url, "Druga wersja")) as scrape:
+            scraper.process_frontier(delay=0)
+        
+        scrape.assert_called_once_with(url, refresh=True, isolate=False)
+        self.assertEqual(Article.objects.get(url=url).plain_text_content, "Druga wersja")
+        self.assertGreater(get_data_version(), version)
+        item = FrontierURL.objects.get(url=url)
+        self.assertEqual((item.fetch_count, item.change_count), (2, 1))
+
+class EmbeddedExtractorTest(TestCase):
+    def setUp(self):
+        self.server = start_fixture_server(self, 'extractors')
+    
+    def extract(self, name, fallback=False):
+        scraper = ArticleScraper()
+        response, error = scraper.get_page_content(self.server.url(name))
+        return extract_embedded(response.text, response.url, fetch=scraper.get_page_content, fallback=fallback)
+    
+    def test_next_data(self):
+        article = self.extract('next_data.html')
+        
+        self.assertEqual(article['extractor'], 'next_data')
+        self.assertEqual(article['title'], "Jak kroić pierś z kurczaka, aby uniknąć suchych kawałków mięsa")
+        self.assertTrue(article['plain_text'].startswith("Pierś z kurczaka kroimy"))
+        self.assertEqual(article['published'], "2024-10-14T10:30:00+02:00")
+    
+    def test_json_ld_article_in_graph(self):
+        article = self.extract('json_ld.html')
+        
+        self.assertEqual(article['extractor'], 'json_ld')
+        self.assertEqual(article['title'], "Ford C-Max – jaki silnik benzynowy wybrać")
+        self.assertTrue(article['content'].startswith("<p>Ford C-Max"))
+    
+    def test_static_json_endpoint(self):
+        self.assertIsNone(self.extract('spa.html'))
+        article = self.extract('spa.html', fallback=True)
+        
+        self.assertEqual(article['extractor'], 'json_endpoint')
+        self.assertEqual(article['content'].count('<p>'), 2)
+        self.assertEqual(len(self.server.requests_for('/data/post.json')), 1)
+    
+    def test_spa_shell_fetches_endpoint_after_dom(self):
+        with self.settings(CRAWLER_EMBEDDED_FETCH_DELAY=0):
+            data = ArticleScraper().scrape_article(self.server.url('spa.html'))
+        
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual(data['metadata']['extractor'], 'json_endpoint')
+        # DOM sprawdzony przed dociągnięciem pliku; jego pobranie nie wchodzi w etapy strony
+        self.assertIn('parse', data['timings'])
+        self.assertLess(data['timings']['download'], data['timings']['total'])
+        self.assertEqual(len(self.server.requests_for('/data/post.json')), 1)
+    
+    def test_dom_article_skips_wordpress_json_links(self):
+        data = ArticleScraper().scrape_article(self.server.url('wordpress.html'))
+        
+        self.assertEqual(data['status'], 'success')
+        self.assertNotIn('extractor', data['metadata'])
+        self.assertEqual(data['title'], "Co można zrobić ze schabu oprócz kotletów")
+        self.assertEqual([request['path'] for request in self.server.requests], ['/wordpress.html'])
+    
+    def test_json_script_requires_article_marker(self):
+        widget = '<script type="application/json">{"title": "Newsletter", "text": "%s"}</script>'
+        article = '<script type="application/json">{"post": {"__typename": "Post", "title": "Tytuł", "body": "%s"}}</script>'
+        
+        self.assertIsNone(JsonScriptExtractor().extract(Page('https://test.com/a', widget % ('x' * 100))))
+        self.assertIsNotNone(JsonScriptExtractor().extract(Page('https://test.com/a', widget % ('x' * 600))))
+        self.assertIsNotNone(JsonScriptExtractor().extract(Page('https://test.com/a', article % ('x' * 100))))
+    
+    
+    def test_unclosed_script_is_scanned_linearly(self):
+        started = time.perf_counter()
+        scripts = Page('https://test.com/a', '<script>' * 20000 + '<script type="application/json">{}' + 'x' * 200000).scripts
+        
+        self.assertEqual(scripts, [])
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(
+            Page('https://test.com/a', '<SCRIPT id="a">1</Script ><script>2').scripts,
+            [({'id': 'a'}, '1')]
+        )
+    
+    def test_plain_html_falls_back_to_dom(self):
+        self.assertIsNone(extract_embedded("<html><body><article><h1>Tytuł</h1></article></body></html>", "https://test.com/a"))
+    
+    def test_scrape_article_uses_embedded_data(self):
+        data = ArticleScraper().scrape_article(self.server.url('next_data.html'))
+        
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual(data['metadata']['extractor'], 'next_data')
+        self.assertEqual(data['published_date_normalized'].isoformat(), "2024-10-14T10:30:00+02:00")
+    
+    def test_impossible_embedded_date_does_not_fail_page(self):
+        for published in ("2024-02-30T10:30:00+02:00", "31 lutego 2024"):
+            def embedded(*args, **kwargs):
+                return dict(extract_embedded(*args, **kwargs), published=published)
+            
+            with mock.patch('crawler.scraper.extract_embedded', embedded):
+                scraper = ArticleScraper()
+                data = scraper.scrape_article(self.server.url('next_data.html'))
+            
+            self.assertEqual(data['status'], 'success')
+            self.assertEqual(data['published_date_normalized'], scraper.date_parser.now.replace(hour=0, minute=0, second=0))
+
+class StageMetricsTest(TestCase):
+    def test_histogram_buckets(self):
+        histogram = empty_histogram()
+        observe(histogram, 0.003)
+        observe(histogram, 0.2)
+        observe(histogram, 120)
+        
+        self.assertEqual(histogram['count'], 3)
+        self.assertEqual(histogram['buckets'][0], 1)
+        self.assertEqual(histogram['buckets'][BUCKETS.index(0.25)], 1)
+        self.assertEqual(histogram['buckets'][-1], 1)
+        self.assertEqual(merge(empty_histogram(), histogram)['count'], 3)
+    
+    def test_frontier_crawl_records_stage_timings(self):
+        server = start_fixture_server(self, 'extractors')
+        domain = server.base_url.split('//', 1)[1]
+        
+        crawl_session = enqueue_crawl_job([server.url('next_data.html'), server.url('json_ld.html')])
+        ArticleScraper().process_frontier(delay=0)
+        
+        article = Article.objects.get(url=server.url('next_data.html'))
+        self.assertEqual(
+            set(article.metadata['timings']),
+            {'dns', 'first_byte', 'download', 'decode', 'extract_embedded', 'total'}
+        )
+        
+        metric = StageMetric.objects.get(domain=domain, stage='db_write')
+        self.assertEqual(metric.count, 2)
+        self.assertEqual(sum(metric.buckets), 2)
+        self.assertTrue(StageMetric.objects.filter(domain=domain, stage='queue_wait').exists())
+        
+        crawl_session.refresh_from_db()
+        self.assertEqual(crawl_session.metrics[domain]['total']['count'], 2)
+        
+        response = Client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE crawler_stage_duration_seconds histogram', body)
+        self.assertIn(f'crawler_stage_duration_seconds_count{{domain="{domain}",stage="total"}} 2', body)
+        self.assertIn(f'crawler_stage_duration_seconds_bucket{{domain="{domain}",stage="total",le="+Inf"}} 2', body)
+        self.assertIn('crawler_articles{status="success"} 2', body)
+    
+    def test_dns_is_timed_on_real_connections_only(self):
+        server = start_fixture_server(self, 'extractors')
+        scraper = ArticleScraper()
+        
+        with mock.patch.object(transport, '_resolve', wraps=transport._resolve) as resolve:
+            response, error = scraper.get_page_content(server.url('next_data.html'))
+            self.assertEqual(error, "")
+            self.assertEqual(resolve.call_count, 1)
+            self.assertIn('dns', scraper._timer.timings)
+            self.assertIn('first_byte', scraper._timer.timings)
+            
+            # Poza pobraniem artykułu nie ma licznika - brak dodatkowego zapytania
+            scraper.http.get(server.url('json_ld.html'), timeout=10)
+            self.assertEqual(resolve.call_count, 1)
+
+class BenchmarkTest(TestCase):
+    def test_benchmark_reports_machine_readable_results(self):
+        results = run_benchmark(repeat=1, huge_kb=16)
+        
+        summary = results['summary']
+        self.assertEqual(summary['pages'], 5)
+        self.assertEqual(summary['failed'], 0)
+        self.assertGreater(summary['pages_per_second'], 0)
+        self.assertGreater(summary['peak_rss_kb'], 0)
+        self.assertGreater(summary['queries_per_article'], 0)
+        self.assertIn('db_write', results['stages'])
+        self.assertIn('parse', results['stages'])
+        self.assertEqual(set(results['pages']), {'blog.html', 'dates.html', 'galicjaexpress.html', 'huge.html', 'spa_next_data.html'})
+        # Benchmark nie zostawia danych w bazie
+        self.assertFalse(Article.objects.exists())
+        
+        baseline = json.loads(json.dumps(results))
+        baseline['summary']['queries_per_article'] = summary['queries_per_article'] / 2
+        regressions = [change['metric'] for change in compare(results, baseline) if change['regression']]
+        self.assertEqual(regressions, ['queries_per_article'])
+    
+    def test_error_injection(self):
+        results = run_benchmark(repeat=4, error_rate=1.0, pages=['blog.html'])
+        
+        self.assertEqual(results['summary']['failed'], 4)
+
+class QueryBudgetTest(TestCase):
+    def test_endpoints_stay_within_query_budget(self):
+        seed_database(articles=30, websites=3)
+        small = measure_queries()
+        seed_database(articles=120, websites=12)
+        large = measure_queries()
+        
+        self.assertEqual(set(large), set(QUERY_BUDGETS))
+        self.assertEqual(check_query_budgets(large), [])
+        # Liczba zapytań nie rośnie z liczbą rekordów (brak N+1)
+        self.assertEqual(small, large)
+    
+    def test_budget_violation_is_reported(self):
+        self.assertEqual(
+            check_query_budgets({'websites_list': 14}),
+            [{'endpoint': 'websites_list', 'queries': 14, 'budget': 4}]
+        )
+    
+    def test_load_run_reports_latency_percentiles(self):
+        self.assertEqual(percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 95), 10)
+        self.assertEqual(percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 50), 5)
+        
+        seed_database(articles=10, websites=2)
+        with self.settings(ALLOWED_HOSTS=['127.0.0.1']), LocalServer(share_connection=True) as server:
+            results = run_load(server.base_url, [('websites_list', '/api/websites/')], concurrency=2, requests_per_endpoint=6)
+        
+        stats = results['endpoints']['websites_list']
+        self.assertEqual((stats['requests'], stats['errors']), (6, 0))
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        self.assertGreater(results['summary']['throughput_rps'], 0)
+
+class QueryPlanTest(TestCase):
+    # EXPLAIN dla każdego zapytania widoków na dużej tabeli artykułów
+    
+    @classmethod
+    def setUpTestData(cls):
+        seed_database(articles=3000, websites=20)
+        # Statystyki dla planera - bez nich SQLite zgaduje rozmiary tabel
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    
+    def test_view_queries_use_indexes(self):
+        plans = capture_query_plans()
+        
+        self.assertEqual(set(plans), {name for name, path in default_endpoints()})
+        self.assertEqual(check_query_plans(plans), [])
+    
+    def test_missing_composite_index_is_reported(self):
+        # Wycofywane razem z transakcją testu
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX article_website_published_idx')
+            cursor.execute('ANALYZE')
+        endpoints = [endpoint for endpoint in default_endpoints() if endpoint[0] == 'articles_list_source']
+        
+        problems = check_query_plans(capture_query_plans(endpoints))
+        
+        self.assertTrue(problems)
+        self.assertEqual({problem['endpoint'] for problem in problems}, {'articles_list_source'})
+    
+    def test_index_walk_on_filtered_query_is_reported(self):
+        # Sortowanie z indeksu dat i filtr serwisu sprawdzany dla każdego wiersza
+        plans = {'articles_list_source': [
+            ("SELECT * FROM crawler_article INNER JOIN crawler_newswebsite ON (website_id = crawler_newswebsite.id) "
+             "WHERE domain LIKE '%x%' ORDER BY published_date_normalized DESC LIMIT 20",
+             ['SCAN crawler_article USING INDEX article_published_idx',
+              'SEARCH crawler_newswebsite USING INTEGER PRIMARY KEY (rowid=?)']),
+        ], 'articles_list': [
+            ("SELECT COUNT(*) FROM crawler_article", ['SCAN crawler_article USING COVERING INDEX article_updated_idx']),
+        ]}
+        
+        problems = check_query_plans(plans)
+        self.assertEqual([problem['endpoint'] for problem in problems], ['articles_list_source'])
+    
+    def test_full_scan_is_allowed_only_for_text_search(self):
+        plans = {
+            'articles_search': [("SELECT COUNT(*) FROM crawler_article WHERE title LIKE '%x%'", ['SCAN crawler_article'])],
+            'articles_list': [("SELECT * FROM crawler_article ORDER BY title", ['SCAN crawler_article', 'USE TEMP B-TREE FOR ORDER BY'])],
+        }
+        
+        self.assertEqual(
+            [problem['problem'] for problem in check_query_plans(plans)],
+            ['pelny skan tabeli crawler_article', 'sortowanie bez indeksu (crawler_article)']
+        )
+
+class ProfilingTest(TestCase):
+    def test_statement_shape_ignores_values(self):
+        self.assertEqual(
+            statement_shape('SELECT "id" FROM "crawler_article" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+            statement_shape('SELECT  "id" FROM "crawler_article" WHERE "id" IN (%s) LIMIT 5')
+        )
+        self.assertEqual(statement_shape("SELECT 1 WHERE name = 'x'"), "SELECT ? WHERE name = ?")
+    
+    def test_sql_log_counts_queries_of_other_threads(self):
+        directory = temp_directory(self)
+        
+        def query(sql):
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+        
+        def worker():
+            query("SELECT 'watek'")
+            connection.close()
+        
+        writer = SingleWriter()
+        self.addCleanup(writer.close)
+        # Połączenie wątku zapisującego otwarte jeszcze przed przebiegiem
+        writer.run(query, "SELECT 'przed'")
+        
+        with mock.patch('crawler.profiling.get_writer', return_value=writer), \
+                RunProfiler(directory, sql_log=True) as profiler:
+            writer.run(query, "SELECT 'zapis', 1")
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            query("SELECT 'glowny', 1, 2")
+        
+        statements = {item['statement'] for item in profiler._sql.summary()['statements']}
+        self.assertTrue({'SELECT ?', 'SELECT ?, ?', 'SELECT ?, ?, ?'} <= statements)
+        self.assertNotIn(profiler._sql, connection.execute_wrappers)
+    
+    def test_trace_memory_leaves_foreign_tracing_running(self):
+        directory = temp_directory(self)
+        
+        if not tracemalloc.is_tracing():
+            with RunProfiler(directory, trace_memory=True):
+                pass
+            self.assertFalse(tracemalloc.is_tracing())
+        
+        # tracemalloc włączony wcześniej (np. przez budżet pamięci) działa dalej
+        tracemalloc.start(1)
+        self.addCleanup(tracemalloc.stop)
+        with RunProfiler(directory, trace_memory=True) as profiler:
+            pass
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertIn('peak_kb', profiler.summary['memory'])
+    
+    def test_scrape_articles_profiles_frontier_without_own_session(self):
+        enqueue_urls(["https://test.com/a", "https://test.com/b"])
+        profile_root = temp_directory(self)
+        
+        with self.settings(CRAWLER_PROFILE_DIR=profile_root), \
+                mock.patch('crawler.scraper.time.sleep'), \
+                mock.patch.object(ArticleScraper, 'scrape_article', return_value={'status': 'skipped'}):
+            call_command('scrape_articles', '--frontier', '--profile', '--trace-memory', '--sql-log', stdout=StringIO())
+        
+        # Przebieg kolejki nie zakłada sesji, której URL-e nie należą
+        self.assertFalse(CrawlSession.objects.exists())
+        self.assertFalse(FrontierURL.objects.filter(state__in=['queued', 'in_flight']).exists())
+        
+        directory, = Path(profile_root).iterdir()
+        self.assertTrue(directory.name.startswith('frontier-'))
+        self.assertEqual(
+            {path.name for path in directory.iterdir()},
+            {'profile.prof', 'profile.txt', 'memory.snapshot', 'memory.txt', 'sql.json', 'sql.txt'}
+        )
+        self.assertIn('process_frontier', (directory / 'profile.txt').read_text())
+        
+        sql = json.loads((directory / 'sql.json').read_text())
+        self.assertGreater(sql['queries'], 0)
+        self.assertEqual(sql['queries'], sum(item['count'] for item in sql['statements']))
+    
+    def test_scrape_articles_writes_profiles_next_to_session(self):
+        profile_root = temp_directory(self)
+        
+        with self.settings(CRAWLER_PROFILE_DIR=profile_root), \
+                mock.patch('crawler.scraper.time.sleep'), \
+                mock.patch.object(ArticleScraper, 'scrape_article', return_value={'status': 'skipped'}):
+            call_command('scrape_articles', '--sql-log', stdout=StringIO())
+        
+        crawl_session = CrawlSession.objects.get()
+        self.assertEqual(crawl_session.status, 'completed')
+        self.assertEqual(crawl_session.total_articles, len(ArticleScraper().target_urls))
+        
+        directory = Path(crawl_session.profile_dir)
+        self.assertEqual(directory, Path(profile_root) / f"session-{crawl_session.pk}")
+        self.assertEqual({path.name for path in directory.iterdir()}, {'sql.json', 'sql.txt'})
+
+class StreamingResultsTest(TestCase):
+    def article_data(self, url):
+        return {
+            'status': 'success',
+            'url': url,
+            'title': f"Artykuł {url}",
+            'original_content': "<p>Treść</p>",
+            'plain_text_content': "Treść",
+            'published_date_normalized': timezone.now(),
+            'timings': {'total': 0.25},
+        }
+    
+    def test_iter_frontier_yields_compact_results_one_by_one(self):
+        enqueue_urls([f"https://test.com/{i}" for i in range(3)])
+        stats = ScrapeStats()
+        scraper = ArticleScraper()
+        
+        with mock.patch.object(ArticleScraper, 'scrape_article', side_effect=lambda url, refresh=False, isolate=False: self.article_data(url)):
+            results = scraper.iter_frontier(delay=0, stats=stats)
+            first = next(results)
+            # Kolejne URL-e nie są pobierane, dopóki konsument nie poprosi o wynik
+            self.assertEqual(FrontierURL.objects.filter(state='done').count(), 1)
+            self.assertIsInstance(first, ScrapeResult)
+            self.assertFalse(hasattr(first, '__dict__'))
+            self.assertEqual(first.article_id, Article.objects.get(url=first.url).id)
+            self.assertEqual(first.duration, 0.25)
+            rest = list(results)
+        
+        self.assertEqual(len(rest), 2)
+        self.assertEqual(stats.as_dict(), {'total': 3, 'successful': 3, 'failed': 0, 'skipped': 0})
+    
+    def test_process_frontier_returns_only_counters(self):
+        enqueue_urls(["https://test.com/a", "https://test.com/b"])
+        with mock.patch.object(ArticleScraper, 'scrape_article', side_effect=[
+            self.article_data("https://test.com/a"),
+            {'status': 'skipped'},
+        ]):
+            results = ArticleScraper().process_frontier(delay=0)
+        
+        self.assertEqual(results, {'total': 2, 'successful': 1, 'failed': 0, 'skipped': 1})
+
+class MemoryBudgetTest(TestCase):
+    def setUp(self):
+        if not tracemalloc.is_tracing():
+            self.addCleanup(tracemalloc.stop)
+        self.server = start_fixture_server(self, 'benchmark')
+    
+    def test_budget_caps_parsed_documents_in_flight(self):
+        budget = ParseBudget(64 * 1024 * 1024)
+        # Proces zajmuje prawie cały budżet - zostaje miejsce na jeden dokument
+        rss_kb = (budget.budget_bytes - budget.estimate(100 * 1024)) // 1024 + 1
+        patcher = mock.patch('crawler.memory.current_rss_kb', return_value=rss_kb)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        entered = threading.Event()
+        
+        def parse_second():
+            with budget.reserve(100 * 1024):
+                entered.set()
+        
+        with budget.reserve(100 * 1024):
+            thread = threading.Thread(target=parse_second)
+            thread.start()
+            # Drugi dokument nie mieści się obok pierwszego
+            self.assertFalse(entered.wait(0.2))
+            self.assertEqual(budget.documents, 1)
+        
+        self.assertTrue(entered.wait(5))
+        thread.join()
+        self.assertEqual((budget.documents, budget.in_use), (0, 0))
+    
+    def test_page_memory_is_recorded_and_soup_released(self):
+        with self.settings(CRAWLER_MEMORY_BUDGET_MB=256), \
+                mock.patch.object(BeautifulSoup, 'decompose', autospec=True, side_effect=BeautifulSoup.decompose) as decompose:
+            article_data = ArticleScraper().scrape_article(self.server.url('galicjaexpress.html'))
+        
+        self.assertEqual(article_data['status'], 'success')
+        decompose.assert_called()
+        self.assertGreater(article_data['metadata']['peak_memory_kb'], 0)
+        self.assertEqual(article_data['peak_memory_kb'], article_data['metadata']['peak_memory_kb'])
+    
+    def test_budget_follows_current_rss_and_worker_processes(self):
+        budget = memory.ParseBudget(64 * 1024 * 1024)
+        with mock.patch.object(memory, 'current_rss_kb', return_value=16 * 1024):
+            self.assertEqual(budget.headroom_bytes(), 48 * 1024 * 1024)
+        with mock.patch.object(memory, 'current_rss_kb', return_value=60 * 1024):
+            self.assertEqual(budget.headroom_bytes(), 4 * 1024 * 1024)
+        
+        self.addCleanup(memory.set_worker_processes, 1)
+        memory.set_worker_processes(4)
+        with self.settings(CRAWLER_MEMORY_BUDGET_MB=256):
+            self.assertEqual(memory.shared_budget().budget_bytes, 64 * 1024 * 1024)
+    
+    def test_page_memory_includes_peak_between_samples(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        with mock.patch('crawler.memory._budget_tracing', True):
+            page_memory = PageMemory()
+        # Bufor zwolniony przed odczytem nadal liczy się do szczytu
+        buffer = bytearray(4 * 1024 * 1024)
+        del buffer
+        self.assertGreaterEqual(page_memory.peak_kb, 4000)
+    
+    def test_page_memory_keeps_profiler_peak(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        buffer = bytearray(16 * 1024 * 1024)
+        del buffer
+        run_peak = tracemalloc.get_traced_memory()[1]
+        
+        # tracemalloc włączony przez --trace-memory: szczyt przebiegu nie jest zerowany
+        with mock.patch('crawler.memory._budget_tracing', False):
+            page_memory = PageMemory()
+        buffer = bytearray(4 * 1024 * 1024)
+        self.assertGreaterEqual(page_memory.peak_kb, 4000)
+        self.assertGreaterEqual(tracemalloc.get_traced_memory()[1], run_peak)
+        del buffer
+    
+    def test_page_exceeding_budget_is_rejected(self):
+        with self.settings(CRAWLER_MEMORY_BUDGET_MB=0.05):
+            article_data = ArticleScraper().scrape_article(self.server.url('galicjaexpress.html'))
+        
+        self.assertEqual(article_data['status'], 'failed')
+        self.assertIn('budżet pamięci', article_data['error_message'])
+
+class ParseDeadlineTest(TestCase):
+    def setUp(self):
+        self.server = start_fixture_server(self, 'benchmark')
+    
+    def stall(self, *args):
+        time.sleep(5)
+        return "Tytuł, którego nie będzie"
+    
+    def test_slow_extraction_fails_with_timeout_reason(self):
+        with self.settings(CRAWLER_PARSE_WALL_SECONDS=0.2), \
+                mock.patch.object(ArticleScraper, 'extract_title', self.stall):
+            article_data = ArticleScraper().scrape_article(self.server.url('blog.html'))
+        
+        self.assertEqual(article_data['status'], 'failed')
+        self.assertTrue(article_data['timed_out'])
+        self.assertIn('Przekroczono limit czasu ekstrakcji', article_data['error_message'])
+    
+    def test_timeout_inside_extractor_is_not_swallowed(self):
+        # extract_published_date łapie Exception i zwraca datę zastępczą -
+        # przekroczenie limitu w jego wnętrzu musi mimo to przerwać stronę
+        with self.settings(CRAWLER_PARSE_WALL_SECONDS=0.3), \
+                mock.patch.object(UniversalDateParser, 'parse_date', self.stall):
+            article_data = ArticleScraper().scrape_article(self.server.url('blog.html'))
+        
+        self.assertEqual(article_data['status'], 'failed')
+        self.assertTrue(article_data['timed_out'])
+    
+    def test_embedded_extraction_runs_under_deadline(self):
+        with self.settings(CRAWLER_PARSE_WALL_SECONDS=0.3), \
+                mock.patch.object(NextDataExtractor, 'extract', self.stall):
+            article_data = ArticleScraper().scrape_article(self.server.url('spa_next_data.html'))
+        
+        self.assertEqual(article_data['status'], 'failed')
+        self.assertTrue(article_data['timed_out'])
+    
+    def test_isolated_worker_is_killed_on_deadline(self):
+        def spin():
+            while True:
+                pass
+        
+        started = time.perf_counter()
+        with self.assertRaisesMessage(ExtractionTimeout, 'czasu rzeczywistego'):
+            run_isolated(time.sleep, 10, wall_seconds=0.3)
+        with self.assertRaisesMessage(ExtractionTimeout, 'czasu CPU'):
+            run_isolated(spin, wall_seconds=10, cpu_seconds=1)
+        self.assertLess(time.perf_counter() - started, 8)
+        self.assertEqual(run_isolated(sum, [1, 2, 3], wall_seconds=10), 6)
+    
+    def test_repeat_offenders_are_quarantined(self):
+        urls = [self.server.url(f'blog.html?v={i}') for i in range(SITE_QUARANTINE_TIMEOUTS)]
+        enqueue_urls(urls)
+        scraper = ArticleScraper()
+        
+        with self.settings(CRAWLER_PARSE_WALL_SECONDS=0.3), \
+                mock.patch.object(ArticleScraper, 'extract_title', self.stall), \
+                mock.patch('crawler.scraper.run_isolated', wraps=run_isolated) as isolated:
+            for _ in range(QUARANTINE_AFTER_TIMEOUTS):
+                FrontierURL.objects.update(next_eligible_at=timezone.now() - timedelta(seconds=1))
+                scraper.process_frontier(delay=0)
+        
+        self.assertEqual(set(FrontierURL.objects.values_list('state', flat=True)), {'quarantined'})
+        # Ponowne próby (i strony serwisu na kwarantannie) działają w osobnym procesie
+        self.assertEqual(isolated.call_count, len(urls))
+        self.assertEqual(FrontierURL.objects.filter(timeout_count=QUARANTINE_AFTER_TIMEOUTS).count(), len(urls))
+        article = Article.objects.get(url=urls[0])
+        self.assertEqual(article.status, 'failed')
+        self.assertIn('Przekroczono limit czasu ekstrakcji', article.error_message)
+        self.assertTrue(NewsWebsite.objects.get(domain=self.server.base_url.split('//', 1)[1]).is_quarantined())
+
+class EncodingDetectionTest(TestCase):
+    def test_declared_charset_precedence(self):
+        text = "Zażółć gęślą jaźń"
+        meta = b'<meta charset="iso-8859-2">'
+        
+        page = decode_html(codecs.BOM_UTF8 + text.encode('utf-8'), 'text/html; charset=iso-8859-2')
+        self.assertEqual((page.text, page.source), (text, 'bom'))
+        page = decode_html(meta + text.encode('cp1250'), 'text/html; charset=windows-1250')
+        self.assertEqual((page.text, page.charset, page.source), (meta.decode() + text, 'cp1250', 'header'))
+        page = decode_html(meta + text.encode('iso-8859-2'), 'text/html')
+        self.assertEqual((page.charset, page.source), ('iso8859-2', 'meta'))
+        self.assertFalse(page.fallback)
+        # Nagłówek niezgodny z treścią jest pomijany
+        page = decode_html(text.encode('utf-8'), 'text/html; charset=us-ascii')
+        self.assertEqual((page.text, page.source), (text, 'utf-8'))
+        self.assertTrue(page.fallback)
+        page = decode_html(text.encode('cp1250'))
+        self.assertEqual((page.text, page.source), (text, 'fallback'))
+    
+    def test_scraper_decodes_polish_page_and_remembers_domain_charset(self):
+        server = start_fixture_server(self, 'encoding')
+        scraper = ArticleScraper()
+        
+        declared = scraper.scrape_article(server.url('latin2.html'))
+        self.assertEqual(declared['title'], "Żółta łódź płynie przez Kraków")
+        self.assertEqual(declared['metadata']['charset_source'], 'meta')
+        self.assertEqual(declared['events'], {})
+        
+        # Strona bez deklaracji z tej samej domeny - kodowanie zapamiętane wcześniej
+        undeclared = scraper.scrape_article(server.url('undeclared.html'))
+        self.assertIn("Zażółć gęślą jaźń", undeclared['plain_text_content'])
+        self.assertEqual(undeclared['metadata']['charset'], 'iso8859-2')
+        self.assertEqual(undeclared['metadata']['charset_source'], 'domain')
+        self.assertEqual(undeclared['events'], {})
+        self.assertNotIn('decode_fallback', undeclared['timings'])
+    
+    def test_domain_charset_is_used_before_meta_scan(self):
+        text = "Zażółć gęślą jaźń"
+        encoding.remember_charset('kodowanie.pl', 'iso8859-2')
+        self.addCleanup(encoding._domain_charsets.pop, 'kodowanie.pl', None)
+        
+        with mock.patch.object(encoding, 'charset_from_meta', wraps=encoding.charset_from_meta) as meta:
+            page = encoding.decode_html(b'<meta charset="iso-8859-2">' + text.encode('iso-8859-2'), domain='kodowanie.pl')
+            self.assertEqual((page.charset, page.source), ('iso8859-2', 'domain'))
+            self.assertFalse(page.fallback)
+            meta.assert_not_called()
+            
+            # Poprawny UTF-8 z deklaracją w <meta> nadal ją znajduje
+            page = encoding.decode_html(b'<meta charset="utf-8">' + text.encode('utf-8'), domain='kodowanie.pl')
+            self.assertEqual((page.charset, page.source), ('utf-8', 'meta'))
+            self.assertEqual(encoding.remembered_charset('kodowanie.pl'), 'utf-8')
+    
+    def test_guessed_charset_is_counted_not_timed(self):
+        server = start_fixture_server(self, 'encoding')
+        domain = server.base_url.split('//', 1)[1]
+        
+        # Domena bez zapamiętanego kodowania - strona bez deklaracji jest zgadywana
+        enqueue_urls([server.url('undeclared.html')])
+        ArticleScraper().process_frontier(delay=0)
+        
+        self.assertEqual(EventCounter.objects.get(domain=domain, name='decode_fallback').value, 1)
+        self.assertFalse(StageMetric.objects.filter(stage='decode_fallback').exists())
+        body = Client().get('/metrics').content.decode()
+        self.assertIn('# TYPE crawler_events_total counter', body)
+        self.assertIn(f'crawler_events_total{{domain="{domain}",event="decode_fallback"}} 1', body)
+
+class ReextractTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.website = create_website()
+        other = create_website('inny.pl', name="Inny")
+        content = (
+            '<article><h1>Nowy, poprawiony tytuł artykułu</h1>'
+            '<time datetime="2024-10-14T10:30:00">14 października 2024</time>'
+            '<div class="entry-content"><p>' + 'Treść artykułu po poprawkach ekstrakcji. ' * 5 + '</p></div></article>'
+        )
+        cls.articles = [
+            Article.objects.create(
+                website=website,
+                url=f"https://{website.domain}/artykul",
+                title="Stary tytuł",
+                original_content=content,
+                plain_text_content="Stara treść",
+                published_date_normalized=timezone.now()
+            )
+            for website in (cls.website, other)
+        ]
+    
+    def test_reextract_updates_only_changed_rows_of_website(self):
+        version = get_data_version()
+        stats = reextract_articles(website="test.com", processes=1)
+        
+        self.assertEqual((stats['processed'], stats['changed']), (1, 1))
+        article = Article.objects.get(pk=self.articles[0].pk)
+        self.assertEqual(article.title, "Nowy, poprawiony tytuł artykułu")
+        self.assertTrue(article.plain_text_content.startswith("Treść artykułu po poprawkach ekstrakcji."))
+        self.assertEqual(article.published_date_normalized.date().isoformat(), "2024-10-14")
+        self.assertGreater(get_data_version(), version)
+        self.assertEqual(Article.objects.get(pk=self.articles[1].pk).title, "Stary tytuł")
+        
+        updated_at = article.updated_at
+        self.assertEqual(reextract_articles(website="test.com", processes=1)['changed'], 0)
+        self.assertEqual(Article.objects.get(pk=article.pk).updated_at, updated_at)
+    
+    def test_command_runs_in_process_pool_and_resumes_from_checkpoint(self):
+        checkpoint = Path(temp_directory(self)) / 'reextract.json'
+        
+        call_command('reextract', '--processes', '2', '--chunk-size', '1', '--checkpoint', str(checkpoint), stdout=StringIO())
+        self.assertEqual(Article.objects.filter(title="Nowy, poprawiony tytuł artykułu").count(), 2)
+        self.assertEqual(json.loads(checkpoint.read_text())['last_pk'], self.articles[1].pk)
+        
+        output = StringIO()
+        call_command('reextract', '--processes', '1', '--checkpoint', str(checkpoint), stdout=output)
+        self.assertIn('Przetworzone artykuly: 0', output.getvalue())
+
+class ReplicaRoutingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Article.objects.create(
+            website=create_website(),
+            url="https://test.com/a",
+            title="Test Article",
+            original_content="<p>Treść</p>",
+            plain_text_content="Treść",
+            published_date_normalized=timezone.now()
+        )
+    
+    def setUp(self):
+        # Testy mają jedną bazę - jako "replikę" wskazujemy alias default i
+        # sprawdzamy, czy router jawnie go wybrał (None oznacza bazę główną)
+        self.routed = []
+        original = ReplicaRouter.db_for_read
+        
+        def spy(router, model, **hints):
+            alias = original(router, model, **hints)
+            self.routed.append(alias)
+            return alias
+        
+        patcher = mock.patch.object(ReplicaRouter, 'db_for_read', spy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        response_cache.clear()
+    
+    def test_read_only_views_and_exports_use_replica(self):
+        with self.settings(CRAWLER_READ_REPLICA='default'):
+            self.assertEqual(Client().get('/api/articles/').status_code, 200)
+            self.assertTrue(self.routed)
+            self.assertEqual(set(self.routed), {'default'})
+            
+            self.routed.clear()
+            response = Client().get('/api/export/ndjson/')
+            b''.join(response.streaming_content)
+            self.assertEqual(set(self.routed), {'default'})
+            
+            # Scraper i polecenia poza widokami czytają z bazy głównej
+            self.routed.clear()
+            Article.objects.count()
+            self.assertEqual(self.routed, [None])
+    
+    def test_reads_stick_to_primary_after_write(self):
+        client = Client()
+        with self.settings(CRAWLER_READ_REPLICA='default', CRAWLER_REPLICA_STICKY_SECONDS=30), \
+                mock.patch('crawler.views.enqueue_crawl_job', return_value=CrawlSession.objects.create(name="Job")):
+            response = client.post('/api/scrape/', data='{}', content_type='application/json')
+            self.assertEqual(response.status_code, 202)
+            self.assertIn(STICKY_COOKIE, response.cookies)
+            
+            self.routed.clear()
+            client.get('/api/articles/1/')
+            self.assertEqual(set(self.routed), {None})
+    
+    def test_replica_is_ignored_when_not_configured(self):
+        with self.settings(CRAWLER_READ_REPLICA='brak'):
+            Client().get('/api/articles/')
+        self.assertEqual(set(self.routed), {None})
+
+class SingleWriterTest(TransactionTestCase):
+    # Wątek zapisujący ma własne połączenie, więc dane muszą być zatwierdzone
+    # (TransactionTestCase zamiast transakcji testu)
+    
+    def setUp(self):
+        self.writer = SingleWriter(batch_size=10)
+        self.addCleanup(self.writer.close)
+    
+    def test_queued_writes_share_one_transaction(self):
+        started, release = threading.Event(), threading.Event()
+        
+        def blocking():
+            started.set()
+            release.wait()
+        
+        self.writer.submit(blocking)
+        started.wait(5)
+        futures = [
+            self.writer.submit(NewsWebsite.objects.create, name=f"Serwis {i}", url=f"https://s{i}.pl", domain=f"s{i}.pl")
+            for i in range(5)
+        ]
+        release.set()
+        
+        websites = [future.result(timeout=5) for future in futures]
+        self.assertEqual(NewsWebsite.objects.count(), 5)
+        self.assertEqual({website.domain for website in websites}, {f"s{i}.pl" for i in range(5)})
+        # Zadanie blokujące w pierwszej partii, pozostałe zebrane w drugiej
+        self.assertEqual(self.writer.batches, 2)
+    
+    def test_failed_job_does_not_roll_back_others(self):
+        first = self.writer.submit(NewsWebsite.objects.create, name="A", url="https://a.pl", domain="a.pl")
+        duplicate = self.writer.submit(NewsWebsite.objects.create, name="A", url="https://a.pl", domain="a.pl")
+        other = self.writer.submit(NewsWebsite.objects.create, name="B", url="https://b.pl", domain="b.pl")
+        
+        self.assertEqual(first.result(timeout=5).domain, "a.pl")
+        with self.assertRaises(IntegrityError):
+            duplicate.result(timeout=5)
+        self.assertEqual(other.result(timeout=5).domain, "b.pl")
+        self.assertEqual(set(NewsWebsite.objects.values_list('domain', flat=True)), {"a.pl", "b.pl"})
+    
+    def test_frontier_writes_go_through_writer_thread(self):
+        enqueue_urls([f"https://test.com/{i}" for i in range(3)])
+        threads = set()
+        original = ArticleScraper.save_result
+        
+        def save_result(scraper, *args, **kwargs):
+            threads.add(threading.current_thread().name)
+            return original(scraper, *args, **kwargs)
+        
+        def article_data(url, refresh=False, isolate=False):
+            return {
+                'status': 'success',
+                'url': url,
+                'title': f"Artykuł {url}",
+                'original_content': "<p>Treść</p>",
+                'plain_text_content': "Treść",
+                'published_date_normalized': timezone.now(),
+                'timings': {'total': 0.1},
+            }
+        
+        with mock.patch('crawler.scraper.get_writer', return_value=self.writer), \
+                mock.patch.object(ArticleScraper, 'scrape_article', side_effect=article_data), \
+                mock.patch.object(ArticleScraper, 'save_result', save_result):
+            results = ArticleScraper().process_frontier(delay=0)
+        
+        self.assertEqual(results['successful'], 3)
+        self.assertEqual(threads, {'crawler-writer'})
+        self.assertEqual(FrontierURL.objects.filter(state='done').count(), 3)
+        self.assertEqual(Article.objects.count(), 3)
+
+class RetentionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.website = create_website()
+        for i in range(5):
+            Article.objects.create(
+                website=cls.website,
+                url=f"https://test.com/{i}",
+                title=f"Artykuł {i}",
+                original_content="<p>Treść</p>",
+                plain_text_content="Treść",
+                published_date_normalized=timezone.now()
+            )
+        # Trzy najstarsze pobrane rok temu
+        Article.objects.filter(url__in=[f"https://test.com/{i}" for i in range(3)]).update(
+            scraped_at=timezone.now() - timedelta(days=365)
+        )
+    
+    def test_old_articles_move_to_archive_in_batches(self):
+        tag = ArticleTag.objects.create(name="Motoryzacja", slug="motoryzacja")
+        old = Article.objects.get(url="https://test.com/0")
+        ArticleTagRelation.objects.create(article=old, tag=tag)
+        version = get_data_version()
+        
+        self.assertEqual(archive_articles(cutoff(180), dry_run=True)['archived'], 3)
+        stats = archive_articles(cutoff(180), batch_size=2, pause=0)
+        
+        self.assertEqual(stats, {'archived': 3, 'batches': 2})
+        self.assertEqual(Article.objects.count(), 2)
+        self.assertEqual(ArticleArchive.objects.count(), 3)
+        archived = ArticleArchive.objects.get(pk=old.pk)
+        self.assertEqual((archived.url, archived.title, archived.website_id), (old.url, old.title, self.website.pk))
+        self.assertEqual(archived.scraped_at, old.scraped_at)
+        self.assertEqual(archived.tags, ["Motoryzacja"])
+        self.assertFalse(ArticleTagRelation.objects.exists())
+        self.assertGreater(get_data_version(), version)
+    
+    def test_archived_url_is_not_scraped_again(self):
+        archive_articles(cutoff(180), pause=0)
+        with mock.patch.object(ArticleScraper, 'get_page_content') as get_page_content:
+            result = ArticleScraper().scrape_article("https://test.com/0")
+        
+        self.assertEqual(result['status'], 'skipped')
+        get_page_content.assert_not_called()
+    
+    def test_archived_url_is_not_revisited(self):
+        url = "https://test.com/0"
+        enqueue_urls([url, "https://test.com/3"])
+        FrontierURL.objects.update(
+            state='done',
+            fetch_count=1,
+            last_fetched_at=timezone.now() - timedelta(days=1),
+            next_eligible_at=timezone.now() - timedelta(minutes=1)
+        )
+        
+        archive_articles(cutoff(180), pause=0)
+        self.assertEqual(list(FrontierURL.objects.values_list('url', flat=True)), ["https://test.com/3"])
+        self.assertEqual(schedule_revisits(budget_per_hour=10), 1)
+        
+        # Ponowna wizyta, która zaczęła się przed archiwizacją, nie tworzy artykułu od nowa
+        scraper = ArticleScraper()
+        with mock.patch.object(ArticleScraper, 'get_page_content') as get_page_content:
+            self.assertEqual(scraper.scrape_article(url, refresh=True)['status'], 'skipped')
+        get_page_content.assert_not_called()
+        article_data = {
+            'status': 'success',
+            'url': url,
+            'title': "Artykuł z archiwum",
+            'original_content': "<p>Treść</p>",
+            'plain_text_content': "Treść",
+            'published_date_normalized': timezone.now(),
+        }
+        self.assertIsNone(scraper.save_result(url, self.website, article_data, update_existing=True))
+        self.assertEqual(article_data['status'], 'skipped')
+        self.assertFalse(Article.objects.filter(url=url).exists())
+        self.assertTrue(ArticleArchive.objects.filter(url=url).exists())
+    
+    def test_purge_deletes_expired_archive_rows(self):
+        archive_articles(cutoff(180), pause=0)
+        ArticleArchive.objects.filter(url="https://test.com/0").update(scraped_at=timezone.now() - timedelta(days=1000))
+        
+        out = StringIO()
+        call_command('purge_archive', '--dry-run', stdout=out)
+        self.assertIn('Do usuniecia: 1', out.getvalue())
+        
+        stats = purge_archive(cutoff(730), batch_size=1, pause=0)
+        self.assertEqual((stats['deleted'], stats['batches']), (1, 1))
+        self.assertEqual(
+            set(ArticleArchive.objects.values_list('url', flat=True)),
+            {"https://test.com/1", "https://test.com/2"}
+        )
+
+class TaggingTest(TestCase):
+    TEXTS = {
+        'auto-1': "Silnik benzynowy w samochodzie zużywa paliwo. Silnik turbo i skrzynia biegów samochodu.",
+        'auto-2': "Nowy silnik diesla oszczędza paliwo. Samochód z tym silnikiem jeździ daleko.",
+        'kuchnia-1': "Pierś kurczaka smażona na patelni. Kurczak z warzywami to szybki obiad.",
+        'kuchnia-2': "Przepis na obiad: kurczak pieczony z ziemniakami i warzywami w piekarniku.",
+        'sport-1': "Mecz piłki nożnej zakończył się remisem. Piłkarze walczyli do ostatniej minuty meczu.",
+    }
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.website = create_website()
+        for slug, text in cls.TEXTS.items():
+            cls.create_article(slug, text)
+    
+    @classmethod
+    def create_article(cls, slug, text):
+        return Article.objects.create(
+            website=cls.website,
+            url=f"https://test.com/{slug}",
+            title=slug,
+            original_content=f"<p>{text}</p>",
+            plain_text_content=text,
+            published_date_normalized=timezone.now()
+        )
+    
+    def tags_of(self, slug):
+        return set(ArticleTagRelation.objects.filter(article__url=f"https://test.com/{slug}").values_list('tag__name', flat=True))
+    
+    def test_articles_get_distinctive_words_as_tags(self):
+        stats = tag_articles(chunk_size=2, max_tags=3, min_score=0.1)
+        
+        self.assertEqual(stats['processed'], 5)
+        self.assertIn('silnik', self.tags_of('auto-1'))
+        self.assertIn('kurczak', self.tags_of('kuchnia-2'))
+        self.assertTrue(all(len(self.tags_of(slug)) <= 3 for slug in self.TEXTS))
+        # Słowo z jednego dokumentu (min_df=2) nie jest tagiem
+        self.assertFalse(self.tags_of('sport-1'))
+        
+        self.assertEqual(stats['relations'], ArticleTagRelation.objects.count())
+        
+        # Ponowne uruchomienie nie dubluje relacji i nie raportuje ich jako nowych
+        relations = ArticleTagRelation.objects.count()
+        self.assertEqual(tag_articles(chunk_size=2, max_tags=3, min_score=0.1)['relations'], 0)
+        self.assertEqual(ArticleTagRelation.objects.count(), relations)
+    
+    def test_incremental_run_tags_only_new_articles(self):
+        tagging.tag_articles(min_score=0.1)
+        self.assertEqual(tagging.tag_articles(incremental=True)['processed'], 0)
+        
+        self.create_article('auto-3', "Silnik elektryczny zamiast benzynowego - samochód bez paliwa.")
+        with mock.patch.object(tagging, 'select_tags', wraps=tagging.select_tags) as select_tags:
+            stats = tagging.tag_articles(incremental=True, min_score=0.1)
+        
+        self.assertEqual(stats['processed'], 1)
+        self.assertEqual(len(select_tags.call_args.args[0]), 1)
+        self.assertIn('silnik', self.tags_of('auto-3'))
+    
+    def test_polish_tag_slugs_do_not_collide(self):
+        ArticleTag.objects.create(name="sowa", slug="sowa")
+        ArticleTag.objects.create(name="Szkoła (stara)", slug="szkoła")
+        ids = TagCache().resolve(['słowa', 'łódź', 'szkoła'])
+        
+        self.assertTrue(all(ids[name] for name in ['słowa', 'łódź', 'szkoła']))
+        self.assertEqual(
+            dict(ArticleTag.objects.filter(name__in=['słowa', 'łódź', 'szkoła']).values_list('name', 'slug')),
+            {'słowa': 'słowa', 'łódź': 'łódź', 'szkoła': 'szkoła-2'}
+        )
+        
+        # Znacznik przyrostowy nie trafia do tabeli wersji danych (cache API)
+        version = get_data_version()
+        tag_articles(min_score=0.1)
+        self.assertEqual(get_data_version(), version)
+        self.assertEqual(get_tagging_watermark(), Article.objects.order_by('-pk').values_list('pk', flat=True)[0])
+        self.assertEqual(TaggingState.objects.count(), 1)
+    
+    def test_existing_only_assigns_defined_tags(self):
+        ArticleTag.objects.create(name="Kurczak", slug="kurczak")
+        
+        tag_articles(existing_only=True, min_score=0.1)
+        
+        self.assertEqual(list(ArticleTag.objects.values_list('name', flat=True)), ["Kurczak"])
+        self.assertEqual(self.tags_of('kuchnia-1'), {"Kurczak"})
+        self.assertFalse(self.tags_of('auto-1'))
@@ -0,0 +1,90 @@
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from .metrics import StageTimer
+
+# Licznik etapów bieżącego pobrania w tym wątku; połączenia urllib3 nie
+# wiedzą, dla którego artykułu powstają
+_current = threading.local()
+
+@contextmanager
+def timed(timer: StageTimer) -> Iterator[None]:
+    previous = getattr(_current, 'timer', None)
+    _current.timer = timer
+    try:
+        yield
+    finally:
+        _current.timer = previous
+
+def _resolve(host: str, port: int) -> list:
+    addresses = []
+    for family, kind, proto, canonname, sockaddr in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+    return addresses
+
+class TimedConnectionMixin:
+    # DNS mierzony przy nawiązywaniu prawdziwego połączenia: nazwę rozwiązujemy
+    # sami i podajemy urllib3 gotowe adresy, więc zapytanie nie jest powtarzane.
+    # Połączenie keep-alive użyte ponownie nie ma etapu 'dns'.
+
+    def _new_conn(self) -> socket.socket:
+        timer: Optional[StageTimer] = getattr(_current, 'timer', None)
+        host = self._dns_host
+        if timer is None:
+            return super()._new_conn()
+
+        try:
+            with timer.stage('dns'):
+                addresses = _resolve(host, self.port)
+        except (OSError, UnicodeError):
+            # Błąd rozwiązania nazwy zgłasza urllib3 po swojemu (NameResolutionError)
+            return super()._new_conn()
+
+        error = None
+        for address in addresses:
+            # host (SNI, nagłówek Host) wynika z _dns_host - podmieniamy go
+            # tylko na czas otwierania gniazda
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except (ConnectTimeoutError, NewConnectionError) as e:
+                error = e
+            finally:
+                self._dns_host = host
+        raise error
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+def timed_session() -> requests.Session:
+    session = requests.Session()
+    session.mount('http://', TimedAdapter())
+    session.mount('https://', TimedAdapter())
+    return session
@@ -5,11 +5,16 @@ urlpatterns = [
     path('', views.home, name='home'),
     
     path('api/articles/', views.articles_list_api, name='articles_list_api'),
+    path('api/articles/batch/', views.articles_batch_api, name='articles_batch_api'),
     path('api/articles/<int:article_id>/', views.article_detail_api, name='article_detail_api'),
     path('api/websites/', views.websites_list_api, name='websites_list_api'),
+    path('api/cache/stats/', views.cache_stats_api, name='cache_stats_api'),
+    path('metrics', views.metrics_view, name='metrics'),
     path('api/scrape/', views.scrape_articles_api, name='scrape_articles_api'),
+    path('api/crawl-sessions/<int:session_id>/', views.crawl_session_status_api, name='crawl_session_status_api'),
     path('api/export/csv/', views.export_articles_csv_api, name='export_csv_api'),
     path('api/export/json/', views.export_articles_json_api, name='export_json_api'),
+    path('api/export/ndjson/', views.export_articles_ndjson_api, name='export_ndjson_api'),
     
     path('articles/', views.articles_list, name='articles_list'),
     path('articles/<int:article_id>/', views.article_detail, name='article_detail'),
@@ -1,17 +1,140 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.urls import reverse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Count, Max, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 from django.core import serializers
+from datetime import datetime, time, timezone as dt_timezone
 import json
 import csv
+import zlib
 
-from .models import NewsWebsite, Article, CrawlSession
-from .scraper import scrape_articles
+from .models import NewsWebsite, Article, CrawlSession, EventCounter, FrontierURL, StageMetric
+from .cache import cache_response, get_request_data_modified, get_request_data_version, response_cache
+from .jobs import enqueue_crawl_job
+from .metrics import render_counters, render_gauge, render_histograms
+from .routers import read_replica
+from .serializers import DETAIL_FIELDS, LIST_FIELDS, parse_fields, restrict_queryset, serialize_article
 
+EXPORT_CHUNK_SIZE = 2000
+BATCH_MAX_IDS = 100
+NDJSON_FLUSH_EVERY = 500
+
+# Pseudo-bufor dla csv.writer - zwraca zapisany wiersz zamiast go buforować
+class Echo:
+    def write(self, value):
+        return value
+
+def _parse_date_param(value, end_of_day=False):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Nieprawidłowy format daty: {value}")
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def _source_website_ids(request, source):
+    # Serwisy pasujące do ?source= wyszukane osobno (tabela serwisów jest mała):
+    # filtr website_id IN (...) trafia w indeks (serwis, data publikacji), a JOIN
+    # z warunkiem LIKE kończył się przejściem całego indeksu dat artykułów
+    if getattr(request, '_source_website_ids', (None,))[0] != source:
+        ids = list(NewsWebsite.objects.filter(domain__icontains=source).order_by().values_list('id', flat=True))
+        request._source_website_ids = (source, ids)
+    return request._source_website_ids[1]
+
+def filter_articles(articles, request):
+    params = request.GET
+    source = params.get('source', '')
+    if source:
+        articles = articles.filter(website_id__in=_source_website_ids(request, source))
+    
+    status = params.get('status', '')
+    if status:
+        articles = articles.filter(status=status)
+    
+    date_from = params.get('date_from', '')
+    if date_from:
+        articles = articles.filter(published_date_normalized__gte=_parse_date_param(date_from))
+    
+    date_to = params.get('date_to', '')
+    if date_to:
+        articles = articles.filter(published_date_normalized__lte=_parse_date_param(date_to, end_of_day=True))
+    
+    return articles
+
+def _last_modified(request, *moments):
+    # Najpóźniejsza zmiana wierszy (updated_at obejmuje też aktualizacje przy
+    # ponownych wizytach i reextract) albo podbicie wersji danych - to drugie
+    # widzi również usunięcia
+    return max(filter(None, [*moments, get_request_data_modified(request)]), default=None)
+
+# Walidatory HTTP (ETag / Last-Modified) liczone jednym agregatem, zanim
+# widok w ogóle wykona właściwe zapytanie
+def _articles_validators(request):
+    if not hasattr(request, '_articles_validators'):
+        try:
+            stats = filter_articles(Article.objects.all(), request).aggregate(
+                count=Count('id'), last_updated=Max('updated_at')
+            )
+        except ValueError:
+            stats = None
+        else:
+            stats['last_modified'] = _last_modified(request, stats['last_updated'])
+        request._articles_validators = stats
+    return request._articles_validators
+
+def _articles_etag(request, *args, **kwargs):
+    stats = _articles_validators(request)
+    if stats is None or stats['last_modified'] is None:
+        return None
+    return f"articles-v{get_request_data_version(request)}-{stats['count']}-{stats['last_modified'].timestamp()}"
+
+def _articles_last_modified(request, *args, **kwargs):
+    stats = _articles_validators(request)
+    return stats['last_modified'] if stats else None
+
+def _article_version(request, article_id):
+    if not hasattr(request, '_article_version'):
+        request._article_version = Article.objects.filter(id=article_id).order_by().values_list('updated_at', flat=True).first()
+    return request._article_version
+
+def _article_etag(request, article_id):
+    version = _article_version(request, article_id)
+    if version is None:
+        return None
+    return f"article-{article_id}-{version.timestamp()}"
+
+def _article_last_modified(request, article_id):
+    return _article_version(request, article_id)
+
+def _websites_validators(request):
+    if not hasattr(request, '_websites_validators'):
+        websites = NewsWebsite.objects.aggregate(count=Count('id'), last_created=Max('created_at'))
+        articles = Article.objects.aggregate(count=Count('id'), last_updated=Max('updated_at'))
+        request._websites_validators = {
+            'websites': websites['count'],
+            'articles': articles['count'],
+            'last_modified': _last_modified(request, websites['last_created'], articles['last_updated']),
+        }
+    return request._websites_validators
+
+def _websites_etag(request):
+    stats = _websites_validators(request)
+    if stats['last_modified'] is None:
+        return None
+    return f"websites-v{get_request_data_version(request)}-{stats['websites']}-{stats['articles']}-{stats['last_modified'].timestamp()}"
+
+def _websites_last_modified(request):
+    return _websites_validators(request)['last_modified']
+
+@read_replica
 def home(request):
     total_articles = Article.objects.count()
     total_websites = NewsWebsite.objects.count()
@@ -31,14 +154,15 @@ def home(request):
     
     return render(request, 'crawler/home.html', context)
 
+@read_replica
+@cache_response('articles_list', etag_func=_articles_etag, last_modified_func=_articles_last_modified)
 def articles_list_api(request):
     try:
-        source = request.GET.get('source', '')
-        
-        articles = Article.objects.select_related('website').order_by('-published_date_normalized')
+        articles = Article.objects.order_by('-published_date_normalized')
+        articles = filter_articles(articles, request)
         
-        if source:
-            articles = articles.filter(website__domain__icontains=source)
+        fields = parse_fields(request.GET.get('fields', ''), LIST_FIELDS)
+        articles = restrict_queryset(articles, fields)
         
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('per_page', 20))
@@ -46,19 +170,7 @@ def articles_list_api(request):
         paginator = Paginator(articles, per_page)
         page_obj = paginator.get_page(page)
         
-        articles_data = []
-        for article in page_obj:
-            articles_data.append({
-                'id': article.id,
-                'title': article.title,
-                'url': article.url,
-                'source_domain': article.website.domain,
-                'published_date': article.get_published_date_formatted(),
-                'scraped_at': article.scraped_at.strftime('%d.%m.%Y %H:%M:%S'),
-                'status': article.status,
-                'word_count': article.get_word_count(),
-                'excerpt': article.get_excerpt(200)
-            })
+        articles_data = [serialize_article(article, fields) for article in page_obj]
         
         return JsonResponse({
             'status': 'success',
@@ -69,47 +181,76 @@ def articles_list_api(request):
             'articles': articles_data
         })
         
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'status': 'error',
             'message': str(e)
         }, status=500)
 
+@read_replica
+@condition(etag_func=_article_etag, last_modified_func=_article_last_modified)
 def article_detail_api(request, article_id):
     try:
-        article = get_object_or_404(Article, id=article_id)
-        
-        article_data = {
-            'id': article.id,
-            'title': article.title,
-            'url': article.url,
-            'source_domain': article.website.domain,
-            'published_date': article.get_published_date_formatted(),
-            'scraped_at': article.scraped_at.strftime('%d.%m.%Y %H:%M:%S'),
-            'status': article.status,
-            'word_count': article.get_word_count(),
-            'original_content': article.original_content,
-            'plain_text_content': article.plain_text_content,
-            'http_status_code': article.http_status_code,
-            'response_time': article.response_time,
-            'content_length': article.content_length,
-            'error_message': article.error_message if article.error_message else None
-        }
+        fields = parse_fields(request.GET.get('fields', ''), DETAIL_FIELDS)
+        article = get_object_or_404(restrict_queryset(Article.objects.all(), fields), id=article_id)
         
         return JsonResponse({
             'status': 'success',
-            'article': article_data
+            'article': serialize_article(article, fields)
         })
         
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+@read_replica
+def articles_batch_api(request):
+    try:
+        fields = parse_fields(request.GET.get('fields', ''), LIST_FIELDS)
+        ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip()]
+        
+        if not ids:
+            raise ValueError("Parametr ids jest wymagany")
+        if len(ids) > BATCH_MAX_IDS:
+            raise ValueError(f"Maksymalnie {BATCH_MAX_IDS} identyfikatorów na zapytanie")
+        
+        # Kolejność wyznacza lista ids - domyślne sortowanie modelu byłoby zbędnym ORDER BY
+        found = restrict_queryset(Article.objects.order_by(), fields).in_bulk(ids)
+        
+        return JsonResponse({
+            'status': 'success',
+            'articles': [serialize_article(found[article_id], fields) for article_id in ids if article_id in found],
+            'missing': [article_id for article_id in ids if article_id not in found]
+        })
+        
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'status': 'error',
             'message': str(e)
         }, status=500)
 
+@read_replica
+@cache_response('websites_list', etag_func=_websites_etag, last_modified_func=_websites_last_modified)
 def websites_list_api(request):
     try:
-        websites = NewsWebsite.objects.all().order_by('-created_at')
+        websites = NewsWebsite.objects.annotate(articles_count=Count('article')).order_by('-created_at')
         
         websites_data = []
         for website in websites:
@@ -121,7 +262,7 @@ def websites_list_api(request):
                 'description': website.description,
                 'is_active': website.is_active,
                 'created_at': website.created_at.strftime('%d.%m.%Y %H:%M:%S'),
-                'articles_count': website.article_set.count()
+                'articles_count': website.articles_count
             })
         
         return JsonResponse({
@@ -135,54 +276,83 @@ def websites_list_api(request):
             'message': str(e)
         }, status=500)
 
+def cache_stats_api(request):
+    return JsonResponse({
+        'status': 'success',
+        'data_version': get_request_data_version(request),
+        'cache': response_cache.stats()
+    })
+
+def metrics_view(request):
+    # Format tekstowy Prometheusa; histogramy są kumulatywne od początku działania crawlera
+    lines = render_histograms(StageMetric.objects.all())
+    lines += render_counters(EventCounter.objects.all())
+    lines += render_gauge(
+        'crawler_frontier_urls',
+        'Liczba URL-i w kolejce według stanu',
+        'state',
+        dict(FrontierURL.objects.order_by().values_list('state').annotate(total=Count('pk')))
+    )
+    lines += render_gauge(
+        'crawler_articles',
+        'Liczba artykułów według statusu',
+        'status',
+        dict(Article.objects.order_by().values_list('status').annotate(total=Count('pk')))
+    )
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def scrape_articles_api(request):
     try:
-        results = scrape_articles()
+        payload = json.loads(request.body) if request.content_type == 'application/json' and request.body else {}
+        if not isinstance(payload, dict):
+            raise ValueError("Oczekiwano obiektu JSON")
+        urls = payload.get('urls') or None
+        if urls is not None and not (isinstance(urls, list) and all(isinstance(url, str) for url in urls)):
+            raise ValueError("Pole urls musi być listą adresów (napisów)")
+        
+        crawl_session = enqueue_crawl_job(urls=urls, priority=int(payload.get('priority', 0)))
         
         return JsonResponse({
             'status': 'success',
-            'message': 'Scrapowanie zakończone',
-            'results': results
-        })
+            'message': 'Scrapowanie zlecone',
+            'session_id': crawl_session.id,
+            'status_url': reverse('crawl_session_status_api', args=[crawl_session.id])
+        }, status=202)
         
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'status': 'error',
             'message': str(e)
         }, status=500)
 
-def export_articles_csv_api(request):
+def crawl_session_status_api(request, session_id):
     try:
-        articles = Article.objects.select_related('website').order_by('-published_date_normalized')
-        
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="articles.csv"'
+        crawl_session = get_object_or_404(CrawlSession, id=session_id)
         
-        response.write('\ufeff')
-        
-        writer = csv.writer(response)
-        
-        writer.writerow([
-            'ID', 'Tytuł', 'URL', 'Domena', 'Data publikacji', 
-            'Data scrapowania', 'Status', 'Liczba słów', 'Treść (plain text)'
-        ])
-        
-        for article in articles:
-            writer.writerow([
-                article.id,
-                article.title,
-                article.url,
-                article.website.domain,
-                article.get_published_date_formatted(),
-                article.scraped_at.strftime('%d.%m.%Y %H:%M:%S'),
-                article.get_status_display(),
-                article.get_word_count(),
-                article.plain_text_content
-            ])
-        
-        return response
+        return JsonResponse({
+            'status': 'success',
+            'session': {
+                'id': crawl_session.id,
+                'name': crawl_session.name,
+                'status': crawl_session.status,
+                'total_articles': crawl_session.total_articles,
+                'scraped_articles': crawl_session.scraped_articles,
+                'progress': round(crawl_session.get_progress_percentage(), 1),
+                'worker_id': crawl_session.worker_id or None,
+                'created_at': crawl_session.created_at.strftime('%d.%m.%Y %H:%M:%S'),
+                'started_at': crawl_session.started_at.strftime('%d.%m.%Y %H:%M:%S') if crawl_session.started_at else None,
+                'completed_at': crawl_session.completed_at.strftime('%d.%m.%Y %H:%M:%S') if crawl_session.completed_at else None,
+                'heartbeat_at': crawl_session.heartbeat_at.strftime('%d.%m.%Y %H:%M:%S') if crawl_session.heartbeat_at else None,
+                'error_message': crawl_session.error_message or None
+            }
+        })
         
     except Exception as e:
         return JsonResponse({
@@ -190,9 +360,62 @@ def export_articles_csv_api(request):
             'message': str(e)
         }, status=500)
 
+@read_replica
+@condition(etag_func=_articles_etag, last_modified_func=_articles_last_modified)
+def export_articles_csv_api(request):
+    try:
+        articles = filter_articles(Article.objects.all(), request)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+    
+    rows = articles.order_by('-published_date_normalized').values_list(
+        'id', 'title', 'url', 'website__domain', 'published_date_normalized',
+        'scraped_at', 'status', 'plain_text_content'
+    )
+    status_labels = dict(Article.STATUS_CHOICES)
+    
+    def stream_rows():
+        writer = csv.writer(Echo())
+        yield '\ufeff'
+        yield writer.writerow([
+            'ID', 'Tytuł', 'URL', 'Domena', 'Data publikacji', 
+            'Data scrapowania', 'Status', 'Liczba słów', 'Treść (plain text)'
+        ])
+        for article_id, title, url, domain, published, scraped, status, plain_text in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield writer.writerow([
+                article_id,
+                title,
+                url,
+                domain,
+                published.strftime('%d.%m.%Y %H:%M:%S'),
+                scraped.strftime('%d.%m.%Y %H:%M:%S'),
+                status_labels.get(status, status),
+                len(plain_text.split()) if plain_text else 0,
+                plain_text
+            ])
+    
+    response = StreamingHttpResponse(stream_rows(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="articles.csv"'
+    return response
+
+@read_replica
+@condition(etag_func=_articles_etag, last_modified_func=_articles_last_modified)
 def export_articles_json_api(request):
+    # Te same filtry co walidatory (_articles_validators), inaczej 304 dla
+    # przefiltrowanego zbioru chroniłoby odpowiedź z pełną listą
     try:
-        articles = Article.objects.select_related('website').order_by('-published_date_normalized')
+        articles = filter_articles(Article.objects.select_related('website'), request)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+    
+    try:
+        articles = articles.order_by('-published_date_normalized')
         
         articles_data = []
         for article in articles:
@@ -223,6 +446,73 @@ def export_articles_json_api(request):
             'message': str(e)
         }, status=500)
 
+def _format_cursor(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for i, chunk in enumerate(chunks, 1):
+        data = compressor.compress(chunk.encode('utf-8'))
+        if i % NDJSON_FLUSH_EVERY == 0:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@read_replica
+@condition(etag_func=_articles_etag, last_modified_func=_articles_last_modified)
+def export_articles_ndjson_api(request):
+    try:
+        articles = filter_articles(Article.objects.all(), request)
+        
+        since = request.GET.get('since', '')
+        if since:
+            since_date = _parse_date_param(since)
+            since_id = int(request.GET.get('since_id', 0))
+            articles = articles.filter(
+                Q(scraped_at__gt=since_date) | Q(scraped_at=since_date, id__gt=since_id)
+            )
+        
+        limit = request.GET.get('limit', '')
+        articles = articles.order_by('scraped_at', 'id')
+        if limit:
+            articles = articles[:int(limit)]
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+    
+    rows = articles.values_list(
+        'id', 'title', 'url', 'website__domain', 'published_date_normalized',
+        'scraped_at', 'status', 'original_content', 'plain_text_content'
+    )
+    
+    def stream_lines():
+        for article_id, title, url, domain, published, scraped, status, original, plain_text in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield json.dumps({
+                'id': article_id,
+                'title': title,
+                'url': url,
+                'source_domain': domain,
+                'published_date': published.strftime('%d.%m.%Y %H:%M:%S'),
+                'scraped_at': scraped.strftime('%d.%m.%Y %H:%M:%S'),
+                'cursor': _format_cursor(scraped),
+                'status': status,
+                'word_count': len(plain_text.split()) if plain_text else 0,
+                'original_content': original,
+                'plain_text_content': plain_text
+            }, ensure_ascii=False) + '\n'
+    
+    if request.GET.get('compress') == 'gzip':
+        response = StreamingHttpResponse(_gzip_stream(stream_lines()), content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="articles.ndjson.gz"'
+    else:
+        response = StreamingHttpResponse(stream_lines(), content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="articles.ndjson"'
+    return response
+
+@read_replica
 def articles_list(request):
     articles = Article.objects.select_related('website').order_by('-published_date_normalized')
     
@@ -244,8 +534,9 @@ def articles_list(request):
     
     return render(request, 'crawler/articles_list.html', context)
 
+@read_replica
 def article_detail(request, article_id):
-    article = get_object_or_404(Article, id=article_id)
+    article = get_object_or_404(Article.objects.select_related('website'), id=article_id)
     
     context = {
         'article': article,
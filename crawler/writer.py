@@ -0,0 +1,140 @@
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+class InlineWriter:
+    # Zapis w wątku wywołującym - domyślnie oraz dla PostgreSQL, który sam
+    # obsługuje współbieżnych zapisujących
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def run(self, func: Callable, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def close(self) -> None:
+        pass
+
+class SingleWriter(InlineWriter):
+    # Jeden wątek z własnym połączeniem wykonuje wszystkie zapisy scrapera.
+    # Zadania, które zebrały się w kolejce, trafiają do jednej transakcji
+    # (group commit) - każde we własnym savepoincie, więc błąd jednego nie
+    # wycofuje pozostałych. Wynik zadania jest dostępny dopiero po commicie.
+
+    def __init__(self, batch_size: int = 100):
+        self.batch_size = batch_size
+        self.batches = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        if threading.current_thread() is self._thread:
+            # Zadanie zlecone z wnętrza innego zadania - jest już w transakcji
+            return super().submit(func, *args, **kwargs)
+        self._ensure_started()
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def run(self, func: Callable, *args, **kwargs):
+        return self.submit(func, *args, **kwargs).result()
+
+    def close(self) -> None:
+        # Czeka na zapisanie wszystkiego, co już jest w kolejce
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='crawler-writer', daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                jobs, stop = [job], False
+                # Bez czekania na kolejne zadania: przy małym ruchu partia ma jeden
+                # element i nie dodaje opóźnienia, pod obciążeniem sama rośnie
+                while len(jobs) < self.batch_size:
+                    try:
+                        job = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        stop = True
+                        break
+                    jobs.append(job)
+                self._run_batch(jobs)
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def _run_batch(self, jobs: List) -> None:
+        jobs = [job for job in jobs if job[0].set_running_or_notify_cancel()]
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in jobs:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # Nieudany commit - żaden zapis z partii nie trafił do bazy
+            for future, *_ in jobs:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        for future, value, error in outcomes:
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+
+def single_writer_enabled() -> bool:
+    # Osobny wątek ma sens tylko dla pliku SQLite - baza w pamięci (testy)
+    # nie jest współdzielona z połączeniem innego wątku
+    database = connections['default']
+    return (
+        getattr(settings, 'CRAWLER_SQLITE_TUNING', False)
+        and database.vendor == 'sqlite'
+        and not database.is_in_memory_db()
+    )
+
+_writer = None
+_writer_pid = None
+
+def get_writer() -> InlineWriter:
+    # Jeden wątek zapisujący na proces; po fork (pula workerów) wątek rodzica
+    # nie istnieje, więc proces potomny tworzy własny
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        if single_writer_enabled():
+            _writer = SingleWriter(getattr(settings, 'CRAWLER_SQLITE_WRITE_BATCH', 100))
+            atexit.register(_writer.close)
+        else:
+            _writer = InlineWriter()
+        _writer_pid = os.getpid()
+    return _writer
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'crawler.routers.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'scrapper.urls'
@@ -79,6 +81,133 @@ DATABASES = {
     }
 }
 
+def _database_from_url(url):
+    from urllib.parse import urlparse
+
+    database_url = urlparse(url)
+    if database_url.scheme == 'sqlite':
+        # sqlite:///wzgledna/sciezka.sqlite3 lub sqlite:////bezwzgledna/sciezka.sqlite3
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / database_url.path[1:],
+        }
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': database_url.path.lstrip('/'),
+        'USER': database_url.username or '',
+        'PASSWORD': database_url.password or '',
+        'HOST': database_url.hostname or '',
+        'PORT': str(database_url.port or ''),
+    }
+
+# docker-compose przekazuje DATABASE_URL - wtedy wszystkie procesy (web,
+# workery) współdzielą jedną bazę PostgreSQL
+if os.environ.get('DATABASE_URL'):
+    DATABASES['default'] = _database_from_url(os.environ['DATABASE_URL'])
+
+# Replika tylko do odczytu dla widoków API i eksportów (crawler.routers);
+# scraper i admin zawsze używają bazy głównej. W testach replika jest lustrem 'default'.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = {
+        **_database_from_url(os.environ['DATABASE_REPLICA_URL']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Tryb produkcyjny SQLite: WAL (czytelnicy nie blokują zapisu), strojone pragmy
+# przy każdym połączeniu i jeden wątek zapisujący wyniki scrapera w partiach
+# (crawler.writer) - serwer WWW i scraper mogą wtedy działać obok siebie
+CRAWLER_SQLITE_TUNING = os.environ.get('CRAWLER_SQLITE_TUNING') == '1'
+CRAWLER_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Przy WAL commit nie czeka na fsync; awaria zasilania może cofnąć ostatnie
+    # transakcje, ale nie uszkodzi bazy
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.environ.get('CRAWLER_SQLITE_MMAP_MB', 256)) * 1024 * 1024,
+    # Wartość ujemna to rozmiar w KiB, a nie liczba stron
+    'cache_size': -int(os.environ.get('CRAWLER_SQLITE_CACHE_MB', 64)) * 1024,
+    'temp_store': 'MEMORY',
+}
+# Maksymalna liczba zadań wątku zapisującego w jednej transakcji
+CRAWLER_SQLITE_WRITE_BATCH = int(os.environ.get('CRAWLER_SQLITE_WRITE_BATCH', 100))
+
+if CRAWLER_SQLITE_TUNING:
+    for _database in DATABASES.values():
+        if _database['ENGINE'] == 'django.db.backends.sqlite3':
+            _database.setdefault('OPTIONS', {}).update({
+                'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in CRAWLER_SQLITE_PRAGMAS.items()),
+                # BEGIN IMMEDIATE: transakcja od razu bierze blokadę zapisu, więc
+                # czeka na nią (timeout) zamiast kończyć się "database is locked"
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            })
+
+DATABASE_ROUTERS = ['crawler.routers.ReplicaRouter']
+CRAWLER_READ_REPLICA = 'replica' if 'replica' in DATABASES else None
+# Jak długo po zapisie klient czyta z bazy głównej (opóźnienie replikacji)
+CRAWLER_REPLICA_STICKY_SECONDS = int(os.environ.get('CRAWLER_REPLICA_STICKY_SECONDS', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Alias 'api' przechowuje odpowiedzi list API. Klucze zawierają wersję danych
+# podbijaną przez scraper, więc wpisy są ważne do czasu pojawienia się nowych
+# danych. CRAWLER_API_CACHE=file włącza backend plikowy współdzielony przez procesy.
+
+# Budżet pamięci cache odpowiedzi egzekwuje backend: liczba wpisów jest
+# ograniczona tak, by nawet same największe dopuszczalne odpowiedzi zmieściły
+# się w CRAWLER_API_CACHE_MAX_BYTES (także dla backendu plikowego)
+CRAWLER_API_CACHE_MAX_BYTES = int(os.environ.get('CRAWLER_API_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CRAWLER_API_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('CRAWLER_API_CACHE_MAX_ENTRY_BYTES', 256 * 1024))
+CRAWLER_API_CACHE_MAX_ENTRIES = max(CRAWLER_API_CACHE_MAX_BYTES // CRAWLER_API_CACHE_MAX_ENTRY_BYTES, 1)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'crawler-api',
+        'OPTIONS': {'MAX_ENTRIES': CRAWLER_API_CACHE_MAX_ENTRIES},
+    },
+}
+
+if os.environ.get('CRAWLER_API_CACHE') == 'file':
+    CACHES['api'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CRAWLER_API_CACHE_DIR', str(BASE_DIR / 'cache' / 'api')),
+        'OPTIONS': {'MAX_ENTRIES': CRAWLER_API_CACHE_MAX_ENTRIES},
+    }
+
+CRAWLER_API_CACHE_ALIAS = 'api'
+# Zabezpieczenie na wypadek zmian danych z pominięciem podbicia wersji
+CRAWLER_API_CACHE_TIMEOUT = 300
+
+# Wyniki scrape_articles --profile / --trace-memory / --sql-log (podkatalog per sesja)
+CRAWLER_PROFILE_DIR = os.environ.get('CRAWLER_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+# Budżet RSS workera scrapera (MB, przy --processes N dzielony na procesy); 0 wyłącza.
+# Liczba jednocześnie parsowanych stron jest ograniczana tak, by zmieściły się
+# w budżecie, a większe są odrzucane
+CRAWLER_MEMORY_BUDGET_MB = float(os.environ.get('CRAWLER_MEMORY_BUDGET_MB', 0))
+
+# Limity ekstrakcji treści jednej strony (s); 0 wyłącza limit. Strona, która je
+# przekroczy, kończy się błędem, a kolejne próby działają w osobnym procesie
+CRAWLER_PARSE_WALL_SECONDS = float(os.environ.get('CRAWLER_PARSE_WALL_SECONDS', 30))
+CRAWLER_PARSE_CPU_SECONDS = float(os.environ.get('CRAWLER_PARSE_CPU_SECONDS', 20))
+
+# Odstęp (s) przed dociągnięciem pliku JSON z treścią strony SPA (<link> w pustej
+# powłoce) - to kolejne żądanie do tego samego serwisu
+CRAWLER_EMBEDDED_FETCH_DELAY = float(os.environ.get('CRAWLER_EMBEDDED_FETCH_DELAY', 1.0))
+
+# Retencja (archive_articles / purge_archive): po ilu dniach od pobrania artykuł
+# trafia do archiwum i po ilu dniach jest z archiwum usuwany
+CRAWLER_ARCHIVE_AFTER_DAYS = int(os.environ.get('CRAWLER_ARCHIVE_AFTER_DAYS', 180))
+CRAWLER_ARCHIVE_RETENTION_DAYS = int(os.environ.get('CRAWLER_ARCHIVE_RETENTION_DAYS', 730))
+
+# Limit pobrań na godzinę, powyżej którego zaległe ponowne wizyty czekają
+CRAWLER_RECRAWL_BUDGET_PER_HOUR = int(os.environ.get('CRAWLER_RECRAWL_BUDGET_PER_HOUR', 500))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators